@@ -1,8 +1,45 @@
 import os
 from dotenv import load_dotenv
 
+# The only place .env is read; every other module takes its settings from here
 load_dotenv()
 
 PLANTNET_API_KEY = os.getenv("PLANTNET_API_KEY")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 MONGO_URI = os.getenv("MONGO_URI")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+# Service endpoints (override to point at local stubs, see benchmarks/stubs.py)
+PLANTNET_API_URL = os.getenv("PLANTNET_API_URL", "https://my-api.plantnet.org/v2/identify/all")
+GEMINI_API_URL = os.getenv(
+    "GEMINI_API_URL", "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent")
+
+# Optional offline classifier (see plant_identifiers.LocalOnnxBackend)
+LOCAL_MODEL_PATH = os.getenv("LOCAL_MODEL_PATH")
+LOCAL_MODEL_LABELS = os.getenv("LOCAL_MODEL_LABELS")
+LOCAL_MODEL_CONFIDENCE = float(os.getenv("LOCAL_MODEL_CONFIDENCE", "80"))
+
+# Shared result cache for multi-worker deployments (see plant_cache.make_cache):
+# "" = per-process memory, "sqlite:///path/cache.db" = shared on this host, "redis://host:6379/0" = shared by hosts
+CACHE_URL = os.getenv("CACHE_URL", "")
+
+# Client-side upstream limits (see plant_limits): requests per minute and per UTC day (0 = unlimited).
+# Counted in LIMITS_DB (default plant_limits.db next to the app, shared by local processes; "memory" = per process)
+PLANTNET_RATE_PER_MINUTE = float(os.getenv("PLANTNET_RATE_PER_MINUTE", "60"))
+PLANTNET_DAILY_QUOTA = int(os.getenv("PLANTNET_DAILY_QUOTA", "500"))
+GEMINI_RATE_PER_MINUTE = float(os.getenv("GEMINI_RATE_PER_MINUTE", "15"))
+GEMINI_DAILY_QUOTA = int(os.getenv("GEMINI_DAILY_QUOTA", "1500"))
+LIMITS_DB = os.getenv("LIMITS_DB")
+
+# Pre-generated greetings and first answers (see plant_greetings.py); default: *.chat-warm.json next to the care file
+CHAT_WARM_FILE = os.getenv("CHAT_WARM_FILE")
+# Semantic answer cache (see plant_semantic.py): cosine similarity a paraphrase needs to reuse an answer (>1 = off)
+CHAT_SEMANTIC_THRESHOLD = float(os.getenv("CHAT_SEMANTIC_THRESHOLD", "0.8"))
+
+# Saved plants' chat histories (see plant_chatlog.py): default plant_chat_log.db next to the app; "memory" = per process
+CHAT_LOG_DB = os.getenv("CHAT_LOG_DB")
+
+# Metrics (see plant_metrics): Prometheus /metrics endpoint port, periodic JSON log, admin page
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0")) or None
+METRICS_LOG_FILE = os.getenv("METRICS_LOG_FILE")
+ENABLE_ADMIN_PAGE = os.getenv("ENABLE_ADMIN_PAGE", "").lower() in ("1", "true", "yes")
@@ -0,0 +1,169 @@
+"""
+Cache backends (plant_cache): per-operation latency and cross-process single-flight.
+
+    python benchmarks/bench_cache.py [--backends memory,sqlite,redis] [--processes 4] [--threads 8]
+                                     [--redis-url redis://host:6379/0] [--json results.json]
+
+For each backend, as configured by plant_cache.make_cache (memory = in-process
+LRU; sqlite / redis = that LRU in front of the shared tier):
+
+  ops        mean / p50 / p99 microseconds for set, get (local hit), get (shared
+             hit, i.e. as another process sees the entry) and get (miss)
+  burst      --processes worker processes x --threads threads all call
+             get_or_compute() on ONE key at the same moment; the compute is a
+             POST to the PlantNet stub (--latency-ms). Counts how many upstream
+             requests the burst caused: 1 for the shared tiers, one per
+             process for memory
+  restart    whether a fresh process still finds the burst's entry
+
+redis uses a local RESP stand-in (benchmarks/stubs.RedisStub) unless
+--redis-url is given; it is skipped if the 'redis' package is missing.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+import urllib.request
+import uuid
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from plant_cache import make_cache
+from stubs import PlantNetStub, RedisStub, StubConfig
+
+# Roughly the size of a cached identification with its candidates
+SAMPLE_VALUE = {'scientific_name': "Monstera deliciosa", 'common_name': "Swiss cheese plant", 'confidence': 91.2,
+                'candidates': [{'scientific_name': f"Species {i}", 'common_name': f"Common {i}", 'common_names': [],
+                                'genus': "Genus", 'family': "Family", 'confidence': 10.0 - i} for i in range(5)]}
+
+
+def timed_us(fn, keys):
+    timings = []
+    for key in keys:
+        t0 = time.perf_counter()
+        fn(key)
+        timings.append((time.perf_counter() - t0) * 1e6)
+    timings.sort()
+    return {"mean_us": round(statistics.mean(timings), 1), "p50_us": round(timings[len(timings) // 2], 1),
+            "p99_us": round(timings[int(len(timings) * 0.99)], 1)}
+
+
+def bench_ops(url, ops):
+    namespace = f"ops-{uuid.uuid4().hex[:8]}"
+    writer = make_cache(url, namespace, max_entries=ops * 2)
+    reader = make_cache(url, namespace, max_entries=ops * 2)  # Empty local tier, like another worker
+    keys = [f"key-{i}" for i in range(ops)]
+    results = {
+        "set": timed_us(lambda k: writer.set(k, SAMPLE_VALUE), keys),
+        "get_local_hit": timed_us(writer.get, keys),
+        "get_shared_hit": timed_us(reader.get, keys),
+        "get_miss": timed_us(writer.get, [f"absent-{i}" for i in range(ops)]),
+    }
+    writer.clear()
+    return results
+
+
+def _burst_worker(url, namespace, key, stub_url, threads, start_at, results):
+    """One worker process: `threads` threads call get_or_compute(key) at start_at."""
+    import threading
+
+    cache = make_cache(url, namespace)
+
+    def upstream():
+        request = urllib.request.Request(stub_url, data=key.encode(), method="POST")
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return json.loads(response.read())["results"][0]["species"]["scientificNameWithoutAuthor"]
+
+    def call():
+        time.sleep(max(0.0, start_at - time.time()))
+        results.put(cache.get_or_compute(key, upstream))
+
+    workers = [threading.Thread(target=call) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def bench_burst(url, stub, processes, threads):
+    namespace, key = f"burst-{uuid.uuid4().hex[:8]}", "viral-plant-photo"
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    before = stub.requests
+    start_at = time.time() + 2.0  # Time for every process to start and open its cache
+    workers = [context.Process(target=_burst_worker,
+                               args=(url, namespace, key, stub.url, threads, start_at, results))
+               for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    answers = [results.get(timeout=60) for _ in range(processes * threads)]
+    for worker in workers:
+        worker.join()
+    wall = time.time() - start_at
+    restart = make_cache(url, namespace).get(key) is not None
+    make_cache(url, namespace).clear()
+    return {"callers": len(answers), "upstream_requests": stub.requests - before,
+            "distinct_answers": len(set(answers)), "wall_s": round(wall, 3), "survives_restart": restart}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="memory,sqlite,redis")
+    parser.add_argument("--ops", type=int, default=2000, help="Keys per operation timing")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8, help="Threads per burst process")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="PlantNet stub latency")
+    parser.add_argument("--redis-url", help="Real Redis server instead of the local stand-in")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    stub = PlantNetStub(StubConfig(args.latency_ms), species=["Monstera deliciosa"]).start()
+    workdir = tempfile.mkdtemp(prefix="bench-cache-")
+    redis_stub = None
+    urls = {}
+    for backend in args.backends.split(","):
+        if backend == "memory":
+            urls[backend] = "memory"
+        elif backend == "sqlite":
+            urls[backend] = f"sqlite:///{os.path.join(workdir, 'cache.db')}"
+        elif backend == "redis":
+            try:
+                import redis  # noqa: F401
+            except ImportError:
+                print("Skipping redis: the 'redis' package is not installed.")
+                continue
+            if args.redis_url is None:
+                redis_stub = RedisStub().start()
+            urls[backend] = args.redis_url or redis_stub.url
+        else:
+            raise SystemExit(f"Unknown backend '{backend}'")
+
+    results = {"settings": vars(args), "backends": {}}
+    for backend, url in urls.items():
+        ops = bench_ops(url, args.ops)
+        burst = bench_burst(url, stub, args.processes, args.threads)
+        results["backends"][backend] = {"ops": ops, "burst": burst}
+        print(f"\n{backend} ({url})")
+        for name, stats in ops.items():
+            print(f"  {name:<16} mean {stats['mean_us']:>8} us  p50 {stats['p50_us']:>8} us  p99 {stats['p99_us']:>8} us")
+        print(f"  burst: {burst['callers']} callers in {args.processes} processes -> "
+              f"{burst['upstream_requests']} upstream request(s), {burst['distinct_answers']} distinct answer(s), "
+              f"{burst['wall_s']} s; survives restart: {burst['survives_restart']}")
+
+    stub.stop()
+    if redis_stub is not None:
+        redis_stub.stop()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
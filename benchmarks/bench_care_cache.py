@@ -0,0 +1,89 @@
+"""
+Per-rerun cost of getting the care dataset: st.cache_data (before) vs shared frozen snapshot (after).
+
+    python benchmarks/bench_care_cache.py [--reruns 200] [--scale 1]
+
+st.cache_data pickles the return value once and unpickles a fresh deep copy
+on every call, so each rerun of every session re-allocates all care records.
+The shared store (st.cache_resource + plant_data.CareDataStore) hands out a
+reference to one frozen snapshot. Reports mean time and peak allocations
+per rerun for both.
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import streamlit as st
+
+import plant_data
+
+# Bare-mode (no `streamlit run`) warnings are expected here
+logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+
+def measure(load, reruns):
+    load()  # Populate the cache first: we measure the warm, per-rerun path
+    timings = []
+    for _ in range(reruns):
+        started = time.perf_counter()
+        records = load()
+        timings.append(time.perf_counter() - started)
+        assert len(records) > 0
+
+    tracemalloc.start()
+    load()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "mean_ms": round(statistics.mean(timings) * 1000, 3),
+        "p95_ms": round(sorted(timings)[int(0.95 * (len(timings) - 1))] * 1000, 3),
+        "peak_alloc_kib": round(peak / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reruns", type=int, default=200)
+    parser.add_argument("--scale", type=int, default=1, help="Replicate the care file N times")
+    parser.add_argument("--json", help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    filepath = plant_data.PLANT_CARE_FILE
+    if args.scale > 1:
+        import tempfile
+        with open(filepath, encoding="utf-8") as f:
+            records = json.load(f) * args.scale
+        filepath = os.path.join(tempfile.mkdtemp(), "care_scaled.json")
+        with open(filepath, "w", encoding="utf-8") as f:
+            json.dump(records, f)
+
+    @st.cache_data(show_spinner=False)
+    def load_plant_care_data_before(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @st.cache_resource(show_spinner=False)
+    def get_care_store_after(path):
+        return plant_data.CareDataStore(path)
+
+    before = measure(lambda: load_plant_care_data_before(filepath), args.reruns)
+    after = measure(lambda: get_care_store_after(filepath).snapshot().records, args.reruns)
+
+    results = {"records": len(get_care_store_after(filepath).snapshot().records),
+               "st.cache_data (copy per rerun)": before,
+               "st.cache_resource (frozen, shared)": after}
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Chat history per turn: full-list rewrite vs. the append-only chat log (plant_chatlog).
+
+    python benchmarks/bench_chatlog.py [--lengths 100,1000,10000] [--turns 50] [--json results.json]
+
+For conversations already --lengths messages long, times --turns more turns
+(a user message and a reply each) two ways:
+
+  rewrite   the previous approach: the session keeps the whole history, the
+            saved plant's log is replaced by a copy of it after every turn and
+            the full history goes into the Gemini request
+  append    each message is one ChatLogStore.append() to a SQLite file (WAL),
+            the session keeps at most the UI's window and the request carries
+            the last CONTEXT_MESSAGES
+
+and reports per-turn latency, messages held in the session and the size of
+the Gemini request body. It also times reading the latest page and a page
+from the archive once compact_all() has run, and the compaction itself.
+No network: the reply is canned and requests are built but not sent.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_e2e import summarize
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lengths", default="100,1000,10000", help="Comma-separated conversation lengths")
+    parser.add_argument("--turns", type=int, default=50, help="Timed turns per length and approach")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    import plant_chat
+    import plant_data
+    from plant_chatlog import PAGE_SIZE, ChatLogStore
+
+    care_info = plant_data.load_plant_data()[0]
+    window = 2 * PAGE_SIZE  # streamlit_app.CHAT_WINDOW
+    message = lambda i: {"role": "user" if i % 2 == 0 else "assistant",
+                         "content": f"Message {i}: how is the new leaf coming along this week?", "time": "12:00"}
+    results = {"settings": vars(args), "lengths": {}}
+
+    for length in [int(n) for n in args.lengths.split(",")]:
+        history = [message(i) for i in range(length)]
+        saved = {"chat_log": list(history)}
+        timings, body = [], 0
+        context_messages = plant_chat.CONTEXT_MESSAGES
+        plant_chat.CONTEXT_MESSAGES = sys.maxsize  # The whole history, as before
+        for turn in range(args.turns):
+            started = time.perf_counter()
+            for i in (length + 2 * turn, length + 2 * turn + 1):
+                history.append(message(i))
+                request = plant_chat.build_chat_messages(care_info, history)
+                body = len(json.dumps({"contents": request}))
+                saved["chat_log"] = list(history)
+            timings.append(time.perf_counter() - started)
+        plant_chat.CONTEXT_MESSAGES = context_messages
+        rewrite = dict(summarize(timings, sum(timings)), session_messages=len(history), request_bytes=body)
+
+        path = os.path.join(tempfile.mkdtemp(prefix="bench-chatlog-"), "chat_log.db")
+        store = ChatLogStore(path)
+        store.extend("bench", "plant", [message(i) for i in range(length)])
+        session = store.page("bench", "plant", window)
+        timings = []
+        for turn in range(args.turns):
+            started = time.perf_counter()
+            for i in (length + 2 * turn, length + 2 * turn + 1):
+                seq = store.append("bench", "plant", message(i))
+                session.append(dict(message(i), seq=seq))
+                del session[:-window]
+                request = plant_chat.build_chat_messages(care_info, session)
+                body = len(json.dumps({"contents": request}))
+            timings.append(time.perf_counter() - started)
+        append = dict(summarize(timings, sum(timings)), session_messages=len(session), request_bytes=body)
+
+        started = time.perf_counter()
+        compaction = store.compact_all()
+        compaction["seconds"] = round(time.perf_counter() - started, 4)
+        latest = summarize(*_timed(lambda: store.page("bench", "plant"), args.turns))
+        archived = summarize(*_timed(lambda: store.page("bench", "plant", before=length // 2), args.turns))
+        results["lengths"][length] = {"rewrite": rewrite, "append": append, "compaction": compaction,
+                                      "page_latest": latest, "page_archived": archived,
+                                      "db_kib": round(os.path.getsize(path) / 1024, 1)}
+        print(f"{length:>6} messages")
+        for name, stats in (("rewrite", rewrite), ("append", append)):
+            print(f"  {name:<8} per turn p50 {stats['p50_ms']:>8} ms  p95 {stats['p95_ms']:>8} ms  "
+                  f"session {stats['session_messages']:>6} msgs  request {stats['request_bytes'] / 1024:>8.1f} KiB")
+        print(f"  page     latest p50 {latest['p50_ms']} ms, from the archive p50 {archived['p50_ms']} ms; "
+              f"compacted {compaction['compacted']} messages in {compaction['seconds']} s")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.json}")
+
+
+def _timed(fn, count):
+    timings = []
+    for _ in range(count):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return timings, sum(timings)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""
+End-to-end benchmark: every external service replaced by a local stand-in.
+
+    python benchmarks/bench_e2e.py [--latency-ms 200] [--error-rate 0.02] [--sessions 10]
+                                   [--json results.json] [--compare baseline.json]
+
+Starts stub PlantNet and Gemini servers (benchmarks/stubs.py) with the given
+latency / error injection, points the app at them through PLANTNET_API_URL /
+GEMINI_API_URL, and serves sensor data from mongomock (or a real server with
+--mongo-uri). Then it measures, per component:
+
+  identify_plant            plant_identification.identify_plant against the PlantNet stub
+  identify_concurrent       the same, --concurrency requests at a time (throughput)
+  send_message              plant_chat.send_message against the Gemini stub
+  find_care_instructions    exact and misspelt names against the care database
+  get_latest_stats          plant_stats.get_latest_stats over --sensor-docs readings
+  session:<name>            scripted user sessions replayed headlessly with
+                            Streamlit's AppTest (each step timed separately)
+
+and reports count, errors, mean / p50 / p95 / p99 / max latency (ms),
+throughput (ops/s) and peak traced allocations (KiB). --json writes the
+results with run metadata (git commit, time, settings); --compare prints
+the change in p50 / p95 against an earlier results file.
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stubs import UNLIMITED_ENV, GeminiStub, PlantNetStub, StubConfig
+
+APP_FILE = os.path.join(REPO_ROOT, "streamlit_app.py")
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))]
+
+
+def summarize(timings, wall_seconds, errors=0, peak_bytes=None):
+    ordered = sorted(timings)
+    ms = lambda seconds: round(seconds * 1000, 3)
+    return {
+        "count": len(ordered),
+        "errors": errors,
+        "mean_ms": ms(statistics.mean(ordered)) if ordered else 0.0,
+        "p50_ms": ms(percentile(ordered, 50)),
+        "p95_ms": ms(percentile(ordered, 95)),
+        "p99_ms": ms(percentile(ordered, 99)),
+        "max_ms": ms(ordered[-1]) if ordered else 0.0,
+        "throughput_per_s": round(len(ordered) / wall_seconds, 2) if wall_seconds else 0.0,
+        "peak_alloc_kib": round(peak_bytes / 1024, 1) if peak_bytes is not None else None,
+    }
+
+
+def peak_allocation(fn):
+    """Peak traced allocations during one extra call (kept out of the timed runs: tracing slows them)."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_component(fn, inputs, is_error=lambda result: False):
+    timings, errors = [], 0
+    started = time.perf_counter()
+    for item in inputs:
+        t0 = time.perf_counter()
+        result = fn(item)
+        timings.append(time.perf_counter() - t0)
+        errors += bool(is_error(result))
+    wall = time.perf_counter() - started
+    return summarize(timings, wall, errors, peak_allocation(lambda: fn(inputs[0])))
+
+
+def run_concurrent(fn, inputs, concurrency, is_error=lambda result: False):
+    def timed(item):
+        t0 = time.perf_counter()
+        result = fn(item)
+        return time.perf_counter() - t0, bool(is_error(result))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(timed, inputs))
+    wall = time.perf_counter() - started
+    return summarize([t for t, _ in outcomes], wall, sum(e for _, e in outcomes))
+
+
+def make_jpeg(seed):
+    from PIL import Image
+    rng = random.Random(seed)
+    image = Image.new("RGB", (64, 64), tuple(rng.randrange(256) for _ in range(3)))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+# --- Scripted sessions: lists of (step name, action(app_test)) ---
+
+def _open_app(at):
+    at.run()
+
+
+def _find_plants(at):
+    at.radio(key="main_nav_radio").set_value("🔍 Find Plants").run()
+    at.multiselect(key="finder_light").set_value(["bright indirect"]).run()
+    at.checkbox(key="finder_pet_safe").check().run()
+
+
+def _search(at):
+    at.text_input(key="care_search_query").input("repot every spring").run()
+
+
+def _identify(at, seed):
+    at.session_state["uploaded_file_bytes"] = make_jpeg(seed)
+    at.session_state["uploaded_file_type"] = "image/jpeg"
+    at.run()  # Submits the job and polls (sleep + rerun) until PlantNet answers
+
+
+def _chat(at):
+    if not at.chat_input:
+        raise RuntimeError("no chat box on the page (identification failed?)")
+    at.chat_input[0].set_value("How often should I water you?").run()
+
+
+SESSIONS = {
+    "browse": lambda seed: [("open", _open_app), ("find_plants", _find_plants), ("search", _search)],
+    "identify_and_chat": lambda seed: [("open", _open_app), ("identify", lambda at: _identify(at, seed)),
+                                       ("chat", _chat)],
+}
+
+
+def replay_sessions(name, count, timeout):
+    from streamlit.testing.v1 import AppTest
+    step_timings, session_timings, failures = {}, [], 0
+    started = time.perf_counter()
+    for i in range(count):
+        at = AppTest.from_file(APP_FILE, default_timeout=timeout)
+        session_started = time.perf_counter()
+        try:
+            for step, action in SESSIONS[name](i):
+                t0 = time.perf_counter()
+                action(at)
+                step_timings.setdefault(step, []).append(time.perf_counter() - t0)
+                if at.exception:
+                    raise RuntimeError(at.exception[0].value)
+        except Exception as e:
+            failures += 1
+            print(f"WARN: session {name} #{i} failed: {e}")
+            continue
+        session_timings.append(time.perf_counter() - session_started)
+    wall = time.perf_counter() - started
+    result = summarize(session_timings, wall, failures)
+    result["steps"] = {step: summarize(t, sum(t)) for step, t in step_timings.items()}
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["components"]
+    print(f"\nChange vs {baseline_path} (negative = faster):")
+    for name, stats in results["components"].items():
+        old = baseline.get(name)
+        if not old:
+            print(f"  {name:<34} (new)")
+            continue
+        if not stats["count"]:
+            print(f"  {name:<34} (no successful runs)")
+            continue
+        deltas = []
+        for key in ("p50_ms", "p95_ms"):
+            if old.get(key):
+                deltas.append(f"{key[:3]} {100 * (stats[key] - old[key]) / old[key]:+6.1f}%")
+        print(f"  {name:<34} " + "  ".join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Stub response latency")
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of stub requests that fail")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--requests", type=int, default=50, help="Calls per API component")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--lookups", type=int, default=500, help="find_care_instructions calls")
+    parser.add_argument("--sensor-docs", type=int, default=10000)
+    parser.add_argument("--mongo-uri", help="Use this MongoDB server instead of mongomock")
+    parser.add_argument("--sessions", type=int, default=5, help="Replays of each scripted session")
+    parser.add_argument("--session-timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Earlier --json results to compare against")
+    args = parser.parse_args()
+
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    make_config = lambda offset: StubConfig(args.latency_ms, args.jitter_ms, args.error_rate, args.error_status,
+                                            seed=args.seed + offset)
+    plantnet = PlantNetStub(make_config(1)).start()
+    gemini = GeminiStub(make_config(2)).start()
+
+    # Must be in place before api_config is imported (it reads the environment once)
+    os.environ.update({
+        "PLANTNET_API_URL": plantnet.url, "GEMINI_API_URL": gemini.url,
+        "PLANTNET_API_KEY": "bench", "GEMINI_API_KEY": "bench",
+        "MONGO_URI": args.mongo_uri or "mongodb://bench.invalid",
+        **UNLIMITED_ENV,
+    })
+    if not args.mongo_uri:
+        import mongomock
+        import pymongo
+        shared_client = mongomock.MongoClient()
+        pymongo.MongoClient = lambda *a, **k: shared_client
+
+    import plant_data
+    import plant_care
+    import plant_chat
+    import plant_identification
+    import plant_stats  # Renders its page in bare mode; we only use get_latest_stats and its collection
+
+    rng = random.Random(args.seed)
+    results = {"meta": {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": vars(args),
+    }, "components": {}}
+    components = results["components"]
+
+    def report(name, stats):
+        components[name] = stats
+        print(f"{name:<34} n={stats['count']:<5} err={stats['errors']:<3} p50 {stats['p50_ms']:>9} ms  "
+              f"p95 {stats['p95_ms']:>9} ms  p99 {stats['p99_ms']:>9} ms  {stats['throughput_per_s']:>8}/s")
+
+    images = [make_jpeg(rng.random()) for _ in range(args.requests)]
+    identify_error = lambda result: 'error' in result
+    report("identify_plant", run_component(plant_identification.identify_plant, images, identify_error))
+    report("identify_concurrent", run_concurrent(plant_identification.identify_plant, images,
+                                                 args.concurrency, identify_error))
+
+    conversation = [{"role": "user", "parts": [{"text": "Hello plant!"}]}]
+    chat_error = lambda reply: reply.startswith("Sorry")
+    report("send_message", run_component(lambda _: plant_chat.send_message(conversation),
+                                         range(args.requests), chat_error))
+
+    dataset = plant_data.load_dataset()
+    names = [r.get('Plant Name') for r in dataset.records if r.get('Plant Name')]
+    lookups = []
+    for _ in range(args.lookups):
+        name = rng.choice(names)
+        if rng.random() < 0.3:  # Misspell some so the fuzzy path is exercised too
+            i = rng.randrange(len(name))
+            name = name[:i] + name[i + 1:]
+        lookups.append(name)
+    report("find_care_instructions", run_component(
+        lambda name: plant_care.find_care_instructions(name, dataset.records, care_index=dataset.index),
+        lookups, lambda care: care is None))
+
+    collection = plant_stats.collection
+    if not args.mongo_uri or collection.estimated_document_count() == 0:
+        now = time.time()
+        collection.insert_many([{"temperature": rng.uniform(55, 85), "moisture_value": rng.randint(200, 900),
+                                 "timestamp": now - 60 * i} for i in range(args.sensor_docs)])
+    report("get_latest_stats", run_component(lambda _: plant_stats.get_latest_stats(), range(args.requests),
+                                             lambda doc: doc is None))
+
+    for name in SESSIONS:
+        stats = replay_sessions(name, args.sessions, args.session_timeout)
+        report(f"session:{name}", stats)
+        for step, step_stats in stats["steps"].items():
+            print(f"    {step:<30} p50 {step_stats['p50_ms']:>9} ms  p95 {step_stats['p95_ms']:>9} ms")
+
+    results["stubs"] = {"plantnet": {"requests": plantnet.requests, "errors": plantnet.errors},
+                        "gemini": {"requests": gemini.requests, "errors": gemini.errors}}
+    results["max_rss_mib"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    print(f"\nStub traffic: {results['stubs']}; max RSS {results['max_rss_mib']} MiB")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+    plantnet.stop()
+    gemini.stop()
+
+
+if __name__ == "__main__":
+    main()
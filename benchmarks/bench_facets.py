@@ -0,0 +1,97 @@
+"""
+Faceted "find plants for these conditions" queries at scale.
+
+    python benchmarks/bench_facets.py [--records 100000] [--iterations 200]
+
+Replicates the shipped care file up to --records entries, builds the
+FacetIndex (parsing light / watering / humidity / temperature / toxicity
+once at load time), then times a set of typical queries through the bitmap
+and sorted-array indexes and, for comparison, through a plain Python scan
+over the already-parsed attributes.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import plant_data
+from plant_facets import FacetIndex
+from plant_records import to_records
+
+QUERIES = {
+    "low light": dict(light=["low"]),
+    "pet-safe": dict(pet_safe=True),
+    "18-24 °C": dict(temp_range_c=(18, 24)),
+    "low light + pet-safe + 18-24 °C": dict(light=["low"], pet_safe=True, temp_range_c=(18, 24)),
+    "bright indirect + humid 50-80% + moist": dict(light=["bright indirect"], humidity_range=(50, 80),
+                                                  watering=["high"]),
+}
+
+
+def scan(index, light=None, watering=None, pet_safe=None, humidity_range=None, temp_range_c=None):
+    """Reference implementation: one Python pass over the parsed attributes."""
+    out = []
+    for record, a in zip(index.records, index.attributes):
+        if light and not any(c in a.light for c in light):
+            continue
+        if watering and a.watering not in watering:
+            continue
+        if pet_safe is not None and a.pet_safe is not pet_safe:
+            continue
+        if humidity_range and (a.humidity_pct is None or not humidity_range[0] <= a.humidity_pct <= humidity_range[1]):
+            continue
+        if temp_range_c and (a.temp_min_c is None or a.temp_min_c > temp_range_c[1] or a.temp_max_c < temp_range_c[0]):
+            continue
+        out.append(record)
+    return out
+
+
+def time_ms(fn, iterations):
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {"p50_ms": round(statistics.median(timings), 3), "p95_ms": round(timings[int(0.95 * (len(timings) - 1))], 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=100_000)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--json", help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    with open(plant_data.PLANT_CARE_FILE, encoding="utf-8") as f:
+        base = json.load(f)
+    data = [dict(base[i % len(base)], **{"Plant Name": f"{base[i % len(base)]['Plant Name']} {i}"})
+            for i in range(args.records)]
+    records = to_records(data)
+
+    started = time.perf_counter()
+    index = FacetIndex(records)
+    build_seconds = time.perf_counter() - started
+    print(f"Built facet index over {len(records)} records in {build_seconds:.2f}s")
+
+    results = {"records": len(records), "build_seconds": round(build_seconds, 3), "queries": {}}
+    for name, conditions in QUERIES.items():
+        matches = index.count(**conditions)
+        assert matches == len(scan(index, **conditions)), name
+        indexed = time_ms(lambda: index.query(**conditions), args.iterations)
+        scanned = time_ms(lambda: scan(index, **conditions), max(1, args.iterations // 10))
+        results["queries"][name] = {"matches": matches, "indexed": indexed, "python_scan": scanned}
+        print(f"{name:<42} {matches:>6} matches: indexed p50 {indexed['p50_ms']:>7} ms "
+              f"p95 {indexed['p95_ms']:>7} ms | scan p50 {scanned['p50_ms']:>8} ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
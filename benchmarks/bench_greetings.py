@@ -0,0 +1,101 @@
+"""
+Pre-generated opening chat turns (plant_greetings): batch job throughput and first-turn latency.
+
+    python benchmarks/bench_greetings.py [--plants 100] [--concurrency 1,4,16] [--latency-ms 300]
+                                         [--json results.json]
+
+Starts a stub Gemini server (benchmarks/stubs.py) and:
+
+  generate     runs the batch job for the first --plants plants once per
+               --concurrency value (fresh artifact each time) and reports
+               requests/s; the stub's latency makes it bound by requests in flight
+  first turn   chat_with_plant() for a plant's first question, answered from the
+               table (pre-generated) vs. a plant outside it (model round-trip),
+               plus opening_greeting() lookups
+
+The artifact goes to a temporary file (CHAT_WARM_FILE), never next to the real care file.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_e2e import summarize
+from stubs import UNLIMITED_ENV, GeminiStub, StubConfig
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--plants", type=int, default=100, help="Plants to pre-generate")
+    parser.add_argument("--questions", type=int, default=6)
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated batch job concurrency levels")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Stub Gemini latency")
+    parser.add_argument("--turns", type=int, default=50, help="First turns timed per case")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    gemini = GeminiStub(StubConfig(args.latency_ms, seed=args.seed)).start()
+    artifact = os.path.join(tempfile.mkdtemp(prefix="bench-greetings-"), "plants.chat-warm.json")
+    # Must be in place before api_config is imported (it reads the environment once)
+    # (the semantic answer cache is off, so "model" turns really make the round-trip)
+    os.environ.update({"GEMINI_API_URL": gemini.url, "GEMINI_API_KEY": "bench", "CHAT_WARM_FILE": artifact,
+                       "CHAT_SEMANTIC_THRESHOLD": "2", **UNLIMITED_ENV})
+    import plant_chat
+    import plant_data
+    import plant_greetings
+
+    questions = plant_greetings.COMMON_QUESTIONS[:args.questions]
+    results = {"settings": vars(args), "generate": {}}
+    for concurrency in [int(c) for c in args.concurrency.split(",")]:
+        if os.path.exists(artifact):
+            os.remove(artifact)
+        before = gemini.requests
+        summary = plant_greetings.generate(plant_data.PLANT_CARE_FILE, artifact, questions, concurrency,
+                                           args.plants)
+        summary["stub_requests"] = gemini.requests - before
+        results["generate"][concurrency] = summary
+        print(f"generate  concurrency {concurrency:>3}: {summary['complete']}/{summary['plants']} plants, "
+              f"{summary['requests']} requests in {summary['seconds']} s ({summary['requests_per_s']}/s)")
+    print(f"artifact  {os.path.getsize(artifact) / 1024:.1f} KiB")
+
+    rng = random.Random(args.seed)
+    records = [r for r in plant_data.load_plant_data() if r.get('Plant Name')]
+    warm, cold = records[:args.plants], records[args.plants:]
+
+    def time_turns(plants, fn):
+        timings = []
+        for _ in range(args.turns):
+            care_info = rng.choice(plants)
+            question = rng.choice(questions)
+            started = time.perf_counter()
+            fn(care_info, question)
+            timings.append(time.perf_counter() - started)
+        return summarize(timings, sum(timings))
+
+    first_turn = lambda care_info, question: plant_chat.chat_with_plant(
+        care_info, [{"role": "user", "content": question}])
+    results["first_turn"] = {"pre_generated": time_turns(warm, first_turn)}
+    if cold:
+        results["first_turn"]["model"] = time_turns(cold, first_turn)
+    results["first_turn"]["greeting_lookup"] = time_turns(
+        warm, lambda care_info, _: plant_chat.opening_greeting(care_info))
+    for name, stats in results["first_turn"].items():
+        print(f"{name:<16} p50 {stats['p50_ms']:>9} ms  p95 {stats['p95_ms']:>9} ms  max {stats['max_ms']:>9} ms")
+
+    gemini.stop()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
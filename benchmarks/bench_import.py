@@ -0,0 +1,132 @@
+"""
+Cold-start and per-rerun overhead of the Streamlit app.
+
+    python benchmarks/bench_import.py [--runs 5] [--top 15] [--reruns 20] [--json results.json]
+
+cold_start   runs `python -X importtime -c "import streamlit_app"` in fresh
+             processes and reports the wall time, the app's cumulative import
+             time and the most expensive modules it imports (median of --runs).
+deferred     which heavy dependencies are still absent from sys.modules after
+             that import; they should only load when a page first needs them.
+rerun        Streamlit re-executes the whole script on every interaction:
+             `module_body` times executing streamlit_app.py again with every
+             import already warm, `apptest` times full headless reruns of the
+             landing page with Streamlit's AppTest.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+APP_FILE = os.path.join(REPO_ROOT, "streamlit_app.py")
+# Dependencies the app should not import until a page actually uses them
+HEAVY_MODULES = ("openai", "onnxruntime", "requests", "fuzzywuzzy", "pytz", "PIL.Image", "pymongo")
+# Placeholder keys so api_config-dependent code paths are importable without a .env
+BENCH_ENV = {"PLANTNET_API_KEY": "bench", "GEMINI_API_KEY": "bench"}
+
+
+def parse_importtime(stderr):
+    """-X importtime lines -> (cumulative ms of streamlit_app, {module it imports directly: cumulative ms})."""
+    total, direct = 0.0, {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # Header row
+        depth = (len(name) - len(name.lstrip())) // 2  # One leading space at depth 0, two more per level
+        if depth == 0 and name.strip() == "streamlit_app":
+            total = int(cumulative) / 1000
+        elif depth == 1:
+            direct[name.strip()] = int(cumulative) / 1000
+    return total, direct
+
+
+def cold_start(runs, top):
+    env = dict(os.environ, **BENCH_ENV)
+    code = ("import sys, json; import streamlit_app; "
+            f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))")
+    walls, totals, loaded = [], [], []
+    per_module = defaultdict(list)
+    for _ in range(runs):
+        started = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=REPO_ROOT, env=env,
+                              capture_output=True, text=True)
+        walls.append((time.perf_counter() - started) * 1000)
+        if proc.returncode != 0:
+            raise RuntimeError(f"Importing streamlit_app failed:\n{proc.stderr[-2000:]}")
+        total, direct = parse_importtime(proc.stderr)
+        totals.append(total)
+        for name, ms in direct.items():
+            per_module[name].append(ms)
+        loaded = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    heaviest = sorted(((name, round(statistics.median(ms), 2)) for name, ms in per_module.items()),
+                      key=lambda kv: -kv[1])[:top]
+    return {
+        "process_wall_ms": round(statistics.median(walls), 1),
+        "import_streamlit_app_ms": round(statistics.median(totals), 1),
+        "heaviest_direct_imports_ms": dict(heaviest),
+        "deferred": [m for m in HEAVY_MODULES if m not in loaded],
+        "loaded_at_import": loaded,
+    }
+
+
+def timed(fn, rounds):
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {"p50_ms": round(statistics.median(timings), 3), "p95_ms": round(timings[int(0.95 * (len(timings) - 1))], 3)}
+
+
+def rerun_overhead(reruns, apptest):
+    os.environ.update(BENCH_ENV)
+    import streamlit_app  # noqa: F401  (warms every import, as a running server would be)
+
+    with open(APP_FILE, "r", encoding="utf-8") as f:
+        code = compile(f.read(), APP_FILE, "exec")
+    results = {"module_body": timed(lambda: exec(code, {"__name__": "__rerun__", "__file__": APP_FILE}), reruns)}
+
+    if apptest:
+        from streamlit.testing.v1 import AppTest
+
+        at = AppTest.from_file(APP_FILE, default_timeout=60)
+        at.run()  # First run builds the cached resources; reruns reuse them
+        if at.exception:
+            raise RuntimeError(f"App raised during the first run: {at.exception}")
+        results["apptest"] = timed(at.run, reruns)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreter runs for the cold start")
+    parser.add_argument("--top", type=int, default=15, help="How many of the heaviest imports to list")
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--no-apptest", action="store_true", help="Skip the headless full-rerun timing")
+    parser.add_argument("--json", help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    results = {
+        "python": sys.version.split()[0],
+        "cold_start": cold_start(args.runs, args.top),
+        "rerun": rerun_overhead(args.reruns, not args.no_apptest),
+    }
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
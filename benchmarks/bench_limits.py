@@ -0,0 +1,162 @@
+"""
+Client-side rate limiting (plant_limits): upstream 429s, shedding and latency by priority.
+
+    python benchmarks/bench_limits.py [--callers 16] [--requests-per-caller 8] [--upstream-limit 20]
+                                      [--window-s 2] [--store memory|sqlite] [--json results.json]
+
+Starts a Gemini stub (benchmarks/stubs.py) that answers 429 beyond
+--upstream-limit requests per --window-s seconds (a per-minute limit, sped
+up), then runs --callers threads, half interactive and half batch, each
+sending --requests-per-caller requests:
+
+  unlimited   straight at the stub, as before the limiters: most of the burst
+              comes back 429
+  limited     through an UpstreamLimiter sized just under the stub's limit:
+              no 429s; interactive callers overtake queued batch work, and
+              requests that would wait past their budget are shed early
+  quota       a limiter with --daily-quota and no rate limit: batch callers
+              are shed once only the interactive reserve is left, then
+              interactive callers use up the rest
+
+Each run reports upstream successes and 429s, shed requests and p50 / p95
+latency (ms) per priority.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_e2e import summarize
+from plant_limits import (PRIORITY_BATCH, PRIORITY_INTERACTIVE, LimitStore, RateLimited, SQLiteLimitStore,
+                          UpstreamLimiter)
+from stubs import GeminiStub, StubConfig
+
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BATCH: "batch"}
+
+
+def call_stub(url):
+    """One POST to the stub: 'ok' or 'upstream_429'."""
+    request = urllib.request.Request(url, data=b"{}", headers={"Content-Type": "application/json"}, method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            response.read()
+        return "ok"
+    except urllib.error.HTTPError as e:
+        if e.code == 429:
+            return "upstream_429"
+        raise
+
+
+def run(url, limiter, callers, per_caller, order=None):
+    """Callers alternate interactive / batch (or follow `order`); returns per-priority outcomes."""
+    priorities = order or [PRIORITY_INTERACTIVE if i % 2 == 0 else PRIORITY_BATCH for i in range(callers)]
+    rows = {priority: [] for priority in set(priorities)}  # [(outcome, seconds)]
+    lock = threading.Lock()
+
+    def caller(priority):
+        for _ in range(per_caller):
+            started = time.perf_counter()
+            try:
+                if limiter is not None:
+                    limiter.acquire(priority)
+                outcome = call_stub(url)
+            except RateLimited:
+                outcome = "shed"
+            with lock:
+                rows[priority].append((outcome, time.perf_counter() - started))
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=caller, args=(priority,)) for priority in priorities]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    results = {"wall_s": round(wall, 3)}
+    for priority, outcomes in sorted(rows.items()):
+        served = [seconds for outcome, seconds in outcomes if outcome == "ok"]
+        results[PRIORITY_NAMES[priority]] = {
+            "ok": len(served),
+            "upstream_429": sum(outcome == "upstream_429" for outcome, _ in outcomes),
+            "shed": sum(outcome == "shed" for outcome, _ in outcomes),
+            "latency": summarize(served, wall),
+        }
+    return results
+
+
+def report(name, results):
+    print(f"\n{name} ({results['wall_s']} s)")
+    for priority in PRIORITY_NAMES.values():
+        if priority in results:
+            row = results[priority]
+            print(f"  {priority:<12} ok {row['ok']:<4} 429 {row['upstream_429']:<4} shed {row['shed']:<4} "
+                  f"p50 {row['latency']['p50_ms']:>9} ms  p95 {row['latency']['p95_ms']:>9} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--callers", type=int, default=16)
+    parser.add_argument("--requests-per-caller", type=int, default=8)
+    parser.add_argument("--upstream-limit", type=int, default=20, help="Stub requests allowed per window")
+    parser.add_argument("--window-s", type=float, default=2.0, help="Stub rate-limit window (60 in production)")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Stub response latency")
+    parser.add_argument("--daily-quota", type=int, default=40, help="Quota for the quota run")
+    parser.add_argument("--store", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    stub = GeminiStub(StubConfig(args.latency_ms, rate_limit_per_minute=args.upstream_limit,
+                                 rate_limit_window_s=args.window_s)).start()
+    url = stub.url + "/v1beta/models/bench:generateContent"
+    workdir = tempfile.mkdtemp(prefix="bench-limits-")
+    stores = iter(range(1000))
+
+    def make_store():
+        if args.store == "sqlite":
+            return SQLiteLimitStore(os.path.join(workdir, f"limits-{next(stores)}.db"))
+        return LimitStore()
+
+    def settle():  # Let the stub's window empty between runs
+        time.sleep(args.window_s)
+
+    results = {"settings": vars(args)}
+    results["unlimited"] = run(url, None, args.callers, args.requests_per_caller)
+    report("unlimited", results["unlimited"])
+
+    settle()
+    # A bucket never lets more than burst + rate * window through in one window; keep that under the stub's limit
+    burst = max(1.0, args.upstream_limit * 0.1)
+    rate_per_minute = (args.upstream_limit - burst) / args.window_s * 60
+    limiter = UpstreamLimiter("bench", rate_per_minute, burst=burst, store=make_store())
+    results["limited"] = run(url, limiter, args.callers, args.requests_per_caller)
+    report(f"limited ({rate_per_minute:.0f}/min, burst {burst:.0f})", results["limited"])
+
+    settle()
+    stub.config.rate_limit_per_minute = 0
+    limiter = UpstreamLimiter("bench-quota", 0, daily_quota=args.daily_quota, store=make_store())
+    batch_first = [PRIORITY_BATCH] * (args.callers // 2)
+    results["quota"] = run(url, limiter, len(batch_first), args.requests_per_caller, batch_first)
+    results["quota"].update(run(url, limiter, args.callers // 2, args.requests_per_caller,
+                                [PRIORITY_INTERACTIVE] * (args.callers // 2)))
+    report(f"quota ({args.daily_quota}/day, reserve {limiter.reserve}; batch then interactive)", results["quota"])
+
+    print(f"\nStub: {stub.requests} requests, {stub.rate_limited} answered 429")
+    stub.stop()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
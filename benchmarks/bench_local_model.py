@@ -0,0 +1,129 @@
+"""
+CPU latency/throughput benchmark for the offline local classifier.
+
+    python benchmarks/bench_local_model.py --model model.onnx --labels labels.txt
+    python benchmarks/bench_local_model.py --synthetic   # tiny generated model, measures pipeline overhead
+
+Reports warm-up time, single-image latency (p50/p95) and batched throughput.
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image
+
+import plant_data
+from plant_identifiers import IMAGE_SIZE, LocalOnnxBackend
+
+
+def make_synthetic_model(labels, path):
+    """Global-average-pool + linear layer over the care species, enough to exercise the full pipeline."""
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+
+    rng = np.random.default_rng(0)
+    weights = rng.standard_normal((3, len(labels))).astype(np.float32)
+    graph = helper.make_graph(
+        [
+            helper.make_node("GlobalAveragePool", ["input"], ["pooled"]),
+            helper.make_node("Flatten", ["pooled"], ["flat"]),
+            helper.make_node("MatMul", ["flat", "weights"], ["logits"]),
+        ],
+        "synthetic_plant_classifier",
+        [helper.make_tensor_value_info("input", TensorProto.FLOAT, ["batch", 3, IMAGE_SIZE, IMAGE_SIZE])],
+        [helper.make_tensor_value_info("logits", TensorProto.FLOAT, ["batch", len(labels)])],
+        [numpy_helper.from_array(weights, "weights")],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8  # Loadable by older ONNX Runtime releases too
+    onnx.save(model, path)
+
+
+def make_photos(count, size=(1024, 768)):
+    rng = np.random.default_rng(1)
+    photos = []
+    for _ in range(count):
+        buffer = io.BytesIO()
+        Image.fromarray(rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8)).save(buffer, format="JPEG")
+        photos.append(buffer.getvalue())
+    return photos
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model")
+    parser.add_argument("--labels")
+    parser.add_argument("--synthetic", action="store_true", help="Generate a tiny model over the care species")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--batch-sizes", default="1,8,32")
+    parser.add_argument("--threads", type=int, default=None, help="ONNX Runtime intra-op threads")
+    parser.add_argument("--json", help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    species = [p.get("Plant Name", "") for p in plant_data.load_plant_data()]
+    tmpdir = tempfile.TemporaryDirectory()
+    if args.synthetic:
+        args.model = os.path.join(tmpdir.name, "synthetic.onnx")
+        args.labels = os.path.join(tmpdir.name, "labels.txt")
+        with open(args.labels, "w", encoding="utf-8") as f:
+            f.write("\n".join(species))
+        make_synthetic_model(species, args.model)
+    elif not (args.model and args.labels):
+        parser.error("--model and --labels are required unless --synthetic is given")
+
+    started = time.perf_counter()
+    backend = LocalOnnxBackend(args.model, args.labels, species, num_threads=args.threads)
+    load_seconds = time.perf_counter() - started
+
+    batch_sizes = [int(b) for b in args.batch_sizes.split(",")]
+    photos = make_photos(max(batch_sizes))
+
+    single = []
+    preprocess = []
+    for i in range(args.iterations):
+        t0 = time.perf_counter()
+        backend.preprocess([photos[i % len(photos)]])
+        preprocess.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        backend.identify(photos[i % len(photos)])
+        single.append(time.perf_counter() - t0)
+
+    throughput = {}
+    for batch_size in batch_sizes:
+        batch = photos[:batch_size]
+        rounds = max(1, args.iterations // batch_size)
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            backend.identify_many(batch)
+        throughput[batch_size] = round(rounds * batch_size / (time.perf_counter() - t0), 1)
+
+    results = {
+        "species": len(backend.species),
+        "load_and_warmup_ms": round(load_seconds * 1000, 1),
+        "preprocess_p50_ms": round(statistics.median(preprocess) * 1000, 2),
+        "single_image_p50_ms": round(statistics.median(single) * 1000, 2),
+        "single_image_p95_ms": round(percentile(single, 95) * 1000, 2),
+        "batched_images_per_second": throughput,
+    }
+    for key, value in results.items():
+        print(f"{key:>28}: {value}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Retained memory of the care dataset as plain dicts vs compact PlantCareRecords.
+
+    python benchmarks/bench_record_memory.py [--scales 1,10,100]
+
+Each scale replicates the shipped care file N times (with unique plant names)
+and parses it from JSON text, as a real larger file would be. Reports the
+memory still held by the dataset after loading, measured with tracemalloc.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import plant_data
+from plant_records import to_records
+
+
+def scaled_json(records, scale):
+    out = []
+    for i in range(scale):
+        for record in records:
+            copy = dict(record)
+            if i:
+                copy["Plant Name"] = f"{record['Plant Name']} var{i}"
+            out.append(copy)
+    return json.dumps(out)
+
+
+def retained_bytes(build, text):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    dataset = build(text)
+    seconds = time.perf_counter() - started
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del dataset
+    return current, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="1,10,100")
+    parser.add_argument("--json", help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    with open(plant_data.PLANT_CARE_FILE, encoding="utf-8") as f:
+        base = json.load(f)
+
+    results = []
+    for scale in (int(s) for s in args.scales.split(",")):
+        text = scaled_json(base, scale)
+        dict_bytes, dict_seconds = retained_bytes(json.loads, text)
+        record_bytes, record_seconds = retained_bytes(lambda t: to_records(json.loads(t)), text)
+        row = {
+            "scale": scale,
+            "records": len(base) * scale,
+            "dicts_mib": round(dict_bytes / 2**20, 2),
+            "records_mib": round(record_bytes / 2**20, 2),
+            "reduction_pct": round(100 * (1 - record_bytes / dict_bytes), 1),
+            "dicts_load_s": round(dict_seconds, 3),
+            "records_load_s": round(record_seconds, 3),
+        }
+        results.append(row)
+        print(f"{scale:>4}x {row['records']:>7} records: dicts {row['dicts_mib']:>8} MiB -> "
+              f"PlantCareRecord {row['records_mib']:>8} MiB ({row['reduction_pct']}% less); "
+              f"load {row['dicts_load_s']}s -> {row['records_load_s']}s")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Cost of checking one minute of sensor readings: compiled, vectorised rules vs per-reading Python.
+
+    python benchmarks/bench_rules.py [--sensors 500] [--rounds 200]
+
+Each sensor is assigned a random care record; thresholds are compiled once
+(ThresholdTable). Every round is one reading per sensor. The baseline parses
+the care text and branches per reading in Python, as a naive port of the
+old plant_stats cutoffs to per-plant thresholds would. The deduplicator row
+times should_send for --dedup-keys distinct (sensor, alert kind) pairs, all
+still inside the window.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import plant_data
+from plant_rules import AlertDeduplicator, RulesEngine, ThresholdTable, compile_thresholds, fahrenheit_to_celsius
+
+
+def per_reading_python(readings, records_by_sensor):
+    alerts = []
+    for reading in readings:
+        profile = compile_thresholds(records_by_sensor[reading['sensor_id']])
+        if reading['moisture_value'] < profile['moisture_dry']:
+            alerts.append((reading['sensor_id'], 'needs_water'))
+        elif reading['moisture_value'] > profile['moisture_wet']:
+            alerts.append((reading['sensor_id'], 'too_wet'))
+        temp_c = float(fahrenheit_to_celsius(reading['temperature']))
+        if temp_c < profile['temp_low_c']:
+            alerts.append((reading['sensor_id'], 'too_cold'))
+        elif temp_c > profile['temp_high_c']:
+            alerts.append((reading['sensor_id'], 'too_hot'))
+    return alerts
+
+
+def timed(fn, rounds):
+    timings = []
+    for i in range(rounds):
+        started = time.perf_counter()
+        fn(i)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {"p50_ms": round(statistics.median(timings), 3), "p95_ms": round(timings[int(0.95 * (len(timings) - 1))], 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sensors", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--dedup-keys", type=int, default=20000)
+    parser.add_argument("--json", help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    records = [r for r in plant_data.load_plant_data() if r.get('Watering')]
+    records_by_sensor = {f"sensor-{i}": rng.choice(records) for i in range(args.sensors)}
+    minutes = [[{"sensor_id": s, "moisture_value": rng.randint(100, 1000), "temperature": rng.uniform(40, 95),
+                 "timestamp": 60.0 * m} for s in records_by_sensor] for m in range(args.rounds)]
+
+    started = time.perf_counter()
+    engine = RulesEngine(ThresholdTable(records_by_sensor), dedup_window_seconds=3600)
+    compile_ms = (time.perf_counter() - started) * 1000
+    deduplicator = AlertDeduplicator(window_seconds=3600)
+
+    def dedup_round(m):
+        for i in range(args.dedup_keys):
+            deduplicator.should_send(f"sensor-{i}", f"kind-{m}", 60.0 * m)
+
+    results = {
+        "sensors": args.sensors,
+        "compile_ms": round(compile_ms, 3),
+        "rules_engine": timed(lambda m: engine.evaluate(minutes[m]), args.rounds),
+        "per_reading_python": timed(lambda m: per_reading_python(minutes[m], records_by_sensor), args.rounds),
+        "deduplicator": timed(dedup_round, min(args.rounds, 20)),
+    }
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Full-text (BM25) search over the care database: build, persist/load and query latency.
+
+    python benchmarks/bench_search.py [--records 100000] [--iterations 200]
+
+Runs once on the shipped care file and once on a synthetic corpus of
+--records entries (the shipped records replicated, each with a unique plant
+name). Reports index build time, .npz save/load time and size, and query
+p50/p95 latency for a set of typical queries.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import plant_data
+from plant_records import to_records
+from plant_search import SearchIndex
+
+QUERIES = [
+    "pet safe low light",
+    "repot every spring",
+    "misting humidity tray",
+    "drought tolerant succulent",
+    "aloe",
+    "mysterious wanderer",
+]
+
+
+def measure_queries(index, iterations):
+    results = {}
+    for query in QUERIES:
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            index.search(query, limit=10)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        results[query] = {"p50_ms": round(statistics.median(timings), 3),
+                          "p95_ms": round(timings[int(0.95 * (len(timings) - 1))], 3)}
+    return results
+
+
+def run(name, records, iterations):
+    started = time.perf_counter()
+    index = SearchIndex.build(records)
+    build_seconds = time.perf_counter() - started
+
+    path = os.path.join(tempfile.mkdtemp(), "care.search-index.npz")
+    signature = (0, len(records))
+    started = time.perf_counter()
+    index.save(path, signature)
+    save_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    loaded = SearchIndex.load(path, signature)
+    load_seconds = time.perf_counter() - started
+    assert loaded is not None and loaded.search(QUERIES[0]) == index.search(QUERIES[0])
+
+    row = {
+        "records": len(records),
+        "terms": len(index.vocabulary),
+        "build_seconds": round(build_seconds, 3),
+        "save_seconds": round(save_seconds, 3),
+        "load_seconds": round(load_seconds, 3),
+        "index_mib": round(os.path.getsize(path) / 2**20, 2),
+        "queries": measure_queries(loaded, iterations),
+    }
+    print(f"\n{name}: {row['records']} records, {row['terms']} terms; build {row['build_seconds']}s, "
+          f"save {row['save_seconds']}s, load {row['load_seconds']}s ({row['index_mib']} MiB)")
+    for query, timing in row["queries"].items():
+        print(f"  {query:<30} p50 {timing['p50_ms']:>7} ms  p95 {timing['p95_ms']:>7} ms")
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=100_000)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--json", help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    with open(plant_data.PLANT_CARE_FILE, encoding="utf-8") as f:
+        base = json.load(f)
+    synthetic = [dict(base[i % len(base)], **{"Plant Name": f"{base[i % len(base)]['Plant Name']} {i}"})
+                 for i in range(args.records)]
+
+    results = {
+        "shipped": run("Shipped care file", to_records(base), args.iterations),
+        "synthetic": run("Synthetic corpus", to_records(synthetic), args.iterations),
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
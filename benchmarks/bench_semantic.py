@@ -0,0 +1,139 @@
+"""
+Semantic answer cache (plant_semantic): paraphrase hit rate, lookup latency vs. a Gemini round-trip, eviction.
+
+    python benchmarks/bench_semantic.py [--latency-ms 300] [--turns 50] [--stored 32] [--json results.json]
+
+Starts a stub Gemini server (benchmarks/stubs.py) and:
+
+  paraphrases  asks each topic's first question (a model round-trip, stored),
+               then its paraphrases (should hit) and questions on other topics
+               (should miss); reports hits and false hits
+  latency      SemanticAnswerCache.lookup() hits and misses against a plant
+               holding --stored questions, chat_with_plant() answered from the
+               cache, and chat_with_plant() going to the stub (--latency-ms)
+  eviction     a cache capped at 4 answers per plant and 3 plants: size stays
+               bounded and evictions are counted
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_e2e import summarize
+from stubs import UNLIMITED_ENV, GeminiStub, StubConfig
+
+# First question of each topic is asked (and stored) first; the rest should be answered from the cache
+PARAPHRASES = {
+    "water": ["How often should I water you?", "How much water do you need?", "When do I need to water you?",
+              "how often do you need watering", "Are you thirsty a lot?"],
+    "light": ["How much light do you need?", "Do you like bright light?", "how much sun do you need",
+              "Do you need a lot of sunlight?"],
+    "toxic": ["Are you toxic to pets?", "Are you poisonous to cats?", "Is it safe to have you around my dog?"],
+    "temperature": ["What temperature do you like?", "What's the ideal temperature for you?",
+                    "what temp do you prefer"],
+    "feed": ["When should I feed you?", "How often should I fertilize you?", "Do you need fertilizer?"],
+    "yellow": ["Why are your leaves turning yellow?", "why are your leaves yellow", "Why are my leaves going yellow?"],
+}
+# Different questions that share words with the topics above: reusing an answer for these would be wrong
+UNRELATED = ["Why are your leaves brown?", "How often should I repot you?", "Can you live in low light?",
+             "Do you like cold water?", "What temperature is too cold for you?", "Can I put you outside in winter?",
+             "How big will you grow?", "Are you safe for my kid?", "Tell me a joke"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Stub Gemini latency")
+    parser.add_argument("--turns", type=int, default=50, help="Timed calls per latency case")
+    parser.add_argument("--stored", type=int, default=32, help="Questions stored for the plant in the lookup cases")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    gemini = GeminiStub(StubConfig(args.latency_ms, seed=args.seed)).start()
+    # Must be in place before api_config is imported (it reads the environment once)
+    # (and no pre-generated answers: every cached answer comes from a round-trip in this run)
+    no_table = os.path.join(tempfile.mkdtemp(prefix="bench-semantic-"), "plants.chat-warm.json")
+    os.environ.update({"GEMINI_API_URL": gemini.url, "GEMINI_API_KEY": "bench", "CHAT_WARM_FILE": no_table,
+                       **UNLIMITED_ENV})
+    import plant_chat
+    import plant_data
+    from plant_metrics import REGISTRY
+    from plant_semantic import QUESTION_CORPUS, SemanticAnswerCache, get_answer_cache
+
+    rng = random.Random(args.seed)
+    records = [r for r in plant_data.load_plant_data() if r.get('Plant Name')]
+    results = {"settings": vars(args)}
+    ask = lambda care_info, question: plant_chat.chat_with_plant(care_info, [{"role": "user", "content": question}])
+
+    care_info = records[0]
+    hits = false_hits = 0
+    paraphrases = sum(len(questions) - 1 for questions in PARAPHRASES.values())
+    for questions in PARAPHRASES.values():
+        ask(care_info, questions[0])
+        for question in questions[1:]:
+            before = gemini.requests
+            ask(care_info, question)
+            hits += gemini.requests == before
+    for question in UNRELATED:
+        before = gemini.requests
+        ask(care_info, question)
+        false_hits += gemini.requests == before
+    results["paraphrases"] = {"paraphrases": paraphrases, "hits": hits, "unrelated": len(UNRELATED),
+                              "false_hits": false_hits}
+    print(f"paraphrases  {hits}/{paraphrases} answered from the cache, "
+          f"{false_hits}/{len(UNRELATED)} unrelated questions wrongly answered from it")
+
+    def timed(calls):
+        timings = []
+        started = time.perf_counter()
+        for fn in calls:
+            t = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - t)
+        return summarize(timings, time.perf_counter() - started)
+
+    cache = SemanticAnswerCache()
+    stored = (list(QUESTION_CORPUS) * (args.stored // len(QUESTION_CORPUS) + 1))[:args.stored]
+    for i, question in enumerate(stored):
+        cache.store("bench", f"{question} ({i})" if i >= len(QUESTION_CORPUS) else question, f"Answer {i}")
+    hit_questions = [q for questions in PARAPHRASES.values() for q in questions[1:]]
+    results["latency"] = {
+        "lookup_hit": timed([lambda: cache.lookup("bench", rng.choice(hit_questions))] * args.turns),
+        "lookup_miss": timed([lambda: cache.lookup("bench", "Tell me a joke about " + rng.choice("abcdef"))]
+                             * args.turns),
+        "chat_cached": timed([lambda: ask(care_info, rng.choice(hit_questions))] * args.turns),
+        # A plant not asked before, and a question it has not heard: always a round-trip
+        "chat_model": timed([lambda i=i: ask(rng.choice(records[1:]), f"Question {i} about gardening")
+                             for i in range(args.turns)]),
+    }
+    for name, stats in results["latency"].items():
+        print(f"{name:<12} p50 {stats['p50_ms']:>9} ms  p95 {stats['p95_ms']:>9} ms  max {stats['max_ms']:>9} ms")
+
+    evicted = lambda: sum(row["value"] for row in REGISTRY.snapshot()["counters"].get("plant_semantic_cache_total", [])
+                          if row["labels"]["result"] == "evicted")
+    before = evicted()
+    small = SemanticAnswerCache(max_plants=3, max_per_plant=4)
+    for plant in range(5):
+        for i in range(8):
+            small.store(f"plant-{plant}", f"question{i}", "answer")
+    results["eviction"] = {"stored": 5 * 8, "kept": len(small), "evicted": evicted() - before}
+    print(f"eviction     5 plants x 8 answers into 3 plants x 4: kept {len(small)}, "
+          f"evicted {results['eviction']['evicted']:.0f}")
+    print(f"hit rate     {get_answer_cache().hit_rate():.2f} over this run's chats")
+
+    gemini.stop()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+API check: /identify answers each kind of identification outcome with its own HTTP status.
+
+    python benchmarks/check_api_status.py [--port 8766]
+
+Starts a stub PlantNet server (benchmarks/stubs.py) and the API (plant_api.py)
+in-process, makes the stub answer each way below and compares the status
+/identify returns:
+
+  identified           stub answers 200     -> 200
+  no match             stub answers 404     -> 404 (PlantNet found no species)
+  rejected             stub answers 400     -> 422 (PlantNet refused the photos)
+  plantnet down        stub answers 503     -> 502 (PlantNet could not answer)
+  circuit open         outage continues     -> 503 with Retry-After
+
+Prints one PASS/FAIL line per case and exits with status 1 if any failed.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stubs import UNLIMITED_ENV, PlantNetStub, StubConfig
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    plantnet = PlantNetStub(StubConfig()).start()
+    # Must be in place before api_config is imported (it reads the environment once)
+    os.environ.update({"PLANTNET_API_URL": plantnet.url, "PLANTNET_API_KEY": "check", "CACHE_URL": "",
+                       **UNLIMITED_ENV})
+    import requests
+    import uvicorn
+
+    from plant_api import app
+    from plant_circuit import MIN_CALLS
+
+    server = uvicorn.Server(uvicorn.Config(app, port=args.port, log_level="error"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    url = f"http://127.0.0.1:{args.port}/identify"
+    photos = (f"photo-{i}".encode() for i in range(1000))  # Distinct, so nothing is served from the cache
+    failures = 0
+
+    def check(name, stub_status, expected):
+        nonlocal failures
+        plantnet.config.error_rate = 0.0 if stub_status == 200 else 1.0
+        plantnet.config.error_status = stub_status
+        response = requests.post(url, data=next(photos), headers={"content-type": "image/jpeg"}, timeout=30)
+        passed = response.status_code == expected
+        failures += not passed
+        print(f"{'PASS' if passed else 'FAIL'}  {name:<16} stub {stub_status} -> {response.status_code} "
+              f"(expected {expected}) {response.json().get('error', '')[:60]}")
+        return response
+
+    check("identified", 200, 200)
+    check("no match", 404, 404)
+    check("rejected", 400, 422)
+    check("plantnet down", 503, 502)
+    for _ in range(MIN_CALLS):  # Enough further failures to open the breaker
+        requests.post(url, data=next(photos), headers={"content-type": "image/jpeg"}, timeout=30)
+    response = check("circuit open", 503, 503)
+    if "Retry-After" not in response.headers:
+        failures += 1
+        print("FAIL  circuit open     no Retry-After header")
+
+    server.should_exit = True
+    plantnet.stop()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
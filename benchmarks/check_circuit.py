@@ -0,0 +1,167 @@
+"""
+Outage check: the PlantNet and Gemini circuit breakers (plant_circuit) open, fail fast,
+degrade to fallbacks and recover.
+
+    python benchmarks/check_circuit.py [--latency-ms 50] [--open-seconds 1]
+
+Starts stub PlantNet and Gemini servers (benchmarks/stubs.py), injects
+outages into them and, for each case below, compares the stub's request
+count, the answers and their latency with what the breaker should do:
+
+  plantnet errors      stub answers 503     -> ~MIN_CALLS requests, then fast errors (circuit_open)
+  cached while open    photo seen before    -> identify() serves it from the cache, no request
+  local fallback       photo not seen       -> cascade answers with the local guess, no request
+  plantnet recovers    stub healthy again   -> one probe after --open-seconds closes the circuit
+  probe fails          outage continues     -> one probe, then open again
+  plantnet slow        stub slower than the slow-call threshold -> opens on latency alone
+  gemini errors        stub answers 503     -> chat replies from the care profile, no request
+  gemini stream        circuit still open   -> the streamed reply is that same offline answer
+  metrics              state gauges and transition counters are exported
+
+Prints one PASS/FAIL line per case and exits with status 1 if any failed.
+"""
+import argparse
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stubs import UNLIMITED_ENV, GeminiStub, PlantNetStub, StubConfig
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Stub latency when healthy")
+    parser.add_argument("--open-seconds", type=float, default=1.0, help="Breaker open period (30 s in the app)")
+    args = parser.parse_args()
+
+    plantnet = PlantNetStub(StubConfig(args.latency_ms)).start()
+    gemini = GeminiStub(StubConfig(args.latency_ms)).start()
+    # Must be in place before api_config is imported (it reads the environment once)
+    os.environ.update({"PLANTNET_API_URL": plantnet.url, "GEMINI_API_URL": gemini.url,
+                       "PLANTNET_API_KEY": "check", "GEMINI_API_KEY": "check", "CACHE_URL": "",
+                       **UNLIMITED_ENV})
+    import plant_chat
+    import plant_data
+    import plant_identification
+    from plant_circuit import CLOSED, MIN_CALLS, OPEN, get_breaker
+    from plant_identifiers import CascadeIdentifier, IdentifierBackend, PlantNetBackend
+    from plant_metrics import REGISTRY
+
+    plantnet_breaker, gemini_breaker = get_breaker("plantnet"), get_breaker("gemini")
+    for breaker in (plantnet_breaker, gemini_breaker):
+        breaker.open_seconds = args.open_seconds
+    fast = args.latency_ms / 1000 / 2  # A fast-failed call doesn't reach the stub at all
+    failures = 0
+    photos = (f"photo-{i}".encode() for i in range(1000))  # Distinct, so single-flight never merges calls
+
+    def check(name, passed, detail):
+        nonlocal failures
+        failures += not passed
+        print(f"{'PASS' if passed else 'FAIL'}  {name:<20} {detail}")
+
+    def timed(fn, *fn_args):
+        started = time.perf_counter()
+        result = fn(*fn_args)
+        return result, time.perf_counter() - started
+
+    def calls(stub, fn, count):
+        """`count` sequential calls with fresh photos: (results, upstream requests made, slowest fast-failed call)."""
+        before = stub.requests
+        outcomes = [timed(fn, next(photos)) for _ in range(count)]
+        rejected = [seconds for result, seconds in outcomes if result.get('circuit_open')]
+        return [result for result, _ in outcomes], stub.requests - before, max(rejected, default=0.0)
+
+    cached_photo = b"cached-photo"
+    plant_identification.identify(cached_photo)
+
+    plantnet.config.error_rate = 1.0
+    expected = MIN_CALLS - 1  # The warm-up success above is in the window too
+    results, made, slowest = calls(plantnet, plant_identification.identify_plant, MIN_CALLS + 5)
+    rejected = sum(bool(r.get('circuit_open')) for r in results)
+    check("plantnet errors", made == expected and rejected == MIN_CALLS + 5 - expected and slowest < fast
+          and plantnet_breaker.state == OPEN,
+          f"{MIN_CALLS + 5} calls -> {made} requests (expected {expected}), {rejected} failed fast "
+          f"(slowest {slowest * 1000:.1f} ms), state {plantnet_breaker.state}")
+
+    before = plantnet.requests
+    result, seconds = timed(plant_identification.identify, cached_photo)
+    check("cached while open", 'error' not in result and plantnet.requests == before,
+          f"{result.get('scientific_name', result.get('error'))} in {seconds * 1000:.1f} ms, "
+          f"{plantnet.requests - before} requests")
+
+    class OfflineGuess(IdentifierBackend):
+        """Stands in for the local classifier: always the same low-confidence guess."""
+        name = "local"
+
+        def identify(self, images):
+            return {'scientific_name': "Monstera deliciosa", 'common_name': "Swiss cheese plant",
+                    'confidence': 40.0, 'candidates': [], 'source': self.name}
+
+    cascade = CascadeIdentifier(PlantNetBackend(plant_identification.identify_plant), OfflineGuess())
+    before = plantnet.requests
+    result, seconds = timed(cascade.identify, next(photos))
+    check("local fallback", result.get('fallback') is True and plantnet.requests == before and seconds < fast,
+          f"{result.get('scientific_name')} (fallback={result.get('fallback')}) in {seconds * 1000:.1f} ms")
+
+    plantnet.config.error_rate = 0.0
+    time.sleep(args.open_seconds)
+    results, made, _ = calls(plantnet, plant_identification.identify_plant, 3)
+    check("plantnet recovers", made == 3 and all('error' not in r for r in results)
+          and plantnet_breaker.state == CLOSED,
+          f"after {args.open_seconds} s: 3 calls -> {made} requests, state {plantnet_breaker.state}")
+
+    plantnet.config.error_rate = 1.0
+    calls(plantnet, plant_identification.identify_plant, MIN_CALLS)
+    time.sleep(args.open_seconds)
+    results, made, _ = calls(plantnet, plant_identification.identify_plant, 3)
+    check("probe fails", made == 1 and plantnet_breaker.state == OPEN,
+          f"3 calls after {args.open_seconds} s -> {made} probe request(s) (expected 1), "
+          f"state {plantnet_breaker.state}")
+
+    plantnet.config.error_rate = 0.0
+    time.sleep(args.open_seconds)
+    calls(plantnet, plant_identification.identify_plant, 1)  # Probe succeeds: closed again
+    plantnet_breaker.slow_call_seconds = args.latency_ms / 1000 * 2
+    plantnet.config.latency_ms = args.latency_ms * 4
+    results, made, slowest = calls(plantnet, plant_identification.identify_plant, MIN_CALLS + 3)
+    check("plantnet slow", made == MIN_CALLS and all('error' not in r for r in results[:MIN_CALLS])
+          and plantnet_breaker.state == OPEN,
+          f"{MIN_CALLS} slow successes opened it: {MIN_CALLS + 3} calls -> {made} requests, "
+          f"state {plantnet_breaker.state}")
+    plantnet.config.latency_ms = args.latency_ms
+
+    care_info = plant_data.get_plant("Monstera deliciosa") or plant_data.load_plant_data()[0]
+    history = [{"role": "user", "content": "How often should I water you?"}]
+    gemini.config.error_rate = 1.0
+    before = gemini.requests
+    for i in range(MIN_CALLS):  # Distinct questions, so single-flight never merges them
+        plant_chat.chat_with_plant(care_info, history + [{"role": "user", "content": f"Question {i}"}])
+    reply, seconds = timed(plant_chat.chat_with_plant, care_info, history)
+    check("gemini errors", gemini.requests - before == MIN_CALLS and seconds < fast
+          and care_info.get('Watering', '') in reply,
+          f"{gemini.requests - before} requests, then in {seconds * 1000:.1f} ms: {reply!r}")
+
+    before = gemini.requests
+    pieces = list(plant_chat.stream_chat_with_plant(care_info, history))
+    check("gemini stream", pieces == [reply] and gemini.requests == before,
+          f"{len(pieces)} piece(s), {gemini.requests - before} requests")
+
+    snapshot = REGISTRY.snapshot()
+    gauges = {name: snapshot["gauges"].get(f"plant_{name}_circuit_state") for name in ("plantnet", "gemini")}
+    events = {(row["labels"]["upstream"], row["labels"]["event"]): row["value"]
+              for row in snapshot["counters"].get("plant_circuit_total", [])}
+    check("metrics", gauges == {"plantnet": 2.0, "gemini": 2.0} and events.get(("plantnet", "open"), 0) >= 3,
+          f"state gauges {gauges}; plantnet opened {events.get(('plantnet', 'open'), 0):.0f}x, "
+          f"rejected {events.get(('plantnet', 'rejected'), 0):.0f} call(s)")
+
+    plantnet.stop()
+    gemini.stop()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
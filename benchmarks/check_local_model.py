@@ -0,0 +1,76 @@
+"""
+Correctness check for the local classifier's confidence (plant_identifiers).
+
+    python benchmarks/check_local_model.py
+
+  out of catalog   most of the model's mass on a species not in the care DB
+                   -> the best catalog species stays below LOCAL_MODEL_CONFIDENCE
+                      and the cascade asks PlantNet
+  in catalog       mass on a catalog species -> the local answer is used as is
+
+Prints one PASS/FAIL line per case and exits with status 1 if any failed.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from api_config import LOCAL_MODEL_CONFIDENCE
+from plant_identifiers import CascadeIdentifier, IdentifierBackend, catalog_probabilities
+
+# Model outputs: columns 0 and 1 are care-DB species, column 2 is not
+COLUMNS = np.array([0, 1], dtype=np.int64)
+LABELS = ["Monstera deliciosa", "Ficus lyrata"]
+
+
+class FixedLogits(IdentifierBackend):
+    """A local backend whose model always returns `logits`."""
+
+    name = "local"
+
+    def __init__(self, logits):
+        self.logits = np.array([logits], dtype=np.float32)
+
+    def identify(self, images):
+        proba = catalog_probabilities(self.logits, COLUMNS)[0]
+        best = int(np.argmax(proba))
+        return {'scientific_name': LABELS[best], 'common_name': 'Unknown',
+                'confidence': round(float(proba[best]) * 100, 1), 'source': self.name}
+
+
+class CountingRemote(IdentifierBackend):
+    name = "plantnet"
+
+    def __init__(self):
+        self.calls = 0
+
+    def identify(self, images):
+        self.calls += 1
+        return {'scientific_name': "Alocasia zebrina", 'common_name': 'Unknown', 'confidence': 91.0,
+                'source': self.name}
+
+
+def main():
+    failures = 0
+
+    def check(name, ok, detail):
+        nonlocal failures
+        failures += not ok
+        print(f"{'PASS' if ok else 'FAIL'}  {name:<16} {detail}")
+
+    for name, logits, want_remote in (("out of catalog", [2.0, 0.0, 5.0], True),
+                                      ("in catalog", [5.0, 0.0, 1.0], False)):
+        remote = CountingRemote()
+        local = FixedLogits(logits)
+        result = CascadeIdentifier(remote, local, confidence_threshold=LOCAL_MODEL_CONFIDENCE).identify(b"photo")
+        confidence = local.identify(b"photo")['confidence']
+        check(name, (remote.calls == 1) == want_remote and (confidence < LOCAL_MODEL_CONFIDENCE) == want_remote,
+              f"local confidence {confidence}% (threshold {LOCAL_MODEL_CONFIDENCE}%), "
+              f"answered by {result['source']}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Correctness check for compact care records (plant_records): pickling and copying.
+
+    python benchmarks/check_records.py
+
+Round-trips every record of the shipped care file, and records with missing
+keys, explicit nulls and extra keys, through pickle (as st.cache_data and
+session state do) and copy.deepcopy, and checks that each copy reads the
+same: same keys, same values, missing keys still missing.
+
+Prints one PASS/FAIL line per case and exits with status 1 if any failed.
+"""
+import copy
+import json
+import os
+import pickle
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import plant_data
+from plant_records import to_records
+
+EDGE_CASES = [
+    {"Plant Name": "Sparse"},
+    {"Plant Name": "Nulls", "Watering": None, "Personality": {"Title": None, "Traits": ["calm"]}},
+    {"Plant Name": "Extra", "Scientific Name": "Ficus lyrata", "Common Names": ["Fiddle-leaf fig"],
+     "Notes": {"source": "nursery", "tags": ["indoor", {"level": 2}]}, "Personality": "unexpected shape"},
+]
+
+
+def as_json(record):
+    return json.dumps(record, default=lambda v: dict(v) if hasattr(v, "keys") else list(v), sort_keys=True)
+
+
+def main():
+    with open(plant_data.PLANT_CARE_FILE, "r", encoding="utf-8") as f:
+        raw = json.load(f) + EDGE_CASES
+    records = to_records(raw)
+    failures = 0
+    for name, roundtrip in (("pickle", lambda r: pickle.loads(pickle.dumps(r))), ("deepcopy", copy.deepcopy)):
+        bad = []
+        for original, record in zip(raw, records):
+            copied = roundtrip(record)
+            missing_ok = all(copied.get(key, "default") == "default" for key in ("Nope", "Watering")
+                             if key not in original)
+            if as_json(copied) != json.dumps(original, sort_keys=True) or set(copied) != set(original) \
+                    or not missing_ok:
+                bad.append(original.get("Plant Name"))
+        failures += bool(bad)
+        print(f"{'FAIL' if bad else 'PASS'}  {name:<9} {len(records)} records round-tripped"
+              + (f"; differ: {bad[:5]}" if bad else ""))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
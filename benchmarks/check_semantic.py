@@ -0,0 +1,49 @@
+"""
+Semantic cache check: paraphrases of a stored chat question reuse its answer, different questions don't.
+
+    python benchmarks/check_semantic.py
+
+Stores answers in a fresh SemanticAnswerCache (plant_semantic) and, for each
+case below, looks up a question at the app's CHAT_SEMANTIC_THRESHOLD:
+
+  pets paraphrase      "Are you poisonous to cats?"  -> the "toxic to pets" answer
+  children paraphrase  "Are you toxic to kids?"      -> the "poisonous to children" answer
+  kid vs pets          "Are you safe for my kid?"    -> not the "toxic to pets" answer
+
+Prints one PASS/FAIL line per case and exits with status 1 if any failed.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from plant_semantic import SemanticAnswerCache
+
+PETS_ANSWER = "*wiggles leaves* Yes, keep me away from cats and dogs."
+CHILDREN_ANSWER = "*rustles* Please keep little hands away from my leaves."
+
+CASES = [
+    # (name, stored question, stored answer, asked question, should hit)
+    ("pets paraphrase", "Are you toxic to pets?", PETS_ANSWER, "Are you poisonous to cats?", True),
+    ("children paraphrase", "Are you poisonous to children?", CHILDREN_ANSWER, "Are you toxic to kids?", True),
+    ("kid vs pets", "Are you toxic to pets?", PETS_ANSWER, "Are you safe for my kid?", False),
+]
+
+
+def main():
+    failures = 0
+    for name, stored, answer, asked, should_hit in CASES:
+        cache = SemanticAnswerCache()
+        cache.store("plant", stored, answer)
+        found = cache.lookup("plant", asked)
+        hit = found is not None and found[0] == answer
+        passed = hit == should_hit
+        failures += not passed
+        similarity = f"{found[1]:.2f}" if found else f"< {cache.threshold}"
+        print(f"{'PASS' if passed else 'FAIL'}  {name:<20} {asked!r} -> {'hit' if hit else 'miss'} "
+              f"(expected {'hit' if should_hit else 'miss'}, similarity {similarity})")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Concurrency check: N simultaneous identical upstream calls make exactly one request.
+
+    python benchmarks/check_single_flight.py [--callers 32] [--latency-ms 300]
+
+Starts stub PlantNet and Gemini servers (benchmarks/stubs.py), then releases
+--callers threads at once for each case below and compares the stub's
+request count with what single-flight should allow:
+
+  identify_plant          same photo              -> 1 PlantNet request, one shared result
+  identify_plant (error)  same photo, stub fails  -> 1 request, every caller gets the error
+  identify (cached path)  same photo, cold cache  -> 1 request, then served from the cache
+  identify_plant x2       two different photos    -> 2 requests (no false sharing)
+  send_message            same messages           -> 1 Gemini request, one shared reply
+  follower timeout        leader slower than the wait -> followers get FlightTimeout
+
+Prints one PASS/FAIL line per case and exits with status 1 if any failed.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stubs import UNLIMITED_ENV, GeminiStub, PlantNetStub, StubConfig
+
+
+def burst(fn, args_list):
+    """Call fn(*args) from one thread per entry, all released together; returns results (or exceptions)."""
+    barrier = threading.Barrier(len(args_list))
+    results = [None] * len(args_list)
+
+    def run(i, args):
+        barrier.wait()
+        try:
+            results[i] = fn(*args)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i, args)) for i, args in enumerate(args_list)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--callers", type=int, default=32)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Stub latency (must outlast the burst)")
+    args = parser.parse_args()
+
+    plantnet = PlantNetStub(StubConfig(args.latency_ms)).start()
+    gemini = GeminiStub(StubConfig(args.latency_ms)).start()
+    # Must be in place before api_config is imported (it reads the environment once)
+    os.environ.update({"PLANTNET_API_URL": plantnet.url, "GEMINI_API_URL": gemini.url,
+                       "PLANTNET_API_KEY": "check", "GEMINI_API_KEY": "check", "CACHE_URL": "",
+                       **UNLIMITED_ENV})
+    import plant_chat
+    import plant_identification
+    from plant_cache import FlightTimeout, SingleFlight
+
+    n = args.callers
+    failures = 0
+
+    def check(name, stub, expected_requests, results, ok):
+        nonlocal failures
+        before = check.counts.get(stub, 0)
+        made = stub.requests - before
+        check.counts[stub] = stub.requests
+        passed = made == expected_requests and ok(results)
+        failures += not passed
+        print(f"{'PASS' if passed else 'FAIL'}  {name:<24} {n} callers -> {made} upstream request(s) "
+              f"(expected {expected_requests})")
+    check.counts = {}
+
+    same = lambda results: all(r == results[0] for r in results) and not isinstance(results[0], Exception)
+
+    photo = b"viral-plant-photo"
+    results = burst(plant_identification.identify_plant, [(photo,)] * n)
+    check("identify_plant", plantnet, 1, results, lambda r: same(r) and 'error' not in r[0])
+
+    plantnet.config.error_rate = 1.0
+    results = burst(plant_identification.identify_plant, [(b"failing-photo",)] * n)
+    check("identify_plant (error)", plantnet, 1, results, lambda r: same(r) and 'error' in r[0])
+    plantnet.config.error_rate = 0.0
+
+    results = burst(plant_identification.identify, [(b"cached-photo",)] * n)
+    check("identify (cached path)", plantnet, 1, results, lambda r: same(r) and 'error' not in r[0])
+    results = burst(plant_identification.identify, [(b"cached-photo",)] * n)
+    check("identify (cache hit)", plantnet, 0, results, same)
+
+    results = burst(plant_identification.identify_plant, [(b"photo-a",), (b"photo-b",)] * (n // 2))
+    check("identify_plant x2", plantnet, 2, results,
+          lambda r: len({x['scientific_name'] for x in r if isinstance(x, dict) and 'error' not in x}) <= 2)
+
+    messages = [{"role": "user", "parts": [{"text": "How often should I water you?"}]}]
+    results = burst(plant_chat.send_message, [(messages,)] * n)
+    check("send_message", gemini, 1, results, same)
+
+    flight = SingleFlight("check", timeout=0.05)
+    results = burst(lambda: flight.do("slow", lambda: time.sleep(0.5) or "done"), [()] * n)
+    timeouts = sum(isinstance(r, FlightTimeout) for r in results)
+    passed = results.count("done") == 1 and timeouts == n - 1
+    failures += not passed
+    print(f"{'PASS' if passed else 'FAIL'}  {'follower timeout':<24} {n} callers -> 1 leader finished, "
+          f"{timeouts} follower(s) timed out (expected {n - 1})")
+
+    plantnet.stop()
+    gemini.stop()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
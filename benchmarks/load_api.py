@@ -0,0 +1,273 @@
+"""
+Load test for the headless API (plant_api.py).
+
+    python benchmarks/load_api.py [--workers 4] [--concurrency 32] [--requests 2000]
+                                  [--mix identify=1,care=2,care_batch=2,chat=1,chat_stream=2]
+                                  [--url http://host:8000] [--json results.json]
+
+Without --url it starts stub PlantNet and Gemini servers (benchmarks/stubs.py),
+then `plant_api.py --workers N` pointed at them, and waits for /health. Each
+client thread keeps one HTTP/1.1 connection open and sends requests drawn
+from --mix:
+
+  identify      POST /identify with one of --distinct-images JPEGs (repeats hit the cache)
+  care          GET /care?name=... (exact and misspelt names from the care database)
+  care_batch    POST /care with --batch-size names and 2 suggestions each
+  chat          POST /chat, JSON reply
+  chat_stream   POST /chat, server-sent events; also reports time to the first piece
+
+and reports count, errors, p50 / p95 / p99 latency (ms) and throughput per
+endpoint, plus the server's own request counters from /metrics.json.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_e2e import make_jpeg, summarize
+from stubs import UNLIMITED_ENV, GeminiStub, PlantNetStub, StubConfig
+
+DEFAULT_MIX = "identify=1,care=2,care_batch=2,chat=1,chat_stream=2"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args):
+    """Stubs + `plant_api.py` subprocess; returns (base_url, process, stubs)."""
+    make_config = lambda offset: StubConfig(args.latency_ms, args.jitter_ms, args.error_rate,
+                                            seed=args.seed + offset, chunk_delay_ms=args.chunk_delay_ms)
+    stubs = [PlantNetStub(make_config(1)).start(), GeminiStub(make_config(2)).start()]
+    env = dict(os.environ, PLANTNET_API_URL=stubs[0].url, GEMINI_API_URL=stubs[1].url,
+               PLANTNET_API_KEY="bench", GEMINI_API_KEY="bench", **UNLIMITED_ENV)
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(REPO_ROOT, "plant_api.py"), "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers)],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL)
+    return f"http://127.0.0.1:{port}", process, stubs
+
+
+def wait_healthy(base_url, timeout):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(base_url + "/health", timeout=5) as response:
+                return json.loads(response.read())
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario '{name}'; use {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def misspell(name, rng):
+    if len(name) < 5:
+        return name
+    i = rng.randrange(1, len(name) - 1)
+    return name[:i] + name[i + 1:]
+
+
+class Client:
+    """One keep-alive connection; each call returns (status, seconds, seconds to first piece or None)."""
+
+    def __init__(self, base_url, timeout):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self.timeout = timeout
+        self.conn = None
+
+    def request(self, method, path, body=None, headers=None, stream=False):
+        started = time.perf_counter()
+        first_piece = None
+        for attempt in range(2):  # Reconnect once if the server closed an idle connection
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.conn.request(method, path, body=body, headers=headers or {})
+                response = self.conn.getresponse()
+                if stream and response.status == 200:
+                    for line in response:  # Chunked SSE: one `data:` line per piece
+                        if first_piece is None and line.startswith(b"data:"):
+                            first_piece = time.perf_counter() - started
+                else:
+                    response.read()
+                return response.status, time.perf_counter() - started, first_piece
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+
+
+def _identify(client, ctx, rng):
+    image = rng.choice(ctx["images"])
+    return client.request("POST", "/identify", image, {"Content-Type": "image/jpeg"})
+
+
+def _care(client, ctx, rng):
+    return client.request("GET", "/care?" + urllib.parse.urlencode({"name": ctx["name"](rng)}))
+
+
+def _care_batch(client, ctx, rng):
+    body = json.dumps({"queries": [ctx["name"](rng) for _ in range(ctx["batch_size"])], "suggestions": 2})
+    return client.request("POST", "/care", body, {"Content-Type": "application/json"})
+
+
+def _chat_body(ctx, rng, stream):
+    return json.dumps({"plant_name": ctx["name"](rng), "stream": stream,
+                       "history": [{"role": "user", "content": "How often should I water you?"}]})
+
+
+def _chat(client, ctx, rng):
+    return client.request("POST", "/chat", _chat_body(ctx, rng, False), {"Content-Type": "application/json"})
+
+
+def _chat_stream(client, ctx, rng):
+    return client.request("POST", "/chat", _chat_body(ctx, rng, True), {"Content-Type": "application/json"},
+                          stream=True)
+
+
+SCENARIOS = {"identify": _identify, "care": _care, "care_batch": _care_batch, "chat": _chat,
+             "chat_stream": _chat_stream}
+
+
+def run_load(base_url, mix, ctx, requests, concurrency, timeout, seed):
+    names, weights = list(mix), list(mix.values())
+    outcomes = {name: [] for name in names}  # [(status, seconds, first_piece)]
+    lock = threading.Lock()
+    remaining = [requests]
+
+    def worker(worker_id):
+        rng = random.Random(seed * 1000 + worker_id)
+        client = Client(base_url, timeout)
+        try:
+            while True:
+                with lock:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+                name = rng.choices(names, weights)[0]
+                try:
+                    outcome = SCENARIOS[name](client, ctx, rng)
+                except OSError as e:
+                    print(f"WARN: {name} request failed: {e}")
+                    outcome = (0, timeout, None)
+                with lock:
+                    outcomes[name].append(outcome)
+        finally:
+            client.close()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Load an already running API instead of starting one")
+    parser.add_argument("--workers", type=int, default=4, help="uvicorn workers for the started server")
+    parser.add_argument("--concurrency", type=int, default=32, help="Client threads (one connection each)")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--batch-size", type=int, default=20, help="Names per care_batch request")
+    parser.add_argument("--distinct-images", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Stub response latency")
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--chunk-delay-ms", type=float, default=30.0, help="Delay between streamed chat pieces")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    import plant_data
+    care_names = [p.get('Plant Name') for p in plant_data.load_plant_data() if p.get('Plant Name')]
+
+    def pick_name(rng):  # One in five misspelt, so fuzzy matching is exercised too
+        name = rng.choice(care_names)
+        return misspell(name, rng) if rng.random() < 0.2 else name
+
+    ctx = {
+        "images": [make_jpeg(args.seed * 1000 + i) for i in range(args.distinct_images)],
+        "name": pick_name,
+        "batch_size": args.batch_size,
+    }
+
+    process, stubs = None, []
+    base_url = args.url
+    if base_url is None:
+        base_url, process, stubs = start_server(args)
+    try:
+        health = wait_healthy(base_url, args.timeout)
+        print(f"API at {base_url}: {health}")
+        outcomes, wall = run_load(base_url, mix, ctx, args.requests, args.concurrency, args.timeout, args.seed)
+        with urllib.request.urlopen(base_url + "/metrics.json", timeout=10) as response:
+            server_counters = json.loads(response.read())["counters"].get("plant_api_requests_total", [])
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        for stub in stubs:
+            stub.stop()
+
+    results = {"settings": vars(args), "wall_seconds": round(wall, 3), "endpoints": {},
+               "server_requests": server_counters}
+    print(f"\n{args.requests} requests, {args.concurrency} clients, {wall:.2f} s "
+          f"({args.requests / wall:.1f} req/s overall)")
+    for name, rows in outcomes.items():
+        errors = sum(status != 200 for status, _, _ in rows)
+        stats = summarize([seconds for _, seconds, _ in rows], wall, errors)
+        first = [piece for _, _, piece in rows if piece is not None]
+        if first:
+            stats["first_piece"] = summarize(first, wall)
+        results["endpoints"][name] = stats
+        print(f"{name:<12} n={stats['count']:<5} err={errors:<3} p50 {stats['p50_ms']:>9} ms  "
+              f"p95 {stats['p95_ms']:>9} ms  p99 {stats['p99_ms']:>9} ms  {stats['throughput_per_s']:>8}/s")
+        if first:
+            print(f"{'':<12} first piece p50 {stats['first_piece']['p50_ms']} ms  "
+                  f"p95 {stats['first_piece']['p95_ms']} ms")
+    if stubs:
+        results["stubs"] = {type(stub).__name__: {"requests": stub.requests, "errors": stub.errors} for stub in stubs}
+        print(f"Stub traffic: {results['stubs']}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
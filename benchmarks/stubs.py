@@ -0,0 +1,394 @@
+"""
+Local stand-ins for the PlantNet and Gemini HTTP APIs, with latency and error injection.
+
+    python benchmarks/stubs.py [--latency-ms 300] [--jitter-ms 100] [--error-rate 0.05]
+
+prints the URLs to export so the app talks to the stubs instead:
+
+    PLANTNET_API_URL=http://127.0.0.1:<port>/v2/identify/all
+    GEMINI_API_URL=http://127.0.0.1:<port>/v1beta/models/stub:generateContent
+
+PlantNet answers with real species from the care database (chosen by a
+hash of the uploaded image, so the same photo always gets the same answer);
+Gemini answers with a short canned reply (streamed as server-sent events on
+:streamGenerateContent, --chunk-delay-ms apart). Each stub counts its requests.
+RedisStub is an in-memory Redis-protocol server for the shared cache tier.
+"""
+import argparse
+import fnmatch
+import hashlib
+import json
+import math
+import os
+import random
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Environment for an app talking to the stubs: client-side rate limits off and quota
+# counting in memory, so benchmarks neither throttle themselves nor spend the real daily quota
+UNLIMITED_ENV = {"PLANTNET_RATE_PER_MINUTE": "0", "PLANTNET_DAILY_QUOTA": "0",
+                 "GEMINI_RATE_PER_MINUTE": "0", "GEMINI_DAILY_QUOTA": "0", "LIMITS_DB": "memory"}
+
+
+class StubConfig:
+    """Injected behaviour, adjustable while a stub is running."""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, error_status=503, seed=None,
+                 chunk_delay_ms=0.0, rate_limit_per_minute=0, rate_limit_window_s=60.0):
+        self.latency_ms = latency_ms
+        self.chunk_delay_ms = chunk_delay_ms  # Between events of a streamed (SSE) response
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        # Like the real APIs: over this many requests in the trailing minute get 429 + Retry-After (0 = off)
+        self.rate_limit_per_minute = rate_limit_per_minute
+        self.rate_limit_window_s = rate_limit_window_s  # Sliding window the limit is counted over
+        self.random = random.Random(seed)
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):  # Keep benchmark output clean
+        pass
+
+    def do_POST(self):
+        stub = self.server.stub
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        with stub.lock:
+            stub.requests += 1
+            config = stub.config
+            delay = max(0.0, config.latency_ms + config.random.uniform(-config.jitter_ms, config.jitter_ms)) / 1000
+            fail = config.random.random() < config.error_rate
+            retry_after = stub.over_rate_limit(time.monotonic())
+        if retry_after:
+            with stub.lock:
+                stub.rate_limited += 1
+            self._send(429, {"error": {"code": 429, "message": "Resource has been exhausted"}},
+                       {"Retry-After": str(retry_after)})
+            return
+        time.sleep(delay)
+        if fail:
+            with stub.lock:
+                stub.errors += 1
+            self._send(config.error_status, {"error": {"code": config.error_status, "message": "Injected error"}})
+            return
+        status, payload = stub.respond(self.path, body)
+        if hasattr(payload, "__next__"):
+            self._stream(status, payload, config.chunk_delay_ms / 1000)
+        else:
+            self._send(status, payload)
+
+    def _stream(self, status, events, delay):
+        """Server-sent events, one JSON object per event, each sent as its own HTTP chunk."""
+        self.send_response(status)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, event in enumerate(events):
+            if i and delay:
+                time.sleep(delay)
+            data = f"data: {json.dumps(event)}\r\n\r\n".encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _send(self, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class _QuietServer(ThreadingHTTPServer):
+    request_queue_size = 128  # Bursts of new connections (the default backlog of 5 resets some)
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):  # Clients dropping keep-alive connections
+            super().handle_error(request, client_address)
+
+
+class StubServer:
+    """A threaded HTTP server on 127.0.0.1 (random free port by default) running in a daemon thread."""
+
+    path = "/"
+
+    def __init__(self, config=None, port=0):
+        self.config = config or StubConfig()
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self._accepted = deque()  # Times of requests inside the rate limit window
+        self._server = _QuietServer(("127.0.0.1", port), _StubHandler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{self.path}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def over_rate_limit(self, now):
+        """Seconds until a slot frees up if this request exceeds the rate limit, else 0 (records it). Holds lock."""
+        limit, window = self.config.rate_limit_per_minute, self.config.rate_limit_window_s
+        if not limit:
+            return 0
+        while self._accepted and self._accepted[0] <= now - window:
+            self._accepted.popleft()
+        if len(self._accepted) >= limit:
+            return max(1, math.ceil(self._accepted[0] + window - now))
+        self._accepted.append(now)
+        return 0
+
+    def respond(self, path, body):
+        raise NotImplementedError
+
+
+class PlantNetStub(StubServer):
+    path = "/v2/identify/all"
+
+    def __init__(self, config=None, port=0, species=None):
+        super().__init__(config, port)
+        if species is None:
+            import plant_data
+            species = [r.get('Plant Name') for r in plant_data.load_plant_data() if r.get('Plant Name')]
+        self.species = species
+
+    def respond(self, path, body):
+        if not path.startswith(self.path):
+            return 404, {"error": "Not found"}
+        pick = int.from_bytes(hashlib.sha256(body).digest()[:8], "big")
+        results = []
+        for rank in range(3):
+            name = self.species[(pick + rank * 7919) % len(self.species)]
+            results.append({
+                "score": round(0.9 / (rank + 1), 4),
+                "species": {
+                    "scientificNameWithoutAuthor": name,
+                    "commonNames": [f"Common {name.split()[0]}"],
+                    "genus": {"scientificNameWithoutAuthor": name.split()[0]},
+                    "family": {"scientificNameWithoutAuthor": "Stubaceae"},
+                },
+            })
+        return 200, {"results": results}
+
+
+class GeminiStub(StubServer):
+    """generateContent returns one JSON reply; streamGenerateContent?alt=sse sends it a few words per event."""
+
+    path = "/v1beta/models/stub:generateContent"
+    words_per_event = 3
+
+    def respond(self, path, body):
+        if ":generateContent" not in path and ":streamGenerateContent" not in path:
+            return 404, {"error": {"message": "Not found"}}
+        try:
+            turns = len(json.loads(body).get("contents", []))
+        except ValueError:
+            return 400, {"error": {"message": "Invalid JSON"}}
+        text = f"*rustles leaves* Thanks for asking! (stub reply to a {turns}-turn conversation)"
+        if ":streamGenerateContent" in path:
+            words = text.split(" ")
+            pieces = [" ".join(words[i:i + self.words_per_event]) + " "
+                      for i in range(0, len(words), self.words_per_event)]
+            return 200, ({"candidates": [{"content": {"parts": [{"text": piece}], "role": "model"}}]}
+                         for piece in pieces)
+        return 200, {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]}
+
+
+class _RedisHandler(socketserver.StreamRequestHandler):
+    """RESP2 requests in, RESP2 replies out; one connection per client, as redis-py uses it."""
+
+    def handle(self):
+        self.protocol = 2  # Until a HELLO 3 switches it
+        while True:
+            try:
+                command = self._read_command()
+            except (ConnectionError, ValueError):
+                return
+            if command is None:
+                return
+            reply = self.server.stub.execute(command)
+            if command and command[0].upper() == b"HELLO" and reply.startswith(b"%"):
+                self.protocol = 3
+            if self.protocol == 3 and reply == b"$-1\r\n":
+                reply = b"_\r\n"  # RESP3 null
+            self.wfile.write(reply)
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):  # Inline command (e.g. typed into telnet)
+            return line.split()
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+
+class _QuietTCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class RedisStub:
+    """
+    In-memory stand-in for a Redis server: the strings subset the cache and
+    limiters use (GET, SET with EX/PX/NX/XX, DEL, EXISTS, INCRBY, PEXPIRE,
+    PTTL, SCAN, FLUSHDB, PING) with key expiry. Counts commands.
+    """
+
+    def __init__(self, port=0):
+        self.lock = threading.Lock()
+        self.data = {}  # key -> (value, expires_at monotonic or None)
+        self.commands = 0
+        self._server = _QuietTCPServer(("127.0.0.1", port), _RedisHandler)
+        self._server.stub = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    @staticmethod
+    def _encode(value):
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, int):
+            return b":%d\r\n" % value
+        if isinstance(value, list):
+            return b"*%d\r\n" % len(value) + b"".join(RedisStub._encode(v) for v in value)
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+
+    def _live(self, key, now):
+        entry = self.data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= now:
+            del self.data[key]
+            return None
+        return entry
+
+    def execute(self, args):
+        name = args[0].decode().upper() if args else ""
+        now = time.monotonic()
+        with self.lock:
+            self.commands += 1
+            if name == "PING":
+                return b"+PONG\r\n"
+            if name == "HELLO":  # Handshake; replies read the same in RESP2 and RESP3 except null
+                proto = int(args[1]) if len(args) > 1 else 2
+                info = [b"server", b"stub", b"version", b"7.0.0", b"proto", proto]
+                if proto == 3:
+                    return b"%%%d\r\n" % (len(info) // 2) + b"".join(self._encode(v) for v in info)
+                return self._encode(info)
+            if name in ("CLIENT", "SELECT"):
+                return b"+OK\r\n"
+            if name == "GET":
+                entry = self._live(args[1], now)
+                return self._encode(entry[0] if entry else None)
+            if name == "SET":
+                key, value, options = args[1], args[2], [a.decode().upper() for a in args[3:]]
+                exists = self._live(key, now) is not None
+                if ("NX" in options and exists) or ("XX" in options and not exists):
+                    return self._encode(None)
+                expires_at = None
+                for unit, scale in (("EX", 1.0), ("PX", 0.001)):
+                    if unit in options:
+                        expires_at = now + float(args[3 + options.index(unit) + 1]) * scale
+                self.data[key] = (value, expires_at)
+                return b"+OK\r\n"
+            if name in ("DEL", "EXISTS"):
+                found = [key for key in args[1:] if self._live(key, now) is not None]
+                if name == "DEL":
+                    for key in found:
+                        del self.data[key]
+                return self._encode(len(found))
+            if name == "INCRBY":
+                entry = self._live(args[1], now)
+                value = int(entry[0] if entry else 0) + int(args[2])
+                self.data[args[1]] = (str(value).encode(), entry[1] if entry else None)
+                return self._encode(value)
+            if name == "PEXPIRE":
+                entry = self._live(args[1], now)
+                if entry is None:
+                    return self._encode(0)
+                self.data[args[1]] = (entry[0], now + int(args[2]) / 1000)
+                return self._encode(1)
+            if name == "PTTL":
+                entry = self._live(args[1], now)
+                if entry is None:
+                    return self._encode(-2)
+                return self._encode(-1 if entry[1] is None else int((entry[1] - now) * 1000))
+            if name == "SCAN":  # Everything in one page
+                options = [a.decode().upper() for a in args[2:]]
+                pattern = args[2 + options.index("MATCH") + 1].decode() if "MATCH" in options else "*"
+                keys = [k for k in list(self.data) if self._live(k, now) and fnmatch.fnmatchcase(k.decode(), pattern)]
+                return self._encode([b"0", keys])
+            if name == "FLUSHDB":
+                self.data.clear()
+                return b"+OK\r\n"
+            return f"-ERR unknown command '{name}'\r\n".encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--plantnet-port", type=int, default=0)
+    parser.add_argument("--gemini-port", type=int, default=0)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--chunk-delay-ms", type=float, default=0.0, help="Delay between streamed chat events")
+    parser.add_argument("--rate-limit-per-minute", type=int, default=0, help="Answer 429 beyond this rate (0 = off)")
+    args = parser.parse_args()
+
+    make_config = lambda: StubConfig(args.latency_ms, args.jitter_ms, args.error_rate, args.error_status,
+                                     chunk_delay_ms=args.chunk_delay_ms,
+                                     rate_limit_per_minute=args.rate_limit_per_minute)
+    plantnet = PlantNetStub(make_config(), args.plantnet_port).start()
+    gemini = GeminiStub(make_config(), args.gemini_port).start()
+    print(f"PLANTNET_API_URL={plantnet.url}")
+    print(f"GEMINI_API_URL={gemini.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print(f"PlantNet: {plantnet.requests} requests ({plantnet.errors} errors, {plantnet.rate_limited} rate limited); "
+              f"Gemini: {gemini.requests} requests ({gemini.errors} errors, {gemini.rate_limited} rate limited)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""
+Headless JSON API over the identification, care lookup and chat services.
+
+    python plant_api.py [--host 0.0.0.0] [--port 8000] [--workers 4]
+
+Endpoints (errors are JSON {'error': ...} with a 4xx/5xx status):
+
+  GET  /health             liveness + care dataset version
+  POST /identify           raw image body (image/*), or multipart `images` files (+ `organs` fields),
+                           or JSON {"images": [base64, ...], "organs": [...]}; up to five photos of one plant
+                           (404 when no species matches, 422 when PlantNet rejects the photos, 502 when it
+                           can't be reached, 429/503 with Retry-After while rate limited or failing)
+  POST /care               batch lookup: {"queries": [name or identification, ...], "suggestions": 0-5}
+                           (suggestions are only listed for queries without a care record)
+  GET  /care?name=...      single lookup
+  POST /chat               {"plant_name" and/or "id_result", "history": [{"role", "content"}, ...],
+                           "stream": true}; streams server-sent events {"text": ...} then `event: done`
+  GET  /chat/opening?plant_name=...
+                           a new chat's greeting (null unless pre-generated, see plant_greetings.py) and
+                           the common first questions, which /chat answers without a model call when pre-generated
+  GET  /metrics            Prometheus text (/metrics.json for JSON)
+
+Each uvicorn worker is its own process holding one copy of the care dataset,
+identification cache and worker pools (the same singletons the Streamlit app
+uses). Blocking calls run on Starlette's thread pool, so the event loop only
+parses requests and streams responses.
+"""
+import argparse
+import base64
+import binascii
+import contextlib
+import json
+import logging
+import time
+from collections.abc import Mapping
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+
+import plant_care
+import plant_chat
+import plant_identification
+from plant_greetings import COMMON_QUESTIONS, DEFAULT_QUESTIONS
+from plant_metrics import REGISTRY, STAGE_HISTOGRAM, incr, observe
+from plant_net import MAX_IMAGES_PER_REQUEST, VALID_ORGANS
+
+logger = logging.getLogger(__name__)
+
+MAX_IMAGE_BYTES = 10 * 1024 * 1024  # Per photo
+MAX_CARE_BATCH = 100
+MAX_SUGGESTIONS = 5
+MAX_CHAT_HISTORY = 50
+CHAT_ROLES = ("user", "assistant", "model")
+
+REGISTRY.describe("plant_api_requests_total", "API requests by endpoint and HTTP status.")
+
+
+def _jsonable(value):
+    # Care records are read-only Mappings (plant_records), not dicts
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def json_response(payload, status=200):
+    return Response(json.dumps(payload, default=_jsonable), status_code=status, media_type="application/json")
+
+
+def error_response(message, status):
+    return json_response({'error': message}, status)
+
+
+def endpoint(name):
+    """
+    Count and time an async handler. Not a span: concurrent requests share the
+    event loop thread. Streamed responses are timed until their last chunk.
+    """
+    def decorate(handler):
+        async def wrapper(request):
+            started = time.perf_counter()
+            try:
+                response = await handler(request)
+            except Exception as e:
+                logger.exception("API %s failed: %s", name, e)
+                response = error_response("Internal server error", 500)
+            if isinstance(response, StreamingResponse):
+                response.body_iterator = _timed_body(response.body_iterator, name, started)
+            else:
+                observe(STAGE_HISTOGRAM, time.perf_counter() - started, stage=f"api_{name}")
+            incr("plant_api_requests_total", endpoint=name, status=response.status_code)
+            return response
+        return wrapper
+    return decorate
+
+
+async def _timed_body(body, name, started):
+    try:
+        async for chunk in body:
+            yield chunk
+    finally:
+        observe(STAGE_HISTOGRAM, time.perf_counter() - started, stage=f"api_{name}")
+
+
+async def _read_json(request):
+    try:
+        body = json.loads(await request.body() or b"{}")
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    return body if isinstance(body, dict) else None
+
+
+# --- Identification ---
+
+async def _read_images(request):
+    """[(image_bytes, organ), ...] from any of the accepted body formats, or an error string."""
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("image/") or content_type == "application/octet-stream":
+        images = [(await request.body(), 'auto')]
+    elif content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        files = form.getlist("images")
+        organs = form.getlist("organs") or ['auto'] * len(files)
+        if len(organs) != len(files):
+            return "Send one `organs` value per image (or none)."
+        images = [(await f.read(), organ) for f, organ in zip(files, organs) if hasattr(f, "read")]
+        if len(images) != len(files):
+            return "`images` must be file uploads."
+    else:
+        body = await _read_json(request)
+        if body is None or not isinstance(body.get("images"), list):
+            return "Send an image body, multipart `images` files, or JSON {\"images\": [base64, ...]}."
+        encoded = body["images"]
+        organs = body.get("organs") or ['auto'] * len(encoded)
+        if not isinstance(organs, list) or len(organs) != len(encoded):
+            return "Send one `organs` value per image (or none)."
+        try:
+            images = [(base64.b64decode(data, validate=True), organ) for data, organ in zip(encoded, organs)]
+        except (binascii.Error, TypeError, ValueError):
+            return "`images` must be base64-encoded strings."
+    if not images or len(images) > MAX_IMAGES_PER_REQUEST:
+        return f"Provide between 1 and {MAX_IMAGES_PER_REQUEST} images of the same plant."
+    for image_bytes, organ in images:
+        if not image_bytes:
+            return "Empty image."
+        if len(image_bytes) > MAX_IMAGE_BYTES:
+            return f"Images must be at most {MAX_IMAGE_BYTES // (1024 * 1024)} MB each."
+        if organ not in VALID_ORGANS:
+            return f"Unknown organ '{organ}'; use one of {', '.join(VALID_ORGANS)}."
+    return images
+
+
+@endpoint("identify")
+async def identify(request):
+    images = await _read_images(request)
+    if isinstance(images, str):
+        return error_response(images, 400)
+    result = await run_in_threadpool(plant_identification.identify, images)
+    if 'retry_after' in result:  # PlantNet down (plant_circuit), or shed by the rate limiter / quota (plant_limits)
+        response = json_response(result, 503 if result.get('circuit_open') else 429)
+        response.headers["Retry-After"] = str(result['retry_after'])
+        return response
+    if result.get('unavailable'):
+        return json_response(result, 502)  # PlantNet (or the local model) could not answer
+    if 'error' in result:  # Answered, but not with an identification: no match, or the photos were rejected
+        return json_response(result, 404 if result.get('no_match') else 422)
+    return json_response(result)
+
+
+# --- Care lookup ---
+
+def _as_identification(query):
+    """Care lookups accept a plain name or an identification dict (as returned by /identify)."""
+    if isinstance(query, str):
+        return {'scientific_name': query, 'common_name': query}
+    return query
+
+
+def lookup_care_batch(queries, suggestions=0):
+    """
+    Care record and match level for each query (plus up to `suggestions` similar
+    plants when nothing matched), all from ONE dataset snapshot.
+
+    Repeated queries in a batch are looked up once. Blocking; the API runs it
+    on the thread pool.
+    """
+    dataset = plant_care.load_care_dataset()
+    by_key = {}
+    results = []
+    for query in queries:
+        key = json.dumps(query, sort_keys=True)
+        if key not in by_key:
+            id_result = _as_identification(query)
+            care_info, match = plant_care.match_care_instructions(id_result, dataset.records,
+                                                                   care_index=dataset.index)
+            by_key[key] = {"care_info": care_info, "match": match}
+            if suggestions and care_info is None:  # Like the UI: only offer alternatives when nothing matched
+                by_key[key]["suggestions"] = plant_care.find_similar_plant_matches(
+                    id_result, dataset.records, limit=suggestions, care_index=dataset.index)
+        results.append({"query": query, **by_key[key]})
+    return {"dataset_version": dataset.version, "results": results}
+
+
+def _valid_query(query):
+    if isinstance(query, str):
+        return bool(query.strip())
+    return isinstance(query, dict) and any(
+        isinstance(query.get(k), str) and query[k].strip() for k in ('scientific_name', 'common_name'))
+
+
+@endpoint("care")
+async def care(request):
+    if request.method == "GET":
+        name = request.query_params.get("name", "")
+        if not name.strip():
+            return error_response("Pass ?name=<plant name>.", 400)
+        batch = await run_in_threadpool(lookup_care_batch, [name])
+        return json_response({"dataset_version": batch["dataset_version"], **batch["results"][0]})
+
+    body = await _read_json(request)
+    queries = body.get("queries") if body is not None else None
+    if not isinstance(queries, list) or not queries:
+        return error_response("Send JSON {\"queries\": [name or identification, ...]}.", 400)
+    if len(queries) > MAX_CARE_BATCH:
+        return error_response(f"At most {MAX_CARE_BATCH} queries per batch.", 400)
+    if not all(_valid_query(q) for q in queries):
+        return error_response("Each query needs a name or a scientific_name/common_name.", 400)
+    suggestions = body.get("suggestions", 0)
+    if not isinstance(suggestions, int) or not 0 <= suggestions <= MAX_SUGGESTIONS:
+        return error_response(f"`suggestions` must be between 0 and {MAX_SUGGESTIONS}.", 400)
+    return json_response(await run_in_threadpool(lookup_care_batch, queries, suggestions))
+
+
+# --- Chat ---
+
+def resolve_chat_plant(plant_name, id_result):
+    """(care_info, id_result) for a chat: the care record if one matches, else a generic identification."""
+    if not id_result:
+        id_result = {'scientific_name': plant_name, 'common_name': plant_name}
+    dataset = plant_care.load_care_dataset()
+    care_info, _ = plant_care.match_care_instructions(id_result, dataset.records, care_index=dataset.index)
+    return care_info, id_result
+
+
+def _sse_events(pieces):
+    """Server-sent events for a streamed reply. Runs on the thread pool, one piece at a time."""
+    for text in pieces:
+        yield f"data: {json.dumps({'text': text})}\n\n"
+    yield f"event: done\ndata: {json.dumps({'timestamp': plant_chat.chat_timestamp()})}\n\n"
+
+
+@endpoint("chat")
+async def chat(request):
+    body = await _read_json(request)
+    if body is None:
+        return error_response("Send a JSON object.", 400)
+    plant_name = body.get("plant_name")
+    id_result = body.get("id_result")
+    history = body.get("history")
+    if not (isinstance(plant_name, str) and plant_name.strip()) and not _valid_query(id_result):
+        return error_response("Send `plant_name` or an `id_result` from /identify.", 400)
+    if not isinstance(history, list) or not history or len(history) > MAX_CHAT_HISTORY:
+        return error_response(f"`history` must list 1 to {MAX_CHAT_HISTORY} messages, the last from the user.", 400)
+    # All of it up front: a streamed reply has sent its 200 before the history is read
+    for message in history:
+        if not (isinstance(message, dict) and message.get("role") in CHAT_ROLES
+                and isinstance(message.get("content"), str) and message["content"].strip()):
+            return error_response(f"Each `history` message needs a `role` ({', '.join(CHAT_ROLES)}) "
+                                  "and non-empty `content` text.", 400)
+    if history[-1]["role"] != "user":
+        return error_response("The last `history` message must have role 'user'.", 400)
+
+    care_info, id_result = await run_in_threadpool(resolve_chat_plant, plant_name, id_result)
+    if body.get("stream", True):
+        pieces = plant_chat.stream_chat_with_plant(care_info, history, id_result)
+        return StreamingResponse(_sse_events(pieces), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache"})
+    reply = await run_in_threadpool(plant_chat.chat_with_plant, care_info, history, id_result)
+    return json_response({"reply": reply, "timestamp": plant_chat.chat_timestamp()})
+
+
+@endpoint("chat_opening")
+async def chat_opening(request):
+    plant_name = request.query_params.get("plant_name", "")
+    if not plant_name.strip():
+        return error_response("Pass ?plant_name=<plant name>.", 400)
+    care_info, _ = await run_in_threadpool(resolve_chat_plant, plant_name, None)
+    greeting = await run_in_threadpool(plant_chat.opening_greeting, care_info)
+    return json_response({"plant_name": care_info.get('Plant Name') if care_info else plant_name,
+                          "greeting": greeting, "timestamp": plant_chat.chat_timestamp(),
+                          "questions": list(COMMON_QUESTIONS[:DEFAULT_QUESTIONS])})
+
+
+# --- Operations ---
+
+@endpoint("health")
+async def health(request):
+    dataset = await run_in_threadpool(plant_care.load_care_dataset)
+    return json_response({"status": "ok", "dataset_version": dataset.version, "plants": len(dataset.records)})
+
+
+async def metrics(request):
+    if request.url.path.endswith(".json"):
+        return json_response(REGISTRY.snapshot())
+    return Response(REGISTRY.to_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    """Load the care dataset and identifier before the first request instead of during it."""
+    try:
+        await run_in_threadpool(plant_care.load_care_dataset)
+        await run_in_threadpool(plant_identification.get_identifier)
+    except Exception as e:
+        logger.exception("API warm-up failed (requests will retry): %s", e)
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route("/health", health, methods=["GET"]),
+        Route("/identify", identify, methods=["POST"]),
+        Route("/care", care, methods=["GET", "POST"]),
+        Route("/chat", chat, methods=["POST"]),
+        Route("/chat/opening", chat_opening, methods=["GET"]),
+        Route("/metrics", metrics, methods=["GET"]),
+        Route("/metrics.json", metrics, methods=["GET"]),
+    ],
+    lifespan=lifespan,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plant identification / care / chat JSON API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    args = parser.parse_args()
+    import uvicorn
+    uvicorn.run("plant_api:app", host=args.host, port=args.port, workers=args.workers, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
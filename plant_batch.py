@@ -0,0 +1,128 @@
+import argparse
+import io
+import json
+import os
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+from plant_limits import PRIORITY_BATCH, request_priority
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def iter_folder_images(folder: str) -> Iterator[Tuple[str, bytes]]:
+    """Yield (relative_path, image_bytes) for every image below `folder`, in a stable order."""
+    for root, _, filenames in sorted(os.walk(folder)):
+        for filename in sorted(filenames):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                path = os.path.join(root, filename)
+                with open(path, 'rb') as f:
+                    yield os.path.relpath(path, folder), f.read()
+
+
+def iter_zip_images(zip_source) -> Iterator[Tuple[str, bytes]]:
+    """Yield (member_name, image_bytes) for every image in a zip file path or zip bytes."""
+    if isinstance(zip_source, bytes):
+        zip_source = io.BytesIO(zip_source)
+    with zipfile.ZipFile(zip_source) as archive:
+        for member in sorted(archive.namelist()):
+            basename = os.path.basename(member)
+            # Skip directories and macOS resource forks
+            if member.endswith('/') or basename.startswith('._') or '__MACOSX' in member:
+                continue
+            if basename.lower().endswith(IMAGE_EXTENSIONS):
+                yield member, archive.read(member)
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def identify_bulk(items, identify_fn: Callable[[bytes], Dict[str, Any]],
+                  max_workers: int = 4) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Identify many plants (one image each) concurrently with bounded parallelism.
+
+    Upstream calls run at batch priority (see plant_limits): they queue behind
+    interactive requests and are shed first when the quota runs low.
+
+    Args:
+        items: Iterable of (name, image_bytes).
+        identify_fn: Single-image identifier returning a result or {'error': str} dict.
+        max_workers: Maximum number of identifications in flight at once.
+
+    Returns:
+        (results, report): one {'name', 'result', 'seconds'} entry per item in input
+        order, and a throughput report (see format_throughput_report).
+    """
+    def run_one(item):
+        name, image_bytes = item
+        started = time.perf_counter()
+        try:
+            with request_priority(PRIORITY_BATCH):
+                result = identify_fn(image_bytes)
+        except Exception as e:
+            result = {'error': f"Unexpected Error: {e}"}
+        return {'name': name, 'result': result, 'seconds': time.perf_counter() - started}
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="plant-bulk") as executor:
+        results = list(executor.map(run_one, items))
+    wall_seconds = time.perf_counter() - started
+
+    latencies = sorted(r['seconds'] for r in results)
+    failed = sum(1 for r in results if not isinstance(r['result'], dict) or 'error' in r['result'])
+    report = {
+        'images': len(results),
+        'succeeded': len(results) - failed,
+        'failed': failed,
+        'workers': max_workers,
+        'wall_seconds': round(wall_seconds, 3),
+        'images_per_second': round(len(results) / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+        'latency_p50_seconds': round(_percentile(latencies, 50), 3),
+        'latency_p95_seconds': round(_percentile(latencies, 95), 3),
+        'latency_max_seconds': round(latencies[-1], 3) if latencies else 0.0,
+    }
+    return results, report
+
+
+def format_throughput_report(report: Dict[str, Any]) -> str:
+    return (
+        f"{report['images']} images ({report['succeeded']} identified, {report['failed']} failed) "
+        f"in {report['wall_seconds']:.2f}s with {report['workers']} workers: "
+        f"{report['images_per_second']:.2f} images/s, "
+        f"p50 {report['latency_p50_seconds']:.2f}s, p95 {report['latency_p95_seconds']:.2f}s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Identify every plant photo in a folder or zip file.")
+    parser.add_argument("source", help="Folder or .zip file of plant images (one plant per image)")
+    parser.add_argument("--workers", type=int, default=4, help="Maximum concurrent PlantNet requests")
+    parser.add_argument("--output", help="Write per-image results and the report as JSON to this file")
+    args = parser.parse_args()
+
+    # Same path as the app (cache, single-flight, rate limits and the shared daily quota)
+    from plant_identification import identify
+
+    items = iter_zip_images(args.source) if zipfile.is_zipfile(args.source) else iter_folder_images(args.source)
+    results, report = identify_bulk(items, identify, max_workers=args.workers)
+
+    for entry in results:
+        result = entry['result']
+        outcome = result.get('error') or f"{result.get('scientific_name')} ({result.get('confidence')}%)"
+        print(f"{entry['name']}: {outcome}")
+    print(format_throughput_report(report))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'results': results, 'report': report}, f, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
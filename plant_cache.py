@@ -0,0 +1,535 @@
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from plant_metrics import incr
+
+logger = logging.getLogger(__name__)
+
+# How long get_or_compute waits for another caller (thread or process) computing the same key
+LOCK_TIMEOUT_SECONDS = 30.0
+# SQLite: refresh an entry's last-access time at most this often (keeps cache hits read-only)
+SQLITE_TOUCH_SECONDS = 60.0
+# SQLite: prune expired / least recently used entries every this many writes (per process)
+SQLITE_PRUNE_EVERY = 100
+
+
+class FlightTimeout(TimeoutError):
+    """A SingleFlight follower stopped waiting for the leader's call."""
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls in this process: the first caller for
+    a key runs fn(), later callers wait on its Future and share the result, or
+    the exception it raised. Nothing is remembered once the call finishes;
+    that is what the caches are for.
+
+    Waiting callers give up after `timeout` seconds with FlightTimeout; the
+    leader keeps running.
+    """
+
+    def __init__(self, name: str, timeout: Optional[float] = None):
+        self.name = name
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+        if not leader:
+            incr("plant_single_flight_total", flight=self.name, role="follower")
+            try:
+                return call.result(timeout if timeout is not None else self.timeout)
+            except TimeoutError:
+                if call.done():  # The leader's own call timed out: share that like any other error
+                    raise
+                raise FlightTimeout(f"{self.name}: gave up waiting for an identical call in flight") from None
+        incr("plant_single_flight_total", flight=self.name, role="leader")
+        try:
+            result = fn()
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+class CacheBackend:
+    """
+    A cache tier. Subclasses implement _lookup / _store / _remove / clear and
+    the single-flight lock (acquire_lock / release_lock); the public get / set /
+    get_or_compute here are the same for every backend.
+
+    Values must be picklable: the shared tiers (SQLiteCache, RedisCache) pickle
+    them so other processes can read them, and get_or_compute's lock is shared
+    the same way, so a burst of misses for one key makes ONE upstream call
+    across every thread and worker using the backend.
+    """
+
+    name = "base"
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self._ttl_seconds = ttl_seconds
+        self._flight = SingleFlight(f"cache:{self.name}")
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # --- Implemented by each backend ---
+
+    def _lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        raise NotImplementedError
+
+    def _store(self, key: Hashable, value: Any, ttl_seconds: Optional[float]):
+        raise NotImplementedError
+
+    def _remove(self, key: Hashable):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def acquire_lock(self, key: Hashable, lease_seconds: float) -> Optional[str]:
+        """Take the compute lock for `key`; returns a token, or None if someone else holds it.
+        The lease expires on its own so a crashed holder can't block the key forever."""
+        raise NotImplementedError
+
+    def release_lock(self, key: Hashable, token: str):
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    # --- Common API ---
+
+    def _count(self, hit: bool):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        found, value = self._lookup(key)
+        self._count(found)
+        return value if found else default
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        self._store(key, value, ttl_seconds if ttl_seconds is not None else self._ttl_seconds)
+
+    def delete(self, key: Hashable):
+        self._remove(key)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any], ttl_seconds: Optional[float] = None,
+                       should_cache: Optional[Callable[[Any], bool]] = None,
+                       lock_timeout: float = LOCK_TIMEOUT_SECONDS) -> Any:
+        """
+        Cached value for `key`, or compute() it exactly once among concurrent callers.
+
+        Callers in this process share one attempt through a SingleFlight, so
+        they also share its result when it isn't cached (e.g. an error). Across
+        processes, the one holding the backend lock computes and stores the
+        value (if should_cache(value) allows) and the others poll until it
+        appears; if it is never stored they take the lock in turn and try
+        themselves. The lock is a `lock_timeout` lease, so a holder that died
+        holds up the others for that long at most; nobody computes while
+        another caller's lease is live.
+        """
+        found, value = self._lookup(key)
+        if found:
+            self._count(True)
+            return value
+        self._count(False)
+        # Followers wait for the leader however long it takes: its own wait is bounded by the lease
+        return self._flight.do(key, lambda: self._compute_locked(key, compute, ttl_seconds, should_cache,
+                                                                 lock_timeout))
+
+    def _compute_locked(self, key, compute, ttl_seconds, should_cache, lock_timeout):
+        delay = 0.005
+        while True:
+            token = self.acquire_lock(key, lock_timeout)
+            if token is not None:
+                try:
+                    found, value = self._lookup(key)  # Filled while we were waiting for the lock
+                    if found:
+                        return value
+                    value = compute()
+                    if should_cache is None or should_cache(value):
+                        self.set(key, value, ttl_seconds)
+                    return value
+                finally:
+                    self.release_lock(key, token)
+            time.sleep(delay)
+            delay = min(delay * 2, 0.1)
+            found, value = self._lookup(key)
+            if found:
+                return value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            'backend': self.name,
+            'entries': len(self),
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+class LRUCache(CacheBackend):
+    """
+    Thread-safe in-process LRU cache with an optional per-entry TTL.
+
+    Used for results that are expensive to recompute (e.g. PlantNet
+    identifications keyed by image hash) and safe to share across sessions.
+    Lost on restart and not shared between worker processes; front a shared
+    tier with it via TieredCache for that.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = None):
+        super().__init__(ttl_seconds)
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._locks: Dict[Hashable, Tuple[str, float]] = {}
+
+    def _lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    return True, value
+                del self._entries[key]
+            return False, None
+
+    def _store(self, key: Hashable, value: Any, ttl_seconds: Optional[float]):
+        expires_at = time.monotonic() + ttl_seconds if ttl_seconds else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def _remove(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def acquire_lock(self, key: Hashable, lease_seconds: float) -> Optional[str]:
+        now = time.monotonic()
+        with self._lock:
+            held = self._locks.get(key)
+            if held is not None and held[1] > now:
+                return None
+            token = uuid.uuid4().hex
+            self._locks[key] = (token, now + lease_seconds)
+            return token
+
+    def release_lock(self, key: Hashable, token: str):
+        with self._lock:
+            if self._locks.get(key, (None,))[0] == token:
+                del self._locks[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache(CacheBackend):
+    """
+    On-disk cache shared by every process that opens the same file; survives restarts.
+
+    Uses WAL mode so readers never block the single writer, one connection
+    per thread, and wall-clock expiry times so all processes agree on them.
+    Entries are evicted least-recently-used (to the nearest SQLITE_TOUCH_SECONDS)
+    once there are more than `max_entries`. `namespace` keeps several caches
+    apart in one file.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, namespace: str = "", max_entries: int = 10000,
+                 ttl_seconds: Optional[float] = None):
+        super().__init__(ttl_seconds)
+        self.path = path
+        self._prefix = f"{namespace}:" if namespace else ""
+        self._max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL,"
+                         " expires_at REAL, accessed_at REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_locks (key TEXT PRIMARY KEY, token TEXT NOT NULL,"
+                         " expires_at REAL NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():  # Never reuse a connection across fork()
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _key(self, key: Hashable) -> str:
+        return f"{self._prefix}{key}"
+
+    def _lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute("SELECT value, expires_at, accessed_at FROM cache WHERE key = ?",
+                           (self._key(key),)).fetchone()
+        if row is None:
+            return False, None
+        value, expires_at, accessed_at = row
+        if expires_at is not None and expires_at <= now:
+            return False, None  # Deleted by the next prune
+        if now - accessed_at > SQLITE_TOUCH_SECONDS:
+            conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, self._key(key)))
+        try:
+            return True, pickle.loads(value)
+        except Exception as e:  # Written by an incompatible version of the app
+            logger.warning("Dropping unreadable cache entry %r: %s", key, e)
+            self._remove(key)
+            return False, None
+
+    def _store(self, key: Hashable, value: Any, ttl_seconds: Optional[float]):
+        now = time.time()
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._connect().execute("INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                                (self._key(key), data, now + ttl_seconds if ttl_seconds else None, now))
+        with self._writes_lock:
+            self._writes += 1
+            prune = self._writes % SQLITE_PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+
+    def prune(self):
+        """Delete expired entries, then the least recently used beyond max_entries (this namespace only)."""
+        conn = self._connect()
+        like = f"{self._prefix}%"
+        conn.execute("DELETE FROM cache WHERE key LIKE ? AND expires_at <= ?", (like, time.time()))
+        conn.execute("DELETE FROM cache WHERE key IN (SELECT key FROM cache WHERE key LIKE ?"
+                     " ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)", (like, self._max_entries))
+
+    def _remove(self, key: Hashable):
+        self._connect().execute("DELETE FROM cache WHERE key = ?", (self._key(key),))
+
+    def clear(self):
+        self._connect().execute("DELETE FROM cache WHERE key LIKE ?", (f"{self._prefix}%",))
+
+    def acquire_lock(self, key: Hashable, lease_seconds: float) -> Optional[str]:
+        now = time.time()
+        token = uuid.uuid4().hex
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")  # Serialises lock takers across processes
+        try:
+            conn.execute("DELETE FROM cache_locks WHERE key = ? AND expires_at <= ?", (self._key(key), now))
+            taken = conn.execute("INSERT OR IGNORE INTO cache_locks (key, token, expires_at) VALUES (?, ?, ?)",
+                                 (self._key(key), token, now + lease_seconds)).rowcount == 1
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return token if taken else None
+
+    def release_lock(self, key: Hashable, token: str):
+        self._connect().execute("DELETE FROM cache_locks WHERE key = ? AND token = ?", (self._key(key), token))
+
+    def __len__(self) -> int:
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM cache WHERE key LIKE ? AND (expires_at IS NULL OR expires_at > ?)",
+            (f"{self._prefix}%", time.time())).fetchone()[0]
+
+
+class RedisCache(CacheBackend):
+    """
+    Cache on a Redis server (or anything speaking its protocol), shared by every
+    process and host pointing at `url`. Needs the optional 'redis' package.
+
+    TTLs and the compute lock's lease use Redis expiry; size limits are left
+    to the server's maxmemory policy.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, namespace: str = "", ttl_seconds: Optional[float] = None):
+        super().__init__(ttl_seconds)
+        try:
+            import redis  # Optional: only needed when CACHE_URL is a redis:// URL
+        except ImportError:
+            raise ImportError("The Redis cache backend needs the 'redis' package.") from None
+        self._client = redis.Redis.from_url(url)
+        self._client.ping()  # Fail now (so make_cache can fall back) rather than on the first lookup
+        self._prefix = f"plant:{namespace}:" if namespace else "plant:"
+
+    def _key(self, key: Hashable) -> str:
+        return f"{self._prefix}{key}"
+
+    def _lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        data = self._client.get(self._key(key))
+        if data is None:
+            return False, None
+        try:
+            return True, pickle.loads(data)
+        except Exception as e:
+            logger.warning("Dropping unreadable cache entry %r: %s", key, e)
+            self._remove(key)
+            return False, None
+
+    def _store(self, key: Hashable, value: Any, ttl_seconds: Optional[float]):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._client.set(self._key(key), data, px=int(ttl_seconds * 1000) if ttl_seconds else None)
+
+    def _remove(self, key: Hashable):
+        self._client.delete(self._key(key))
+
+    def clear(self):
+        keys = list(self._client.scan_iter(match=f"{self._prefix}*"))
+        if keys:
+            self._client.delete(*keys)
+
+    def acquire_lock(self, key: Hashable, lease_seconds: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        taken = self._client.set(f"lock:{self._key(key)}", token, nx=True, px=int(lease_seconds * 1000))
+        return token if taken else None
+
+    def release_lock(self, key: Hashable, token: str):
+        lock_key = f"lock:{self._key(key)}"
+        if self._client.get(lock_key) == token.encode():  # Don't release a lease that expired and was retaken
+            self._client.delete(lock_key)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self._client.scan_iter(match=f"{self._prefix}*"))
+
+
+class TieredCache(CacheBackend):
+    """
+    An in-process LRU in front of a shared tier: repeat hits stay in memory,
+    misses fall through to (and fill from) the shared tier, and the compute
+    lock is the shared tier's, so single-flight holds across processes.
+
+    If the shared tier fails (e.g. Redis restarts) it logs and carries on
+    with the local tier alone rather than failing the request.
+    """
+
+    def __init__(self, local: LRUCache, shared: CacheBackend):
+        self.name = f"{local.name}+{shared.name}"
+        super().__init__(shared._ttl_seconds)
+        self.local = local
+        self.shared = shared
+
+    def _shared_failed(self, action: str, error: Exception):
+        logger.warning("Shared cache (%s) %s failed, using local cache only: %s", self.shared.name, action, error)
+
+    def _lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        found, value = self.local._lookup(key)
+        if found:
+            return True, value
+        try:
+            found, value = self.shared._lookup(key)
+        except Exception as e:
+            self._shared_failed("lookup", e)
+            return False, None
+        if found:
+            self.local._store(key, value, self.local._ttl_seconds)
+        return found, value
+
+    def _store(self, key: Hashable, value: Any, ttl_seconds: Optional[float]):
+        self.local._store(key, value, min(filter(None, (ttl_seconds, self.local._ttl_seconds)), default=None))
+        try:
+            self.shared._store(key, value, ttl_seconds)
+        except Exception as e:
+            self._shared_failed("store", e)
+
+    def _remove(self, key: Hashable):
+        self.local._remove(key)
+        try:
+            self.shared._remove(key)
+        except Exception as e:
+            self._shared_failed("remove", e)
+
+    def clear(self):
+        self.local.clear()
+        try:
+            self.shared.clear()
+        except Exception as e:
+            self._shared_failed("clear", e)
+
+    def acquire_lock(self, key: Hashable, lease_seconds: float) -> Optional[str]:
+        try:
+            return self.shared.acquire_lock(key, lease_seconds)
+        except Exception as e:
+            self._shared_failed("lock", e)
+            token = self.local.acquire_lock(key, lease_seconds)
+            return f"local:{token}" if token is not None else None
+
+    def release_lock(self, key: Hashable, token: str):
+        if token.startswith("local:"):
+            self.local.release_lock(key, token[len("local:"):])
+            return
+        try:
+            self.shared.release_lock(key, token)
+        except Exception as e:
+            self._shared_failed("unlock", e)  # The lease expires on its own
+
+    def __len__(self) -> int:
+        return len(self.shared)
+
+
+def make_cache(url: Optional[str], namespace: str, max_entries: int = 1024,
+               ttl_seconds: Optional[float] = None) -> CacheBackend:
+    """
+    Cache for `namespace` on the backend named by `url` (CACHE_URL):
+
+        "" or "memory"              in-process LRUCache only
+        "sqlite:///path/cache.db"   LRUCache in front of SQLiteCache (shared by local processes)
+        "redis://host:6379/0"       LRUCache in front of RedisCache (shared by hosts)
+
+    Falls back to memory only (with an error logged) if the shared tier can't be opened.
+    """
+    local = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+    if not url or url == "memory":
+        return local
+    try:
+        if url.startswith("sqlite:///"):
+            shared = SQLiteCache(url[len("sqlite:///"):], namespace, max_entries=max_entries * 10,
+                                 ttl_seconds=ttl_seconds)
+        elif url.startswith(("redis://", "rediss://", "unix://")):
+            shared = RedisCache(url, namespace, ttl_seconds=ttl_seconds)
+        else:
+            raise ValueError(f"unsupported cache URL scheme in {url!r}")
+    except Exception as e:
+        logger.exception("Could not open shared cache (%s); using an in-process cache for '%s'.", e, namespace)
+        return local
+    return TieredCache(local, shared)
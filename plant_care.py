@@ -0,0 +1,205 @@
+import functools
+import logging
+import os
+
+import plant_data
+from plant_data import CareDataset
+from plant_index import CareIndex, normalize_name, MATCH_EXACT, MATCH_CANDIDATE, MATCH_FUZZY
+from plant_metrics import REGISTRY, incr, span
+from plant_scheduler import CareScheduler, FileSink
+
+PLANT_CARE_FILE = plant_data.PLANT_CARE_FILE # Shared with plant_chatbot via plant_data
+# Watering/feeding reminder schedule (survives restarts) and where due reminders are written
+CARE_SCHEDULE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "care_schedule.json")
+CARE_REMINDERS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "care_reminders.jsonl")
+
+logger = logging.getLogger(__name__)
+REGISTRY.describe("plant_care_match_total", "Care record lookups for an identification, by how the record was matched.")
+
+
+@span("load_care_data")
+def load_care_dataset(filepath=PLANT_CARE_FILE) -> CareDataset:
+    """
+    Current snapshot of the shared care dataset (records + indexes) from plant_data.
+
+    Parsed once per process; file updates are rebuilt in the background and
+    swapped in atomically. Take ONE snapshot per request (or Streamlit rerun)
+    and pass it down, so callers never mix records from two versions.
+    Raises FileNotFoundError / ValueError (incl. JSON errors) if the file can't be loaded.
+    """
+    return plant_data.get_store(filepath).snapshot()
+
+
+@span("find_care_instructions")
+def find_care_instructions(plant_name_id, care_data, match_threshold=75, care_index=None):
+    return match_care_instructions(plant_name_id, care_data, match_threshold, care_index)[0]
+
+
+def match_care_instructions(plant_name_id, care_data, match_threshold=75, care_index=None):
+    """
+    Finds the care record for an identification and reports how it was matched.
+
+    Returns:
+        (care_info, match) where match is None when nothing was found, otherwise
+        {'level': one of plant_index.MATCH_*, 'taxon': genus/family for relative matches}.
+    """
+    plant, match = _match_care_instructions(plant_name_id, care_data, match_threshold, care_index)
+    incr("plant_care_match_total", level=match['level'] if match else "none")
+    return plant, match
+
+
+def _match_care_instructions(plant_name_id, care_data, match_threshold, care_index):
+    if not care_data: return None, None # No data to search
+    # O(1) name lookups; build a throwaway index if the caller doesn't share one
+    index = care_index if care_index is not None else CareIndex(care_data)
+    sci_name = None
+    common_name = None
+    candidates = []
+
+    # Determine scientific/common name from input
+    if isinstance(plant_name_id, dict):
+        sci_name = plant_name_id.get('scientific_name')
+        common_name = plant_name_id.get('common_name')
+        candidates = plant_name_id.get('candidates') or []
+    elif isinstance(plant_name_id, str):
+        sci_name = plant_name_id # Assume string input is scientific name for initial search
+
+    # Prepare search terms (lowercase, stripped)
+    search_sci = normalize_name(sci_name) or None
+    search_common = normalize_name(common_name) or None
+
+    # --- Direct Match Logic ---
+    # 1. Match Scientific Name exactly ('Scientific Name' or 'Plant Name')
+    # 2. Match Common Name(s) exactly ('Plant Name' or 'Common Names')
+    plant = index.lookup(search_sci, search_common)
+    if plant is not None:
+        index.learn_taxonomy(candidates)
+        return plant, {'level': MATCH_EXACT}
+
+    # 3. Match PlantNet's alternate candidates exactly, best-ranked first
+    candidate_matches = index.match_candidates(candidates[1:])
+    if candidate_matches:
+        plant, candidate = candidate_matches[0]
+        logger.debug("Care info matched alternate candidate '%s' (%s%%)", candidate.get('scientific_name'),
+                     candidate.get('confidence'))
+        index.learn_taxonomy(candidates)
+        return plant, {'level': MATCH_CANDIDATE}
+
+    # 4. Closest relative: same genus, then same family (O(1) taxonomy lookups)
+    if isinstance(plant_name_id, dict):
+        relative = index.lookup_relative(plant_name_id)
+    else:
+        relative = index.lookup_relative({'scientific_name': sci_name})
+    if relative is not None:
+        plant, level, taxon = relative
+        logger.debug("Care info matched at %s level (%s): '%s'", level, taxon, plant.get('Plant Name'))
+        return plant, {'level': level, 'taxon': taxon}
+
+    # --- Fuzzy Match Logic (if no exact match found) ---
+    from fuzzywuzzy import process
+    all_db_plants_map = index.fuzzy_map
+    all_db_names = index.fuzzy_names
+    if not all_db_names: return None, None # No names to search fuzzily
+
+    best_match_result = None
+    highest_score = 0
+
+    # Fuzzy match using scientific name
+    if search_sci:
+        results_sci = process.extract(search_sci, all_db_names, limit=1) # Find the single best match
+        if results_sci: # Check if any match was found
+            best_sci_match, score_sci = results_sci[0]
+            if score_sci >= match_threshold and score_sci > highest_score: # Use >= threshold
+                highest_score = score_sci
+                best_match_result = all_db_plants_map.get(best_sci_match)
+
+
+    # Fuzzy match using common name (potentially overriding sci match if score is higher)
+    if search_common:
+        results_common = process.extract(search_common, all_db_names, limit=1) # Find the single best match
+        if results_common: # Check if any match was found
+            best_common_match, score_common = results_common[0]
+            if score_common >= match_threshold and score_common > highest_score: # Use >= threshold
+                # highest_score = score_common # Not needed to update highest_score again here
+                best_match_result = all_db_plants_map.get(best_common_match)
+
+
+    if best_match_result is None: # No match met threshold
+        return None, None
+    return best_match_result, {'level': MATCH_FUZZY}
+
+
+@span("find_similar_plant_matches")
+def find_similar_plant_matches(id_result, plant_care_data, limit=3, score_threshold=60, care_index=None):
+    if not id_result or 'error' in id_result or not plant_care_data:
+        return [] # Cannot find matches without valid ID or care data
+
+    index = care_index if care_index is not None else CareIndex(plant_care_data)
+    final_suggestions = []
+    seen_plants = set() # Track plant objects to avoid duplicates if multiple names map to same plant
+
+    # PlantNet's own ranked alternatives come first: exact O(1) hits beat string guessing
+    for plant_info, _ in index.match_candidates(id_result.get('candidates')):
+        final_suggestions.append(plant_info)
+        seen_plants.add(id(plant_info))
+        if len(final_suggestions) >= limit:
+            return final_suggestions
+
+    # Map of unique plant names (prefer scientific, fallback to common) to plant data
+    all_db_plants_map = index.fuzzy_map
+    all_db_names = index.fuzzy_names
+    if not all_db_names: return final_suggestions # No names in DB to compare against
+    from fuzzywuzzy import process
+
+    # Get search terms from ID result
+    search_sci = normalize_name(id_result.get('scientific_name', ''))
+    search_common = normalize_name(id_result.get('common_name', ''))
+
+    # Use fuzzywuzzy to find potential matches based on scientific and common names
+    matches = {} # Store best score for each potential match {db_name: score}
+
+    # Process scientific name matches
+    if search_sci:
+        # Increase limit for extract to get more candidates initially
+        sci_results = process.extract(search_sci, all_db_names, limit=limit * 2)
+        for name, score in sci_results:
+            if score >= score_threshold:
+                # Keep the highest score found for this name (sci vs common)
+                matches[name] = max(matches.get(name, 0), score)
+
+    # Process common name matches
+    if search_common:
+        common_results = process.extract(search_common, all_db_names, limit=limit * 2)
+        for name, score in common_results:
+            if score >= score_threshold:
+                matches[name] = max(matches.get(name, 0), score)
+
+    # Sort matches by score (descending)
+    sorted_matches = sorted(matches.items(), key=lambda item: item[1], reverse=True)
+
+    # Get the unique plant data entries corresponding to the top matches, up to the limit
+    for name, score in sorted_matches:
+        plant_info = all_db_plants_map.get(name)
+        if plant_info and id(plant_info) not in seen_plants:
+            final_suggestions.append(plant_info)
+            seen_plants.add(id(plant_info))
+            if len(final_suggestions) >= limit:
+                break # Stop once we reach the desired number of suggestions
+
+    return final_suggestions
+
+
+@functools.lru_cache(maxsize=None)
+def get_care_scheduler() -> CareScheduler:
+    """Process-wide reminder scheduler; its thread runs independently of Streamlit reruns."""
+    # Saved plants live in this process's memory (plant_storage), so reminders an earlier process kept for
+    # an owner's plant have nobody to come back to them: only unowned ones are reloaded
+    scheduler = CareScheduler(FileSink(CARE_REMINDERS_FILE), state_path=CARE_SCHEDULE_FILE,
+                              keep_loaded=lambda plant: plant.get('owner') is None)
+    scheduler.start()
+    return scheduler
+
+
+def care_schedule_key(owner, nickname):
+    """Scheduler key for one owner's saved plant."""
+    return f"{owner}:{nickname}"
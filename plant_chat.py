@@ -0,0 +1,463 @@
+import functools
+import hashlib
+import json
+import logging
+import re
+import time
+from collections.abc import Mapping
+from datetime import datetime
+
+from api_config import GEMINI_API_KEY, GEMINI_API_URL as GEMINI_API_BASE_URL
+from plant_cache import FlightTimeout, SingleFlight
+from plant_circuit import CircuitOpen, get_breaker
+from plant_greetings import first_turn_answer, fresh_entry, prompt_hash
+from plant_limits import RateLimited, get_limiter, retry_after_seconds
+from plant_metrics import STAGE_HISTOGRAM, span, observe
+
+logger = logging.getLogger(__name__)
+
+GEMINI_API_URL = f"{GEMINI_API_BASE_URL}?key={GEMINI_API_KEY}"
+# Same model, server-sent events: the reply arrives in pieces as it is generated
+GEMINI_STREAM_URL = (GEMINI_API_BASE_URL.replace(":generateContent", ":streamGenerateContent")
+                     + f"?alt=sse&key={GEMINI_API_KEY}")
+# Identical prompts in flight at once (double submits, same FAQ from many users) share one Gemini request
+CHAT_FLIGHT_TIMEOUT_SECONDS = 35
+GEMINI_FLIGHT = SingleFlight("gemini", timeout=CHAT_FLIGHT_TIMEOUT_SECONDS)
+# Latest history messages sent with each request, so a long conversation costs the same per turn
+CONTEXT_MESSAGES = 20
+# Replies send_message/stream_message give instead of the model's answer when something went wrong
+NO_KEY_REPLY = "Gemini API Key is not configured. Cannot send message."
+TIMEOUT_REPLY = "Sorry, I'm feeling a bit slow right now and the request timed out."
+UNREADABLE_REPLY = "Sorry, I received a response I couldn't quite understand from the chat model."
+CONNECTION_REPLY = "Sorry, I'm having trouble communicating with the language model right now."
+INVALID_REPLY = "Sorry, I received an invalid response from the language model."
+UNEXPECTED_REPLY = "Oops, something unexpected went wrong on my end while processing the chat."
+RATE_LIMITED_REPLY = "I'm chatting with a lot of people right now; please ask me again in a minute."
+UNAVAILABLE_REPLY = "I can't chat properly right now; please ask me again in a little while."
+FAILURE_REPLIES = frozenset({NO_KEY_REPLY, TIMEOUT_REPLY, UNREADABLE_REPLY, CONNECTION_REPLY, INVALID_REPLY,
+                             UNEXPECTED_REPLY, RATE_LIMITED_REPLY, UNAVAILABLE_REPLY})
+# Word prefixes -> care field for offline_reply, checked in order
+OFFLINE_TOPICS = (
+    (("water", "thirst", "drink", "dry"), 'Watering', "💧 Here's how I like my water: {}"),
+    (("light", "sun", "shade", "window", "dark"), 'Light Requirements', "☀️ For light, I prefer: {}"),
+    (("humid", "mist"), 'Humidity Preferences', "💦 Humidity-wise: {}"),
+    (("temperature", "cold", "warm", "hot", "heat", "frost"), 'Temperature Range', "🌡️ I'm happiest at {}"),
+    (("feed", "fertili", "food", "nutrient"), 'Feeding Schedule', "🌱 Feeding: {}"),
+    (("toxic", "poison", "pets", "cat", "dog", "safe", "edible"), 'Toxicity', "⚠️ About toxicity: {}"),
+)
+
+
+@functools.lru_cache(maxsize=None)
+def get_eastern_tz():
+    """Chat timestamp timezone, loaded once per process."""
+    import pytz
+    return pytz.timezone('US/Eastern')
+
+
+def chat_timestamp():
+    """'HH:MM' (US/Eastern) shown next to each chat message."""
+    return datetime.now(get_eastern_tz()).strftime("%H:%M")
+
+
+def create_personality_profile(care_info):
+    """Creates personality details, handling missing data and types."""
+    default_personality = {"title": "Standard Plant", "traits": "observant", "prompt": "You are a plant. Respond factually but briefly."}
+    if not care_info or not isinstance(care_info, Mapping):
+        return default_personality
+
+    personality_data = care_info.get("Personality")
+    if not personality_data or not isinstance(personality_data, Mapping):
+        # If no personality dict, try to use plant name as title at least
+        plant_name = care_info.get("Plant Name", "Plant")
+        return {"title": f"The {plant_name}", "traits": "resilient", "prompt": "Respond simply."}
+
+    # Get data with defaults
+    title = personality_data.get("Title", care_info.get("Plant Name", "Plant"))
+    traits_list = personality_data.get("Traits", ["observant"]) # Default to a list
+    prompt = personality_data.get("Prompt", "Respond in character.")
+
+    # Ensure traits_list is ACTUALLY a list (tuple in the frozen shared dataset) before processing
+    if not isinstance(traits_list, (list, tuple)):
+        print(f"WARN: Traits data for {title} was not a list, using default.") # Optional warning
+        traits_list = ["observant"] # Default if type is wrong
+
+    # Now, traits_list is guaranteed to be a list. Create traits_str from it.
+    valid_traits = [str(t) for t in traits_list if t] # Ensure items are strings and not empty
+    traits_str = ", ".join(valid_traits)
+
+    # Ensure traits_str isn't empty AFTER joining/filtering
+    final_traits = traits_str if traits_str else "observant" # Default if filtering removed everything
+
+    return {"title": title, "traits": final_traits, "prompt": prompt}
+
+
+@span("send_message")
+def send_message(messages, fallback=None):
+    """
+    Sends messages to the Gemini API with refined error logging.
+
+    Never raises: failures are logged and answered with a short apology the
+    UI can show as the plant's reply. Concurrent calls with identical messages
+    share one request and its reply. While Gemini's circuit is open (see
+    plant_circuit) no request is made: the reply is `fallback()` if given,
+    otherwise UNAVAILABLE_REPLY.
+    """
+    if not GEMINI_API_KEY:
+        return NO_KEY_REPLY
+    fingerprint = hashlib.sha256(json.dumps(messages, sort_keys=True).encode()).hexdigest()
+    try:
+        return GEMINI_FLIGHT.do(fingerprint, lambda: _request_reply(messages))
+    except FlightTimeout:
+        logger.error("Gave up waiting for an identical Gemini request.")
+        return TIMEOUT_REPLY
+    except CircuitOpen:
+        return fallback() if fallback else UNAVAILABLE_REPLY
+
+
+def _request_reply(messages):
+    """One generateContent request; returns the reply text or an apology."""
+    import requests  # Deferred: ~0.1 s at import, only needed once someone chats
+
+    payload = {"contents": messages}
+    headers = {"Content-Type": "application/json"}
+    breaker = get_breaker("gemini")
+    breaker.allow()  # Raises CircuitOpen while Gemini is down; send_message answers offline
+    limiter = get_limiter("gemini")
+    try:
+        limiter.acquire()
+    except RateLimited as e:
+        breaker.cancel()
+        logger.warning("Gemini request not sent: %s", e)
+        return RATE_LIMITED_REPLY
+    started = time.perf_counter()
+    answered = False  # For the breaker: Gemini responded without a server error
+    try:
+        response = requests.post(GEMINI_API_URL, json=payload, headers=headers, timeout=30)
+        answered = response.status_code < 500
+        response.raise_for_status()
+        data = response.json()
+        # Enhanced parsing to prevent errors
+        candidates = data.get('candidates')
+        if candidates and isinstance(candidates, list) and len(candidates) > 0:
+            first_candidate = candidates[0]
+            if first_candidate and isinstance(first_candidate, dict):
+                content = first_candidate.get('content')
+                if content and isinstance(content, dict):
+                    parts = content.get('parts')
+                    # Check if 'parts' is a list and has at least one element which is a dict with 'text'
+                    if parts and isinstance(parts, list) and len(parts) > 0 and isinstance(parts[0], dict) and 'text' in parts[0]:
+                        return parts[0]['text']
+        # If the expected structure isn't found, log it and return a user-friendly message
+        print("WARN: Unexpected Gemini Response Structure:", json.dumps(data, indent=2)) # Log the structure
+        return UNREADABLE_REPLY
+    except requests.exceptions.Timeout:
+         print("ERROR: Gemini timed out.")
+         return TIMEOUT_REPLY
+    except requests.exceptions.RequestException as e:
+        if e.response is not None and e.response.status_code == 429:
+            limiter.backoff(retry_after_seconds(e.response))
+            return RATE_LIMITED_REPLY
+        err_msg = f"Error calling Gemini API: {e}"
+        resp_text = ""
+        # Try to get more detail from the response if available
+        if e.response is not None:
+            try:
+                resp_json = e.response.json()
+                error_detail = resp_json.get('error', {}).get('message', e.response.text)
+                resp_text = f" | Response Status: {e.response.status_code}, Details: {error_detail}"
+            except json.JSONDecodeError:
+                resp_text = f" | Response Status: {e.response.status_code}, Response Body: {e.response.text}"
+        else:
+             resp_text = " | Response: None"
+        print(f"ERROR: {err_msg}{resp_text}") # Log full details
+        return CONNECTION_REPLY
+    except json.JSONDecodeError: # If the response isn't valid JSON (though raise_for_status should catch HTTP errors)
+        print("ERROR: Gemini invalid JSON response.")
+        return INVALID_REPLY
+    except Exception as e:
+        print(f"ERROR: Unexpected Gemini Error: {e}")
+        return UNEXPECTED_REPLY
+    finally:
+        breaker.record(answered, time.perf_counter() - started)
+
+
+def _candidate_text(data):
+    """Text of the first candidate in a Gemini response (or stream chunk), '' if there is none."""
+    candidates = data.get('candidates') if isinstance(data, dict) else None
+    if not candidates or not isinstance(candidates[0], dict):
+        return ''
+    parts = (candidates[0].get('content') or {}).get('parts') or []
+    return ''.join(part.get('text', '') for part in parts if isinstance(part, dict))
+
+
+def stream_message(messages, fallback=None):
+    """
+    Like send_message, but yields the reply in pieces as Gemini generates them.
+
+    Never raises: on failure it logs and yields the same apology send_message
+    would return (after any pieces already sent), and while Gemini's circuit
+    is open it yields `fallback()` (or UNAVAILABLE_REPLY) as one piece.
+    """
+    import requests
+
+    if not GEMINI_API_KEY:
+        yield NO_KEY_REPLY
+        return
+    breaker = get_breaker("gemini")
+    try:
+        breaker.allow()
+    except CircuitOpen:
+        yield fallback() if fallback else UNAVAILABLE_REPLY
+        return
+    # Not a span: the generator may resume on different threads, and spans nest per thread
+    started = time.perf_counter()
+    limiter = get_limiter("gemini")
+    try:
+        limiter.acquire()
+    except RateLimited as e:
+        breaker.cancel()
+        logger.warning("Gemini request not sent: %s", e)
+        yield RATE_LIMITED_REPLY
+        return
+    sent_at = time.perf_counter()
+    recorded = False  # With the breaker, once the response headers arrive
+    try:
+        with requests.post(GEMINI_STREAM_URL, json={"contents": messages}, stream=True, timeout=30) as response:
+            breaker.record(response.status_code < 500, time.perf_counter() - sent_at)
+            recorded = True
+            response.raise_for_status()
+            sent = False
+            for line in response.iter_lines(chunk_size=None, decode_unicode=True):  # As each event arrives
+                if not line or not line.startswith("data:"):
+                    continue
+                text = _candidate_text(json.loads(line[len("data:"):]))
+                if text:
+                    sent = True
+                    yield text
+            if not sent:
+                logger.warning("Gemini stream ended without any text.")
+                yield UNREADABLE_REPLY
+    except requests.exceptions.Timeout:
+        logger.error("Gemini stream timed out.")
+        yield TIMEOUT_REPLY
+    except requests.exceptions.RequestException as e:
+        if e.response is not None and e.response.status_code == 429:
+            limiter.backoff(retry_after_seconds(e.response))
+            yield RATE_LIMITED_REPLY
+            return
+        logger.error("Error streaming from Gemini API: %s", e)
+        yield CONNECTION_REPLY
+    except json.JSONDecodeError:
+        logger.error("Gemini stream sent invalid JSON.")
+        yield INVALID_REPLY
+    finally:
+        if not recorded:  # No response at all: connection error or timeout
+            breaker.record(False, time.perf_counter() - sent_at)
+        observe(STAGE_HISTOGRAM, time.perf_counter() - started, stage="stream_message")
+
+
+def build_chat_messages(care_info, conversation_history, id_result=None):
+    """
+    Gemini `contents` for a conversation: the in-character system prompt, then the history.
+
+    Uses the care profile when there is one, otherwise a generic prompt from the
+    identification. Returns None when there is neither. Only the last
+    CONTEXT_MESSAGES of the history are included.
+    """
+    plant_name = "this plant" # Default
+    system_prompt = ""
+
+    # --- Case 1: Specific Care Info IS available ---
+    if care_info and isinstance(care_info, Mapping):
+        personality = create_personality_profile(care_info)
+        plant_name = care_info.get('Plant Name', 'a plant') # Use care_info name
+
+        # Extract Specific Care Details
+        light = care_info.get('Light Requirements', 'not specified')
+        watering = care_info.get('Watering', 'not specified')
+        humidity = care_info.get('Humidity Preferences', 'not specified')
+        temp = care_info.get('Temperature Range', 'not specified')
+        feeding = care_info.get('Feeding Schedule', 'not specified')
+        toxicity = care_info.get('Toxicity', 'not specified')
+
+        # Construct Enhanced System Prompt with specific details
+        system_prompt = f"""
+        CONTEXT: You are providing a short chatbot response (1-3 sentences maximum).
+        TASK: Act *exclusively* as the plant named '{plant_name}'. Stay fully in character. Absolutely DO NOT mention being an AI, model, language model, or similar concepts. Never break character.
+
+        YOUR PERSONALITY:
+        - You are: '{personality['title']}'
+        - Key traits: {personality['traits']}
+        - Guiding philosophy: {personality['prompt']}
+
+        YOUR SPECIFIC CARE NEEDS (Refer *directly* to these details when asked about your care):
+        - My Light Needs: {light}
+        - My Watering Needs: {watering}
+        - My Preferred Humidity: {humidity}
+        - My Ideal Temperature: {temp}
+        - My Feeding Schedule: {feeding}
+        - A Note on Toxicity: {toxicity}
+
+        RESPONSE RULES:
+        1. Always speak in the first person ("I", "me", "my").
+        2. Fully embody the personality described above.
+        3. When asked about light, water, temperature, etc., give answers BASED *ONLY* ON "YOUR SPECIFIC CARE NEEDS" listed above. Do not invent or generalize.
+        4. Keep responses very concise (1-3 sentences max). Be brief.
+        5. **Crucially: Never reveal you are an AI or break character.** Do not use phrases like "As a large language model...".
+        """
+
+    # --- Case 2: Specific Care Info is MISSING, use generic prompt based on ID ---
+    elif id_result and isinstance(id_result, dict) and 'error' not in id_result:
+        # Try to get a name from the ID result
+        plant_name = id_result.get('common_name', id_result.get('scientific_name', 'this plant'))
+        # Clean up potential 'N/A' or empty names
+        if plant_name == 'N/A' or not plant_name.strip():
+            plant_name = 'this plant'
+
+        # Construct Generic System Prompt
+        system_prompt = f"""
+        CONTEXT: You are providing a short chatbot response (1-3 sentences maximum).
+        TASK: Act *exclusively* as the plant identified as '{plant_name}'. Stay fully in character. Absolutely DO NOT mention being an AI, model, language model, or similar concepts. Never break character.
+
+        YOUR SITUATION:
+        - You don't have a specific detailed profile stored here.
+        - Answer questions generally based on your knowledge of '{plant_name}' plants.
+        - If asked about specific preferences (like exact watering schedule, temperature range), politely state you don't have those exact details readily available but can offer general advice for your type.
+
+        RESPONSE RULES:
+        1. Always speak in the first person ("I", "me", "my").
+        2. Embody the general nature of a '{plant_name}'. Be helpful but brief.
+        3. Keep responses very concise (1-3 sentences max).
+        4. **Crucially: Never reveal you are an AI or break character.** Do not use phrases like "As a large language model...". Acknowledge you lack *specific stored details*, not that you are an AI.
+        """
+    # --- Case 3: Cannot Chat (No care_info and no valid id_result) ---
+    else:
+        return None
+
+
+    # --- Prepare message list for Gemini (common for all valid chat cases) ---
+    messages = [
+        {"role": "user", "parts": [{"text": system_prompt}]},
+        {"role": "model", "parts": [{"text": f"Understood. I am {plant_name}. What would you like to know?"}]} # Generic acknowledgement
+    ]
+
+    # Add conversation history (ensure it's valid)
+    valid_history = [
+        m for m in conversation_history
+        if isinstance(m, dict) and "role" in m and "content" in m and m.get("role") in ["user", "assistant", "model"]
+    ]
+    for message_entry in valid_history[-CONTEXT_MESSAGES:]:
+        api_role = "model" if message_entry["role"] in ["assistant", "model"] else "user"
+        messages.append({"role": api_role, "parts": [{"text": str(message_entry["content"])}]})
+    return messages
+
+
+def offline_reply(care_info, conversation_history, id_result=None):
+    """
+    In-character answer without Gemini, for when its circuit is open: the care
+    field matching keywords in the latest user message, a greeting, or a hint
+    at what can be asked (like PlantChatbot._fallback_response).
+    """
+    question = next((str(m.get("content", "")) for m in reversed(conversation_history or [])
+                     if isinstance(m, dict) and m.get("role") == "user"), "")
+    words = re.findall(r"[a-z]+", question.lower())
+    if not care_info or not isinstance(care_info, Mapping):
+        plant_name = (id_result or {}).get('common_name') or "a plant"
+        return f"I'm {plant_name}. {UNAVAILABLE_REPLY}"
+    plant_name = care_info.get('Plant Name', 'this plant')
+    for keywords, field, template in OFFLINE_TOPICS:
+        value = care_info.get(field)
+        if value and any(word.startswith(keywords) for word in words):
+            return template.format(value)
+    if {"hello", "hi", "hey"} & set(words):
+        return f"Hi there! I'm {plant_name}."
+    return (f"I'm {plant_name}. I'm a little quiet right now, but ask me about my water, light, humidity, "
+            f"temperature, feeding or toxicity!")
+
+
+def opening_greeting(care_info):
+    """Pre-generated greeting to open a new chat with this plant (see plant_greetings), or None."""
+    if not care_info or not isinstance(care_info, Mapping):
+        return None
+    entry = fresh_entry(care_info, build_chat_messages(care_info, []))
+    return entry["greeting"] if entry else None
+
+
+def _similar_answer(care_info, conversation_history, messages):
+    """
+    (answer, remember) from the semantic answer cache (see plant_semantic) for the last user message.
+
+    `answer` is the reply to an earlier question close enough to this one, or
+    None; the plant's pre-generated answers count as earlier questions. On a
+    miss in the first user turn, `remember(reply)` stores the model's reply for
+    the next paraphrase; later turns depend on the conversation so far and are
+    only looked up, never stored (`remember` is None).
+    """
+    user_turns = [m for m in conversation_history if isinstance(m, dict) and m.get("role") == "user"]
+    if not user_turns or conversation_history[-1] is not user_turns[-1]:
+        return None, None
+    from plant_semantic import get_answer_cache  # Deferred: numpy (~60 ms), only needed once someone chats
+
+    cache = get_answer_cache()
+    if cache.threshold > 1:  # Disabled
+        return None, None
+    key, question = prompt_hash(messages[:2]), str(user_turns[-1].get("content", ""))
+    entry = fresh_entry(care_info, messages[:2])
+    hit = cache.lookup(key, question, seed=list(entry["answers"].items()) if entry else ())
+    if hit:
+        return hit[0], None
+    if len(user_turns) > 1:
+        return None, None
+    return None, lambda reply: cache.store(key, question, reply)
+
+
+def chat_with_plant(care_info, conversation_history, id_result=None): # Add id_result parameter
+    """
+    Constructs the prompt and calls the Gemini API. Handles missing care_info for generic chat.
+
+    A first question that was pre-answered by plant_greetings is served from its table instead,
+    and a question similar enough to one answered before from the semantic answer cache.
+    """
+    if not GEMINI_API_KEY:
+        return "Chat feature disabled: Gemini API Key not set."
+    messages = build_chat_messages(care_info, conversation_history, id_result)
+    if messages is None:
+        return "Sorry, I don't have enough information about this plant to chat right now."
+    answer = first_turn_answer(care_info, conversation_history, messages)
+    if answer:
+        return answer
+    answer, remember = _similar_answer(care_info, conversation_history, messages)
+    if answer:
+        return answer
+    offline = []
+    reply = send_message(messages, fallback=lambda: offline.append(True) or offline_reply(
+        care_info, conversation_history, id_result))
+    if remember and not offline and reply not in FAILURE_REPLIES:
+        remember(reply)
+    return reply
+
+
+def stream_chat_with_plant(care_info, conversation_history, id_result=None):
+    """chat_with_plant, yielding the reply in pieces (see stream_message)."""
+    if not GEMINI_API_KEY:
+        yield "Chat feature disabled: Gemini API Key not set."
+        return
+    messages = build_chat_messages(care_info, conversation_history, id_result)
+    if messages is None:
+        yield "Sorry, I don't have enough information about this plant to chat right now."
+        return
+    answer = first_turn_answer(care_info, conversation_history, messages)
+    if answer:
+        yield answer
+        return
+    answer, remember = _similar_answer(care_info, conversation_history, messages)
+    if answer:
+        yield answer
+        return
+    offline, pieces = [], []
+    for piece in stream_message(messages, fallback=lambda: offline.append(True) or offline_reply(
+            care_info, conversation_history, id_result)):
+        pieces.append(piece)
+        yield piece
+    if remember and not offline and not FAILURE_REPLIES.intersection(pieces):
+        remember("".join(pieces))
@@ -1,16 +1,31 @@
-import openai
-import os
-from dotenv import load_dotenv
+import functools
 import random
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+import plant_data
+from api_config import OPENAI_API_KEY
+
+
+@functools.lru_cache(maxsize=None)
+def get_openai_client():
+    """Process-wide OpenAI client, created on first use (importing openai alone takes ~0.5 s)."""
+    import openai
+    return openai.OpenAI(api_key=OPENAI_API_KEY)
 
-load_dotenv()
 
 class PlantChatbot:
     def __init__(self, care_info: Dict[str, Any]):
         self.care_info = care_info
         self.personality = self._create_personality_profile()  # Modified to generate personality
-        self.client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+    @property
+    def client(self):
+        return get_openai_client()
+
+    @classmethod
+    def from_plant_name(cls, plant_name: str) -> Optional["PlantChatbot"]:
+        """Build a chatbot for a plant in the shared care database (see plant_data)."""
+        care_info = plant_data.get_plant(plant_name)
+        return cls(care_info) if care_info else None
         
     def _create_personality_profile(self) -> Dict[str, Any]:
         """Generate a dynamic personality profile based on plant characteristics"""
@@ -0,0 +1,263 @@
+import contextlib
+import functools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Sequence
+
+from api_config import CHAT_LOG_DB
+from plant_metrics import REGISTRY, STAGE_HISTOGRAM, incr, observe
+
+logger = logging.getLogger(__name__)
+
+CHAT_LOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "plant_chat_log.db")
+# Messages the chat UI loads at a time (the latest page, then "earlier messages" on request)
+PAGE_SIZE = 20
+# Each conversation's latest messages stay one row each; older ones are compacted into
+# compressed blocks of ARCHIVE_BLOCK messages by the background compactor
+LIVE_MESSAGES = 100
+ARCHIVE_BLOCK = 100
+COMPACT_INTERVAL_SECONDS = 60.0
+
+REGISTRY.describe("plant_chat_log_total", "Chat log messages appended, compacted into archive blocks or expired.")
+
+
+class ChatLogStore:
+    """
+    Append-only chat history per (owner, plant) in SQLite (WAL mode, one
+    connection per thread, shared by the app's processes).
+
+    Every message gets the conversation's next sequence number, so a turn is
+    one small INSERT however long the conversation is, and readers fetch
+    pages of the latest messages by sequence number instead of the whole log.
+    compact() moves all but the latest `live_messages` of a conversation into
+    zlib-compressed JSON blocks of `archive_block` messages, which page()
+    still reads from; start_compactor() does that for every conversation in
+    a daemon thread. path=":memory:" keeps the log in this process only.
+    """
+
+    def __init__(self, path: str, live_messages: int = LIVE_MESSAGES, archive_block: int = ARCHIVE_BLOCK):
+        self.path = path
+        self.live_messages = live_messages
+        self.archive_block = archive_block
+        self._local = threading.local()
+        # An in-memory database exists only for its one connection, so threads take turns with it
+        self._memory = sqlite3.connect(path, isolation_level=None, check_same_thread=False) \
+            if path == ":memory:" else None
+        self._memory_lock = threading.RLock()
+        self._compactor: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        with self._connection() as conn:
+            self._create_tables(conn)
+
+    @staticmethod
+    def _create_tables(conn: sqlite3.Connection):
+        conn.execute("CREATE TABLE IF NOT EXISTS conversations (owner TEXT NOT NULL, plant TEXT NOT NULL,"
+                     " next_seq INTEGER NOT NULL, live INTEGER NOT NULL, updated_at REAL NOT NULL,"
+                     " PRIMARY KEY (owner, plant))")
+        conn.execute("CREATE TABLE IF NOT EXISTS messages (owner TEXT NOT NULL, plant TEXT NOT NULL,"
+                     " seq INTEGER NOT NULL, body TEXT NOT NULL, PRIMARY KEY (owner, plant, seq)) WITHOUT ROWID")
+        conn.execute("CREATE TABLE IF NOT EXISTS archive (owner TEXT NOT NULL, plant TEXT NOT NULL,"
+                     " first_seq INTEGER NOT NULL, last_seq INTEGER NOT NULL, body BLOB NOT NULL,"
+                     " PRIMARY KEY (owner, plant, first_seq)) WITHOUT ROWID")
+
+    @contextlib.contextmanager
+    def _connection(self):
+        if self._memory is not None:
+            with self._memory_lock:
+                yield self._memory
+            return
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        yield conn
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")  # One writer at a time across processes
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    # --- Writes ---
+
+    def extend(self, owner: str, plant: str, messages: Sequence[Dict[str, Any]]) -> List[int]:
+        """Append messages (dicts with role, content, time, ...) in one transaction; returns their seq numbers."""
+        if not messages:
+            return []
+        started = time.perf_counter()
+        with self._transaction() as conn:
+            # No RETURNING: it needs SQLite 3.35, newer than some distributions ship (Debian bullseye: 3.34)
+            conn.execute("INSERT INTO conversations (owner, plant, next_seq, live, updated_at) VALUES (?, ?, ?, ?, ?)"
+                         " ON CONFLICT (owner, plant) DO UPDATE SET next_seq = next_seq + excluded.next_seq,"
+                         " live = live + excluded.live, updated_at = excluded.updated_at",
+                         (owner, plant, len(messages), len(messages), time.time()))
+            first = conn.execute("SELECT next_seq FROM conversations WHERE owner = ? AND plant = ?",
+                                 (owner, plant)).fetchone()[0] - len(messages)
+            seqs = list(range(first, first + len(messages)))
+            conn.executemany("INSERT INTO messages (owner, plant, seq, body) VALUES (?, ?, ?, ?)",
+                             [(owner, plant, seq, json.dumps(_without_seq(m), ensure_ascii=False))
+                              for seq, m in zip(seqs, messages)])
+        incr("plant_chat_log_total", len(messages), event="appended")
+        observe(STAGE_HISTOGRAM, time.perf_counter() - started, stage="chat_log_append")
+        return seqs
+
+    def append(self, owner: str, plant: str, message: Dict[str, Any]) -> int:
+        """Append one message; returns its seq number."""
+        return self.extend(owner, plant, [message])[0]
+
+    def delete(self, owner: str, plant: Optional[str] = None):
+        """Drop one conversation, or all of an owner's with plant=None."""
+        where, args = ("owner = ? AND plant = ?", (owner, plant)) if plant is not None else ("owner = ?", (owner,))
+        with self._transaction() as conn:
+            for table in ("conversations", "messages", "archive"):
+                conn.execute(f"DELETE FROM {table} WHERE {where}", args)
+
+    def touch(self, owner: str):
+        """Mark all of an owner's conversations as active now, so compact_all() doesn't expire them."""
+        with self._transaction() as conn:
+            conn.execute("UPDATE conversations SET updated_at = ? WHERE owner = ?", (time.time(), owner))
+
+    # --- Reads ---
+
+    def count(self, owner: str, plant: str) -> int:
+        """Messages ever appended to the conversation."""
+        with self._connection() as conn:
+            row = conn.execute("SELECT next_seq FROM conversations WHERE owner = ? AND plant = ?",
+                               (owner, plant)).fetchone()
+        return row[0] if row else 0
+
+    def has_before(self, owner: str, plant: str, before: int) -> bool:
+        """Whether the conversation still holds any message older than seq `before`."""
+        with self._connection() as conn:
+            row = conn.execute("SELECT EXISTS (SELECT 1 FROM messages WHERE owner = ? AND plant = ? AND seq < ?)"
+                               " OR EXISTS (SELECT 1 FROM archive WHERE owner = ? AND plant = ? AND first_seq < ?)",
+                               (owner, plant, before, owner, plant, before)).fetchone()
+        return bool(row[0])
+
+    def page(self, owner: str, plant: str, limit: int = PAGE_SIZE, before: Optional[int] = None
+             ) -> List[Dict[str, Any]]:
+        """
+        Up to `limit` messages preceding seq `before` (default: the latest ones), oldest first.
+
+        Each message carries its "seq"; pass the first one's as `before` for the previous page.
+        """
+        before = before if before is not None else 2 ** 62
+        with self._connection() as conn:
+            conn.execute("BEGIN")  # The compactor may move rows into the archive in between otherwise
+            try:
+                rows = conn.execute("SELECT seq, body FROM messages WHERE owner = ? AND plant = ? AND seq < ?"
+                                    " ORDER BY seq DESC LIMIT ?", (owner, plant, before, limit)).fetchall()
+                page = [dict(json.loads(body), seq=seq) for seq, body in rows]
+                if len(page) < limit:  # The rest is compacted
+                    before = page[-1]["seq"] if page else before
+                    for first_seq, body in conn.execute(
+                            "SELECT first_seq, body FROM archive WHERE owner = ? AND plant = ? AND first_seq < ?"
+                            " ORDER BY first_seq DESC", (owner, plant, before)):
+                        block = json.loads(zlib.decompress(body))
+                        older = [dict(m, seq=first_seq + i) for i, m in enumerate(block) if first_seq + i < before]
+                        page.extend(reversed(older[-(limit - len(page)):]))
+                        if len(page) >= limit:
+                            break
+            finally:
+                conn.execute("COMMIT")
+        page.reverse()
+        return page
+
+    # --- Compaction ---
+
+    def compact(self, owner: str, plant: str) -> int:
+        """Move the conversation's messages beyond the latest `live_messages` into archive blocks; returns how many."""
+        with self._transaction() as conn:
+            row = conn.execute("SELECT live FROM conversations WHERE owner = ? AND plant = ?",
+                               (owner, plant)).fetchone()
+            movable = (row[0] - self.live_messages) // self.archive_block * self.archive_block if row else 0
+            if movable <= 0:
+                return 0
+            rows = conn.execute("SELECT seq, body FROM messages WHERE owner = ? AND plant = ?"
+                                " ORDER BY seq LIMIT ?", (owner, plant, movable)).fetchall()
+            for start in range(0, len(rows), self.archive_block):
+                block = rows[start:start + self.archive_block]
+                body = zlib.compress(json.dumps([json.loads(b) for _, b in block], ensure_ascii=False).encode())
+                conn.execute("INSERT INTO archive (owner, plant, first_seq, last_seq, body) VALUES (?, ?, ?, ?, ?)",
+                             (owner, plant, block[0][0], block[-1][0], body))
+            conn.execute("DELETE FROM messages WHERE owner = ? AND plant = ? AND seq <= ?",
+                         (owner, plant, rows[-1][0]))
+            conn.execute("UPDATE conversations SET live = live - ? WHERE owner = ? AND plant = ?",
+                         (len(rows), owner, plant))
+        incr("plant_chat_log_total", len(rows), event="compacted")
+        return len(rows)
+
+    def compact_all(self, max_idle_seconds: Optional[float] = None) -> Dict[str, int]:
+        """
+        compact() every conversation with a full block to move; with
+        `max_idle_seconds`, also drop conversations not appended to for that long.
+        """
+        expired = 0
+        if max_idle_seconds is not None:
+            with self._connection() as conn:
+                idle = conn.execute("SELECT owner, plant FROM conversations WHERE updated_at < ?",
+                                    (time.time() - max_idle_seconds,)).fetchall()
+            for owner, plant in idle:
+                self.delete(owner, plant)
+            expired = len(idle)
+            if expired:
+                incr("plant_chat_log_total", expired, event="expired")
+        with self._connection() as conn:
+            candidates = conn.execute("SELECT owner, plant FROM conversations WHERE live >= ?",
+                                      (self.live_messages + self.archive_block,)).fetchall()
+        compacted = sum(self.compact(owner, plant) for owner, plant in candidates)
+        return {"conversations": len(candidates), "compacted": compacted, "expired": expired}
+
+    def start_compactor(self, interval: float = COMPACT_INTERVAL_SECONDS, max_idle_seconds: Optional[float] = None):
+        """compact_all() every `interval` seconds in a daemon thread (once per store)."""
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+
+        def loop():
+            while not self._stopping.wait(interval):
+                try:
+                    summary = self.compact_all(max_idle_seconds)
+                    if summary["compacted"] or summary["expired"]:
+                        logger.info("Chat log compaction: %d messages of %d conversations archived, %d expired.",
+                                    summary['compacted'], summary['conversations'], summary['expired'])
+                except sqlite3.Error as e:
+                    logger.exception("Chat log compaction failed: %s", e)
+
+        self._stopping.clear()
+        self._compactor = threading.Thread(target=loop, name="chat-log-compactor", daemon=True)
+        self._compactor.start()
+
+    def stop_compactor(self):
+        self._stopping.set()
+        if self._compactor is not None:
+            self._compactor.join(timeout=5)
+
+
+def _without_seq(message: Dict[str, Any]) -> Dict[str, Any]:
+    """Messages read back from the log carry their seq; it is stored as the row key, not in the body."""
+    return {k: v for k, v in message.items() if k != "seq"} if "seq" in message else message
+
+
+@functools.lru_cache(maxsize=None)
+def get_chat_log_store() -> ChatLogStore:
+    """Process-wide chat log: the shared SQLite file unless CHAT_LOG_DB is 'memory'."""
+    if CHAT_LOG_DB == "memory":
+        return ChatLogStore(":memory:")
+    path = CHAT_LOG_DB or CHAT_LOG_FILE
+    try:
+        return ChatLogStore(path)
+    except sqlite3.Error as e:
+        logger.exception("Could not open chat log %s (%s); keeping chat logs in memory for this process.", path, e)
+        return ChatLogStore(":memory:")
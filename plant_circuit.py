@@ -0,0 +1,147 @@
+import functools
+import logging
+import threading
+import time
+from collections import deque
+
+from plant_metrics import REGISTRY, incr
+
+logger = logging.getLogger(__name__)
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+# Exported as a gauge per upstream (plant_<upstream>_circuit_state)
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# Rolling window the error and slow-call rates are computed over
+WINDOW_SECONDS = 60.0
+# Fewer calls than this in the window never open the circuit (one bad request isn't an outage)
+MIN_CALLS = 5
+FAILURE_RATIO = 0.5
+SLOW_RATIO = 0.5
+# How long an open circuit fails fast before letting a probe request through
+OPEN_SECONDS = 30.0
+# Calls that take at least this long count as slow: about half of each upstream's request timeout
+SLOW_CALL_SECONDS = {"plantnet": 10.0, "gemini": 15.0}
+
+REGISTRY.describe("plant_circuit_total", "Upstream circuit breaker transitions and fast-failed calls.")
+
+
+class CircuitOpen(Exception):
+    """A call was refused because its upstream's circuit is open; `retry_after` is a hint in seconds."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker for one upstream API (per process).
+
+    Closed: calls go through, and each one's outcome and duration lands in a
+    rolling window. Once the window holds at least `min_calls` and either the
+    failure or the slow-call share reaches its ratio, the circuit opens.
+    Open: calls fail fast with CircuitOpen for `open_seconds`. Half-open:
+    `probes` calls are let through; if they all succeed in time the circuit
+    closes with an empty window, and any failure opens it again.
+
+    Usage: `breaker.allow()` before the call (raises CircuitOpen), then exactly
+    one `breaker.record(ok, seconds)` after it, or `breaker.cancel()` if the
+    call is not made.
+    """
+
+    def __init__(self, name: str, slow_call_seconds: float, window_seconds: float = WINDOW_SECONDS,
+                 min_calls: int = MIN_CALLS, failure_ratio: float = FAILURE_RATIO, slow_ratio: float = SLOW_RATIO,
+                 open_seconds: float = OPEN_SECONDS, probes: int = 1):
+        self.name = name
+        self.slow_call_seconds = slow_call_seconds
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.slow_ratio = slow_ratio
+        self.open_seconds = open_seconds
+        self.probes = probes
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._calls = deque()  # (finished_at, failed, slow) inside the window
+        self._opened_at = 0.0
+        self._probes_out = 0
+        self._probes_ok = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() >= self._opened_at + self.open_seconds:
+                return HALF_OPEN  # Will let the next call through as a probe
+            return self._state
+
+    def allow(self):
+        """Permission for one upstream call; raises CircuitOpen while the circuit is open."""
+        with self._lock:
+            now = time.monotonic()
+            if self._state == OPEN:
+                if now < self._opened_at + self.open_seconds:
+                    incr("plant_circuit_total", upstream=self.name, event="rejected")
+                    raise CircuitOpen(f"{self.name} is unavailable (circuit open)",
+                                      self._opened_at + self.open_seconds - now)
+                self._transition(HALF_OPEN)
+            if self._state == HALF_OPEN:
+                if self._probes_out >= self.probes:  # Probes already in flight: keep failing fast meanwhile
+                    incr("plant_circuit_total", upstream=self.name, event="rejected")
+                    raise CircuitOpen(f"{self.name} is unavailable (checking whether it recovered)",
+                                      self.open_seconds)
+                self._probes_out += 1
+
+    def cancel(self):
+        """The call allowed by allow() was not made after all (e.g. shed by the rate limiter)."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes_out = max(0, self._probes_out - 1)
+
+    def record(self, ok: bool, seconds: float):
+        """Outcome of a call allowed by allow(): `ok` False for errors/timeouts, `seconds` its duration."""
+        failed, slow = not ok, seconds >= self.slow_call_seconds
+        with self._lock:
+            now = time.monotonic()
+            if self._state == HALF_OPEN:
+                self._probes_out = max(0, self._probes_out - 1)
+                if failed or slow:
+                    self._open(now)
+                else:
+                    self._probes_ok += 1
+                    if self._probes_ok >= self.probes:
+                        self._calls.clear()
+                        self._transition(CLOSED)
+                return
+            if self._state == OPEN:  # Call started before the circuit opened
+                return
+            self._calls.append((now, failed, slow))
+            while self._calls and self._calls[0][0] <= now - self.window_seconds:
+                self._calls.popleft()
+            total = len(self._calls)
+            if total >= self.min_calls:
+                failures = sum(1 for _, f, _ in self._calls if f)
+                slow_calls = sum(1 for _, _, s in self._calls if s)
+                if failures >= total * self.failure_ratio or slow_calls >= total * self.slow_ratio:
+                    logger.warning("%s circuit opened: %d failed and %d slow of the last %d calls; "
+                                   "failing fast for %.0fs.", self.name, failures, slow_calls, total, self.open_seconds)
+                    self._open(now)
+
+    def _open(self, now):
+        self._opened_at = now
+        self._calls.clear()
+        self._transition(OPEN)
+
+    def _transition(self, state):
+        """Holds the lock."""
+        self._state = state
+        self._probes_out = self._probes_ok = 0
+        incr("plant_circuit_total", upstream=self.name, event=state)
+
+
+@functools.lru_cache(maxsize=None)
+def get_breaker(upstream: str) -> CircuitBreaker:
+    """Process-wide breaker for 'plantnet' or 'gemini'; its state is exported as a gauge."""
+    breaker = CircuitBreaker(upstream, SLOW_CALL_SECONDS[upstream])
+    REGISTRY.gauge(f"plant_{upstream}_circuit_state", lambda: STATE_VALUES[breaker.state])
+    return breaker
@@ -1,9 +1,190 @@
 import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
 
-def load_plant_data():
-    with open('plant_care_instructions.json') as f:
-        return json.load(f)
+from plant_facets import FacetIndex
+from plant_index import CareIndex
+from plant_records import to_records
+from plant_search import SearchIndex
 
-def get_plant(plant_name):
-    plants = load_plant_data()
-    return next((p for p in plants if p["Plant Name"].lower() == plant_name.lower()), None)
\ No newline at end of file
+logger = logging.getLogger(__name__)
+
+# Care + personality database shared by the Streamlit app and the chatbot
+PLANT_CARE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "plants_with_personality3_copy.json")
+
+
+class CareDataset:
+    """
+    One parsed, immutable version of the care file plus its lookup indexes.
+
+    Records are read-only PlantCareRecords (see plant_records) because every
+    session in the process shares the same objects by reference: nothing is
+    copied per rerun, so nothing may be mutated either. Use dict(record) for a
+    private, writable copy.
+    """
+
+    def __init__(self, filepath: str, records: Sequence[Mapping[str, Any]], mtime: float, version: int = 1,
+                 source_signature: Optional[Tuple[int, int]] = None):
+        self.filepath = filepath
+        self.records = records
+        self.mtime = mtime
+        self.version = version
+        self.index = CareIndex(records)
+        self.facets = FacetIndex(records)
+        self.search = SearchIndex.load_or_build(filepath, records, source_signature)
+
+
+def _load_care_file(filepath: str, version: int = 1) -> CareDataset:
+    stat = os.stat(filepath)  # Before reading, so a concurrent edit shows up as a newer mtime
+    return CareDataset(filepath, _read_care_file(filepath), stat.st_mtime, version,
+                       (stat.st_mtime_ns, stat.st_size))
+
+
+def _read_care_file(filepath: str) -> Sequence[Mapping[str, Any]]:
+    with open(filepath, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    # Basic validation: Check if it's a list
+    if not isinstance(data, list):
+        raise ValueError(f"Error in {filepath}: Expected a JSON list, but got {type(data).__name__}.")
+    return to_records(data)
+
+
+class CareDataStore:
+    """
+    Versioned, hot-reloadable holder for the current CareDataset.
+
+    A daemon thread polls the file; when it changes (and has stopped changing
+    for one poll interval, so half-written files are skipped) the new version
+    is parsed and indexed in that background thread and then swapped in with a
+    single reference assignment. Readers call snapshot() once per request and
+    keep using that dataset, so they never see a mix of versions and never wait
+    on a reload. If the new file fails to parse, the previous version stays live.
+    """
+
+    def __init__(self, filepath: str = PLANT_CARE_FILE, poll_interval: float = 5.0):
+        self.filepath = filepath
+        self.poll_interval = poll_interval
+        self._current = _load_care_file(filepath)
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._reload_lock = threading.Lock()
+
+    def snapshot(self) -> CareDataset:
+        return self._current
+
+    @property
+    def version(self) -> int:
+        return self._current.version
+
+    def reload(self) -> bool:
+        """Rebuild from disk and swap it in. Returns False (keeping the old version) on errors."""
+        with self._reload_lock:
+            current = self._current
+            try:
+                dataset = _load_care_file(self.filepath, current.version + 1)
+            except Exception as e:
+                logger.exception("Care data reload from %s failed, keeping version %d: %s",
+                                 self.filepath, current.version, e)
+                return False
+            # Keep genus -> family links PlantNet taught the previous index
+            dataset.index.learn_taxonomy(current.index.taxonomy_links())
+            self._current = dataset
+            logger.info("Care data reloaded: version %d, %d records.", dataset.version, len(dataset.records))
+            return True
+
+    def start_watching(self):
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="care-data-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.filepath)
+            return stat.st_mtime, stat.st_size
+        except OSError:
+            return None  # Mid-replace or deleted: try again next poll
+
+    def _watch(self):
+        pending = None
+        rejected = None  # Signature of a file version that failed to load; wait for the next edit
+        while not self._stop.wait(self.poll_interval):
+            signature = self._file_signature()
+            if signature is None or signature[0] == self._current.mtime or signature == rejected:
+                pending = None
+            elif signature == pending:  # Changed, and stable since the last poll
+                if not self.reload():
+                    rejected = signature
+                pending = None
+            else:
+                pending = signature
+
+
+_stores: Dict[str, CareDataStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(filepath: str = PLANT_CARE_FILE) -> CareDataStore:
+    """The process-wide store for `filepath`, loaded on first use and watched for changes."""
+    store = _stores.get(filepath)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(filepath)
+            if store is None:
+                store = CareDataStore(filepath)
+                store.start_watching()
+                _stores[filepath] = store
+    return store
+
+
+def load_dataset(filepath: str = PLANT_CARE_FILE) -> CareDataset:
+    """
+    The current version of the care file and its indexes.
+
+    Loaded once per process and hot-swapped in the background when the file
+    changes (see CareDataStore). Raises FileNotFoundError,
+    json.JSONDecodeError or ValueError if the file is missing or malformed on
+    first load.
+    """
+    return get_store(filepath).snapshot()
+
+
+def load_plant_data(filepath: str = PLANT_CARE_FILE) -> Sequence[Mapping[str, Any]]:
+    return load_dataset(filepath).records
+
+
+def get_plant(plant_name: str, filepath: str = PLANT_CARE_FILE) -> Optional[Mapping[str, Any]]:
+    """Exact (case-insensitive) lookup by scientific, plant or common name."""
+    return load_dataset(filepath).index.lookup(plant_name, plant_name)
+
+
+def get_many(plant_names: Iterable[str], filepath: str = PLANT_CARE_FILE) -> Dict[str, Optional[Mapping[str, Any]]]:
+    """Batch get_plant: every name is resolved against the same dataset version."""
+    index = load_dataset(filepath).index
+    return {name: index.lookup(name, name) for name in plant_names}
+
+
+def search(query: str, limit: int = 10, filepath: str = PLANT_CARE_FILE) -> List[Mapping[str, Any]]:
+    """Plants whose name, or any word of it, starts with `query`."""
+    return load_dataset(filepath).index.prefix_search(query, limit)
+
+
+def find_plants(limit: Optional[int] = None, filepath: str = PLANT_CARE_FILE, **conditions) -> List[Mapping[str, Any]]:
+    """
+    Plants matching growing conditions, e.g.
+    find_plants(light=['low'], pet_safe=True, temp_range_c=(18, 24)).
+    See FacetIndex.match_mask for the supported conditions.
+    """
+    return load_dataset(filepath).facets.query(limit=limit, **conditions)
+
+
+def search_text(query: str, limit: int = 10, filepath: str = PLANT_CARE_FILE) -> List[Tuple[Mapping[str, Any], float]]:
+    """Full-text search over every care and personality field, BM25-ranked: [(record, score), ...]."""
+    dataset = load_dataset(filepath)
+    return [(dataset.records[i], score) for i, score in dataset.search.search(query, limit)]
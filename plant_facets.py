@@ -0,0 +1,217 @@
+import re
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Light categories, dimmest first (roughly <1k, 1-10k, 10-25k and >25k lux)
+LIGHT_LOW = "low"
+LIGHT_MEDIUM = "medium"
+LIGHT_BRIGHT_INDIRECT = "bright indirect"
+LIGHT_DIRECT = "direct sun"
+LIGHT_CATEGORIES = (LIGHT_LOW, LIGHT_MEDIUM, LIGHT_BRIGHT_INDIRECT, LIGHT_DIRECT)
+
+# Watering needs
+WATER_LOW = "low"
+WATER_MODERATE = "moderate"
+WATER_HIGH = "high"
+WATERING_CATEGORIES = (WATER_LOW, WATER_MODERATE, WATER_HIGH)
+
+# Humidity when a record names a level but no percentage
+HUMIDITY_WORDS = (("very high", 80), ("moderate to high", 60), ("high", 70), ("moderate", 50),
+                  ("average", 50), ("low", 30))
+
+_PERCENT = re.compile(r"(\d+(?:\.\d+)?)\s*%")
+_HOURS = re.compile(r"(\d+)(?:\s*(?:to|-|–)\s*(\d+))?\s*hours?", re.IGNORECASE)
+_TEMPERATURE = re.compile(r"(-?\d+(?:\.\d+)?)(?:\s*(?:to|-|–)\s*(-?\d+(?:\.\d+)?))?\s*°\s*([CF])", re.IGNORECASE)
+
+
+class CareAttributes(NamedTuple):
+    """Normalized, filterable view of one record's free-text care fields (None = unknown)."""
+    light: Tuple[str, ...]          # Preferred category first, then any tolerated ones
+    light_hours: Optional[int]
+    humidity_pct: Optional[float]
+    temp_min_c: Optional[float]
+    temp_max_c: Optional[float]
+    pet_safe: Optional[bool]
+    watering: Optional[str]
+
+
+def parse_light(text: Any) -> Tuple[Tuple[str, ...], Optional[int]]:
+    """'Indirect Bright (8 Hours), tolerates low light' -> (('bright indirect', 'low'), 8)"""
+    if not isinstance(text, str) or not text.strip():
+        return (), None
+    lower = text.lower()
+    categories = []
+    if "indirect" in lower:
+        categories.append(LIGHT_BRIGHT_INDIRECT)
+    elif "direct" in lower or "full sun" in lower:
+        categories.append(LIGHT_DIRECT)
+    elif "medium" in lower or "partial" in lower:
+        categories.append(LIGHT_MEDIUM)
+    elif "low" in lower or "shade" in lower:
+        categories.append(LIGHT_LOW)
+    if "low light" in lower:
+        categories.append(LIGHT_LOW)
+    if "partial shade" in lower:
+        categories.append(LIGHT_MEDIUM)
+    hours = _HOURS.search(lower)
+    return tuple(dict.fromkeys(categories)), int(hours.group(1)) if hours else None
+
+
+def parse_humidity(text: Any) -> Optional[float]:
+    """'Moderate humidity (~50%)' -> 50.0; 'Moderate' -> 50.0"""
+    if not isinstance(text, str) or not text.strip():
+        return None
+    match = _PERCENT.search(text)
+    if match:
+        return float(match.group(1))
+    lower = text.lower()
+    for word, pct in HUMIDITY_WORDS:
+        if word in lower:
+            return float(pct)
+    return None
+
+
+def parse_temperature(text: Any) -> Tuple[Optional[float], Optional[float]]:
+    """'22° C' -> (22, 22); '18-24°C' -> (18, 24); '75°F' -> (23.9, 23.9)"""
+    if not isinstance(text, str):
+        return None, None
+    values = []
+    for low, high, unit in _TEMPERATURE.findall(text):
+        for value in (low, high):
+            if value:
+                celsius = float(value)
+                if unit.upper() == "F":
+                    celsius = round((celsius - 32) * 5 / 9, 1)
+                values.append(celsius)
+    if not values:
+        return None, None
+    return min(values), max(values)
+
+
+def parse_toxicity(text: Any) -> Optional[bool]:
+    """True if safe for pets (non-toxic), False if toxic, None if unknown."""
+    if not isinstance(text, str) or not text.strip():
+        return None
+    lower = text.lower()
+    if re.search(r"\b(non-toxic|not toxic|not known to be toxic)\b", lower):
+        return True
+    if "toxic" in lower:
+        return False
+    return None
+
+
+def parse_watering(text: Any) -> Optional[str]:
+    """Coarse watering need: 'low' (let it dry out), 'moderate' or 'high' (keep moist)."""
+    if not isinstance(text, str) or not text.strip():
+        return None
+    lower = text.lower()
+    if re.search(r"\b(dry;|minimal|drought|almost completely dry|very dry|infrequent|occasionally)", lower):
+        return WATER_LOW
+    if re.search(r"\b(wet|evenly moist|consistently moist|constantly moist)", lower):
+        return WATER_HIGH
+    return WATER_MODERATE
+
+
+def extract_attributes(record: Any) -> CareAttributes:
+    light, hours = parse_light(record.get('Light Requirements'))
+    temp_min, temp_max = parse_temperature(record.get('Temperature Range'))
+    return CareAttributes(
+        light=light,
+        light_hours=hours,
+        humidity_pct=parse_humidity(record.get('Humidity Preferences')),
+        temp_min_c=temp_min,
+        temp_max_c=temp_max,
+        pet_safe=parse_toxicity(record.get('Toxicity')),
+        watering=parse_watering(record.get('Watering')),
+    )
+
+
+class _SortedColumn:
+    """Numeric column kept as (sorted values, record positions) for range queries via binary search."""
+
+    def __init__(self, values: Sequence[Optional[float]]):
+        known = np.array([i for i, v in enumerate(values) if v is not None], dtype=np.int64)
+        column = np.array([values[i] for i in known], dtype=np.float64)
+        order = np.argsort(column, kind="stable")
+        self.values = column[order]
+        self.positions = known[order]
+
+    def mask(self, size: int, low: Optional[float] = None, high: Optional[float] = None) -> np.ndarray:
+        start = 0 if low is None else np.searchsorted(self.values, low, side="left")
+        stop = len(self.values) if high is None else np.searchsorted(self.values, high, side="right")
+        result = np.zeros(size, dtype=bool)
+        result[self.positions[start:stop]] = True
+        return result
+
+
+class FacetIndex:
+    """
+    Facet indexes over the parsed care attributes of a dataset.
+
+    Categorical facets (light, watering, pet safety) are precomputed boolean
+    bitmaps; numeric facets (humidity, temperature) are sorted arrays searched
+    with binary search. A query ANDs the relevant bitmaps, so it costs a few
+    vectorised passes over n bits rather than a Python loop over records.
+    Records with an unknown value never match a filter on that facet.
+    """
+
+    def __init__(self, records: Sequence[Any]):
+        self.records = records
+        self.size = len(records)
+        # Many records share identical strings, so parse each distinct record text once
+        parsed: Dict[Tuple, CareAttributes] = {}
+        self.attributes: List[CareAttributes] = []
+        for record in records:
+            key = tuple(record.get(field) for field in ('Light Requirements', 'Humidity Preferences',
+                                                       'Temperature Range', 'Toxicity', 'Watering'))
+            attrs = parsed.get(key)
+            if attrs is None:
+                attrs = parsed[key] = extract_attributes(record)
+            self.attributes.append(attrs)
+
+        self._light = {category: self._bitmap(lambda a, c=category: c in a.light) for category in LIGHT_CATEGORIES}
+        self._watering = {category: self._bitmap(lambda a, c=category: a.watering == c)
+                          for category in WATERING_CATEGORIES}
+        self._pet_safe = {flag: self._bitmap(lambda a, f=flag: a.pet_safe is f) for flag in (True, False)}
+        self._humidity = _SortedColumn([a.humidity_pct for a in self.attributes])
+        self._temp_min = _SortedColumn([a.temp_min_c for a in self.attributes])
+        self._temp_max = _SortedColumn([a.temp_max_c for a in self.attributes])
+
+    def _bitmap(self, predicate) -> np.ndarray:
+        return np.fromiter((predicate(a) for a in self.attributes), dtype=bool, count=self.size)
+
+    def match_mask(self, light: Optional[Iterable[str]] = None, watering: Optional[Iterable[str]] = None,
+                   pet_safe: Optional[bool] = None, humidity_range: Optional[Tuple[float, float]] = None,
+                   temp_range_c: Optional[Tuple[float, float]] = None) -> np.ndarray:
+        """
+        Boolean mask of records matching every given condition.
+
+        light / watering: any of the given categories. temp_range_c: the plant's
+        temperature range overlaps the given (min, max). humidity_range: the
+        plant's preferred humidity lies within it.
+        """
+        mask = np.ones(self.size, dtype=bool)
+        if light:
+            mask &= np.logical_or.reduce([self._light[c] for c in light])
+        if watering:
+            mask &= np.logical_or.reduce([self._watering[c] for c in watering])
+        if pet_safe is not None:
+            mask &= self._pet_safe[bool(pet_safe)]
+        if humidity_range is not None:
+            mask &= self._humidity.mask(self.size, humidity_range[0], humidity_range[1])
+        if temp_range_c is not None:
+            low, high = temp_range_c
+            mask &= self._temp_min.mask(self.size, high=high)
+            mask &= self._temp_max.mask(self.size, low=low)
+        return mask
+
+    def query(self, limit: Optional[int] = None, **conditions) -> List[Any]:
+        """Records matching `conditions` (see match_mask), in file order."""
+        positions = np.flatnonzero(self.match_mask(**conditions))
+        if limit is not None:
+            positions = positions[:limit]
+        return [self.records[i] for i in positions]
+
+    def count(self, **conditions) -> int:
+        return int(np.count_nonzero(self.match_mask(**conditions)))
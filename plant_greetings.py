@@ -0,0 +1,257 @@
+"""
+Pre-generated opening chat turns for the whole care catalog.
+
+    python plant_greetings.py [--questions 6] [--concurrency 4] [--plants N] [--force]
+
+The batch job asks Gemini (or whatever GEMINI_API_URL points at, e.g. the
+benchmark stubs) for every plant's greeting and its answers to the
+COMMON_QUESTIONS, at batch priority and with at most --concurrency requests
+in flight, and writes them to a versioned artifact next to the care file
+(*.chat-warm.json). Entries already in the artifact are kept if still fresh,
+so an interrupted or quota-limited run picks up where it stopped.
+
+At chat time, the greeting opens a new conversation and a first question
+that matches one of the common questions is answered from the table
+without a model round-trip. Entries are keyed by a hash of the model and the
+plant's system prompt, so they go stale (and are regenerated or ignored)
+when the care record, the prompt template or the model changes, and plants
+sharing a name but not a care record never get each other's answers.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from api_config import CHAT_WARM_FILE, GEMINI_API_URL
+from plant_limits import PRIORITY_BATCH, request_priority
+from plant_metrics import REGISTRY, incr
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_FORMAT_VERSION = 1
+ARTIFACT_SUFFIX = ".chat-warm.json"
+GREETING_PROMPT = "Hello! Please introduce yourself to your new owner in one or two sentences."
+# Most common first questions, most common first; --questions N pre-generates the first N
+COMMON_QUESTIONS = (
+    "How often should I water you?",
+    "How much light do you need?",
+    "What temperature do you like?",
+    "Are you toxic to pets?",
+    "How humid should it be for you?",
+    "When should I feed you?",
+    "How do I keep you healthy?",
+    "Why are your leaves turning yellow?",
+)
+DEFAULT_QUESTIONS = 6
+DEFAULT_CONCURRENCY = 4
+# The batch job rewrites the artifact after this many replies, so a crash loses little
+CHECKPOINT_EVERY = 100
+
+REGISTRY.describe("plant_chat_prewarmed_total", "First chat turns served from the pre-generated table, or not.")
+
+_WORD = re.compile(r"[a-z0-9']+")
+_table_lock = threading.Lock()
+_table: Tuple[Optional[Tuple[int, int]], Dict[str, Dict[str, Any]]] = (None, {})  # (file signature, entries)
+
+
+def artifact_path(care_filepath: Optional[str] = None) -> str:
+    """CHAT_WARM_FILE for the app's care file, otherwise *.chat-warm.json next to the care file."""
+    import plant_data  # Deferred, like the dataset itself: it pulls in numpy (~60 ms) for the search index
+
+    if CHAT_WARM_FILE and care_filepath in (None, plant_data.PLANT_CARE_FILE):
+        return CHAT_WARM_FILE
+    return os.path.splitext(care_filepath or plant_data.PLANT_CARE_FILE)[0] + ARTIFACT_SUFFIX
+
+
+def normalize_question(text: Any) -> str:
+    """Lowercase words only, so 'How often should I water you?' matches 'how often should i water you'."""
+    return " ".join(_WORD.findall(text.lower())) if isinstance(text, str) else ''
+
+
+def model_name() -> str:
+    """'gemini-1.5-flash' from GEMINI_API_URL."""
+    return GEMINI_API_URL.rsplit("/", 1)[-1].split(":", 1)[0]
+
+
+def prompt_hash(system_messages: Sequence[Mapping]) -> str:
+    """Fingerprint of the model and a plant's system prompt (build_chat_messages with no history)."""
+    return hashlib.sha256(json.dumps([model_name(), list(system_messages)], sort_keys=True).encode()).hexdigest()
+
+
+def read_artifact(path: str) -> Optional[Dict[str, Any]]:
+    """The artifact at `path`, or None if it is missing, from another format version or unreadable."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            artifact = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring unreadable chat warm-up table %s: %s", path, e)
+        return None
+    if not isinstance(artifact, dict) or artifact.get("format") != ARTIFACT_FORMAT_VERSION:
+        logger.warning("Ignoring chat warm-up table %s from another format version.", path)
+        return None
+    return artifact
+
+
+def write_artifact(path: str, artifact: Dict[str, Any]):
+    """Write atomically (temp file + rename) so running apps never read a partial table."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(artifact, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def load_table(path: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Entries in the artifact by prompt_hash; re-read only when the file changes."""
+    global _table
+    path = path or artifact_path()
+    try:
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        signature = None
+    with _table_lock:
+        if _table[0] == signature:
+            return _table[1]
+        artifact = read_artifact(path) if signature is not None else None
+        plants = artifact.get("plants", {}) if artifact else {}
+        _table = (signature, plants)
+        if plants:
+            logger.info("Chat warm-up table loaded: %d plants from %s.", len(plants), path)
+        return plants
+
+
+def fresh_entry(care_info, system_messages: Sequence[Mapping]) -> Optional[Dict[str, Any]]:
+    """The plant's table entry if one was generated from this exact prompt and model, else None."""
+    if not care_info or not isinstance(care_info, Mapping):
+        return None
+    return load_table().get(prompt_hash(system_messages))
+
+
+def first_turn_answer(care_info, conversation_history, messages) -> Optional[str]:
+    """
+    Pre-generated answer when the conversation's only user message (the last
+    one) is a common question; `messages` is build_chat_messages' output.
+    """
+    user_turns = [m for m in conversation_history if isinstance(m, dict) and m.get("role") == "user"]
+    if len(user_turns) != 1 or conversation_history[-1] is not user_turns[0]:
+        return None
+    entry = fresh_entry(care_info, messages[:2])
+    answer = entry["answers"].get(normalize_question(user_turns[0].get("content"))) if entry else None
+    incr("plant_chat_prewarmed_total", result="hit" if answer else "miss")
+    return answer
+
+
+# --- Batch job ---
+
+def generate(care_filepath: Optional[str] = None, output: Optional[str] = None,
+             questions: Sequence[str] = COMMON_QUESTIONS[:DEFAULT_QUESTIONS], concurrency: int = DEFAULT_CONCURRENCY,
+             limit: Optional[int] = None, force: bool = False) -> Dict[str, Any]:
+    """
+    Fill in the artifact for the first `limit` plants (all by default); returns a summary.
+
+    Each greeting and answer is one send_message call, run on `concurrency`
+    threads at PRIORITY_BATCH, so interactive chats keep their share of the
+    Gemini rate limit and quota. Failed calls are left out and retried on the
+    next run.
+    """
+    import plant_chat  # Not at module level: plant_chat imports this module
+    import plant_data
+
+    care_filepath = care_filepath or plant_data.PLANT_CARE_FILE
+    output = output or artifact_path(care_filepath)
+    previous = {} if force else (read_artifact(output) or {}).get("plants", {})
+    catalog = [r for r in plant_data.load_plant_data(care_filepath) if r.get('Plant Name')]
+    digests = [prompt_hash(plant_chat.build_chat_messages(record, [])) for record in catalog]
+    stat = os.stat(care_filepath)
+    artifact = {"format": ARTIFACT_FORMAT_VERSION, "model": model_name(),
+                "source": os.path.basename(care_filepath), "source_signature": [stat.st_mtime_ns, stat.st_size],
+                "questions": list(questions),
+                # Entries for records that changed or went away are dropped
+                "plants": {digest: previous[digest] for digest in digests if digest in previous}}
+
+    records = list(zip(catalog, digests))[:limit]
+    work: List[Tuple[str, Optional[str], list]] = []  # (prompt hash, question or None for the greeting, messages)
+    for record, key in records:
+        entry = artifact["plants"].get(key) or {"plant": record['Plant Name'], "greeting": None, "answers": {}}
+        artifact["plants"][key] = entry = dict(entry, answers=dict(entry["answers"]))
+        if not entry["greeting"]:
+            work.append((key, None, plant_chat.build_chat_messages(
+                record, [{"role": "user", "content": GREETING_PROMPT}])))
+        for question in questions:
+            if normalize_question(question) not in entry["answers"]:
+                work.append((key, question, plant_chat.build_chat_messages(
+                    record, [{"role": "user", "content": question}])))
+
+    lock = threading.Lock()
+    failed = []
+    done = [0]
+
+    def save():
+        """Holds the lock."""
+        artifact["generated_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        write_artifact(output, artifact)
+
+    def run(item):
+        key, question, messages = item
+        with request_priority(PRIORITY_BATCH):
+            reply = plant_chat.send_message(messages)
+        with lock:
+            if reply in plant_chat.FAILURE_REPLIES:
+                failed.append(reply)
+            elif question is None:
+                artifact["plants"][key]["greeting"] = reply
+            else:
+                artifact["plants"][key]["answers"][normalize_question(question)] = reply
+            done[0] += 1
+            if done[0] % CHECKPOINT_EVERY == 0:
+                save()
+
+    started = time.perf_counter()
+    pool = ThreadPoolExecutor(max_workers=max(1, concurrency))
+    try:
+        for _ in pool.map(run, work):
+            pass
+    finally:  # Keep what was generated, even if interrupted
+        pool.shutdown(cancel_futures=True)  # On Ctrl-C, finish the requests in flight but start no more
+        with lock:
+            save()
+    wall = time.perf_counter() - started
+
+    wanted = {normalize_question(q) for q in questions}
+    complete = sum(1 for _, key in records
+                   if artifact["plants"][key]["greeting"] and wanted <= artifact["plants"][key]["answers"].keys())
+    return {"output": output, "plants": len(records), "complete": complete, "requests": len(work),
+            "failed": len(failed), "seconds": round(wall, 2),
+            "requests_per_s": round(len(work) / wall, 2) if wall else 0.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--care-file", help="Care JSON (default: the app's)")
+    parser.add_argument("--output", help=f"Artifact path (default: CHAT_WARM_FILE, or *{ARTIFACT_SUFFIX} next to "
+                                         f"the care file)")
+    parser.add_argument("--questions", type=int, default=DEFAULT_QUESTIONS,
+                        help=f"Pre-answer the top N of {len(COMMON_QUESTIONS)} common questions")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Gemini requests in flight")
+    parser.add_argument("--plants", type=int, help="Only the first N plants of the catalog")
+    parser.add_argument("--force", action="store_true", help="Regenerate entries that are still fresh")
+    args = parser.parse_args()
+
+    summary = generate(args.care_file, args.output, COMMON_QUESTIONS[:args.questions], args.concurrency,
+                       args.plants, args.force)
+    print(f"{summary['complete']}/{summary['plants']} plants complete in {summary['output']}: "
+          f"{summary['requests']} requests ({summary['failed']} failed, rerun to retry) "
+          f"in {summary['seconds']} s, {summary['requests_per_s']}/s")
+
+
+if __name__ == "__main__":
+    main()
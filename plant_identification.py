@@ -0,0 +1,187 @@
+import functools
+import json
+import logging
+import time
+from typing import Any, Dict
+
+import plant_data
+from api_config import (PLANTNET_API_KEY, PLANTNET_API_URL, CACHE_URL,
+                        LOCAL_MODEL_PATH, LOCAL_MODEL_LABELS, LOCAL_MODEL_CONFIDENCE)
+from plant_cache import CacheBackend, FlightTimeout, SingleFlight, make_cache
+from plant_circuit import CircuitOpen, get_breaker
+from plant_identifiers import CascadeIdentifier, LocalOnnxBackend, PlantNetBackend
+from plant_jobs import IdentificationJobQueue, image_hash
+from plant_limits import RateLimited, get_limiter, retry_after_seconds
+from plant_metrics import REGISTRY, span, incr
+from plant_net import MAX_IMAGES_PER_REQUEST, parse_candidates
+
+logger = logging.getLogger(__name__)
+
+# Identification worker pool (shared by all sessions in this process)
+ID_MAX_WORKERS = 4
+ID_MAX_ACTIVE_PER_USER = 2
+ID_RESULT_RETENTION_SECONDS = 600
+# Identification result cache (shared by all sessions in this process, and by all workers if CACHE_URL is set)
+ID_MAX_CANDIDATES = 5
+ID_CACHE_MAX_ENTRIES = 1024
+ID_CACHE_TTL_SECONDS = 24 * 60 * 60
+# Identical identifications in flight at once (duplicate uploads, double submits) share one PlantNet request
+ID_FLIGHT_TIMEOUT_SECONDS = 25
+PLANTNET_FLIGHT = SingleFlight("plantnet", timeout=ID_FLIGHT_TIMEOUT_SECONDS)
+
+
+@span("identify_plant")
+def identify_plant(images):
+    """Identifies plant using PlantNet API with refined error logging.
+
+    `images` is either raw image bytes or a list of up to five (image_bytes, organ)
+    photos of the same plant, which PlantNet scores together in a single request.
+
+    Runs on the identification worker pool (see plant_jobs.py), so it must not
+    call Streamlit elements; errors are returned and shown by the UI instead.
+    Concurrent calls with the same photos and organs share one request and its
+    result, errors included. While PlantNet is failing or too slow its circuit
+    is open (see plant_circuit) and this returns an error at once, flagged
+    'circuit_open', instead of waiting out the timeout; identify() still serves
+    cached results then, and the local classifier's guess if one is configured.
+    Errors meaning PlantNet could not answer (timeouts, network and 5xx errors,
+    rate limiting, an open circuit, no API key) are flagged 'unavailable'; answers
+    such as "no match" are not, and a no-match is flagged 'no_match'.
+    """
+    if not PLANTNET_API_KEY:
+        return {'error': "PlantNet API Key is not configured.", 'unavailable': True}
+    if isinstance(images, bytes):
+        images = [(images, 'auto')]
+    if not images or len(images) > MAX_IMAGES_PER_REQUEST:
+        return {'error': f"Provide between 1 and {MAX_IMAGES_PER_REQUEST} images of the same plant."}
+    try:
+        return PLANTNET_FLIGHT.do(image_hash(images), lambda: _request_identification(images))
+    except FlightTimeout:
+        logger.error("Gave up waiting for an identical PlantNet request.")
+        return {'error': "API request timed out", 'unavailable': True}
+    except CircuitOpen as e:
+        return {'error': "PlantNet is temporarily unavailable; please try again shortly.",
+                'retry_after': max(1, round(e.retry_after)), 'circuit_open': True, 'unavailable': True}
+
+
+def _request_identification(images):
+    """One PlantNet identify request for validated (image_bytes, organ) photos."""
+    import requests  # Deferred: ~0.1 s at import, only needed once a photo is identified
+
+    files = [('images', (f'image_{i}.jpg', image_bytes)) for i, (image_bytes, _) in enumerate(images)]
+    data = {'organs': [organ for _, organ in images]}
+    params = {'api-key': PLANTNET_API_KEY, 'include-related-images': 'false'}
+    breaker = get_breaker("plantnet")
+    breaker.allow()  # Raises CircuitOpen while PlantNet is down
+    limiter = get_limiter("plantnet")
+    try:
+        limiter.acquire()  # Queues by request priority; sheds instead of spending past the quota
+    except RateLimited as e:
+        breaker.cancel()
+        logger.warning("PlantNet request not sent: %s", e)
+        return {'error': f"Identification is busy right now ({e}); please try again later.",
+                'retry_after': round(e.retry_after), 'unavailable': True}
+    started = time.perf_counter()
+    answered = False  # For the breaker: PlantNet responded without a server error (404 = no match)
+    try:
+        response = requests.post(PLANTNET_API_URL, files=files, data=data, params=params, timeout=20)
+        answered = response.status_code < 500
+        response.raise_for_status()
+        data = response.json()
+        if "results" in data and data["results"]:
+            best_result = data["results"][0]
+            sci_name = best_result["species"].get("scientificNameWithoutAuthor", "Unknown")
+            common_name = (best_result["species"].get("commonNames") or ["Unknown"])[0]
+            confidence = round(best_result.get("score", 0) * 100, 1)
+            # Keep the ranked alternatives too: they are matched against the care DB before any fuzzy search
+            candidates = parse_candidates(data["results"], ID_MAX_CANDIDATES)
+            return {'scientific_name': sci_name, 'common_name': common_name, 'confidence': confidence,
+                    'candidates': candidates}
+        else:
+            return {'error': "No plant matches found by PlantNet.", 'no_match': True}
+    except requests.exceptions.Timeout:
+         print("ERROR: PlantNet API timed out.") # Log for server console
+         return {'error': "API request timed out", 'unavailable': True}
+    except requests.exceptions.RequestException as e:
+        if e.response is not None and e.response.status_code == 404:  # PlantNet's answer for "no species found"
+            return {'error': "No plant matches found by PlantNet.", 'no_match': True}
+        if e.response is not None and e.response.status_code == 429:
+            retry_after = retry_after_seconds(e.response)
+            limiter.backoff(retry_after)  # Pause every session (and worker) instead of piling on more 429s
+            return {'error': "PlantNet is rate limiting requests; please try again shortly.",
+                    'retry_after': round(retry_after or 60), 'unavailable': True}
+        err_msg = f"Network/API error connecting to PlantNet: {e}"
+        resp_text = f" | Response: {e.response.text}" if e.response else " | Response: None"
+        print(f"ERROR: {err_msg}{resp_text}") # Log details
+        # No response at all, or a server error: PlantNet is down rather than rejecting this request
+        return {'error': err_msg, 'unavailable': e.response is None or e.response.status_code >= 500}
+    except json.JSONDecodeError:
+         print("ERROR: PlantNet invalid JSON response.")
+         return {'error': "Invalid API response format"}
+    except Exception as e:
+        print(f"ERROR: Unexpected PlantNet Error: {e}")
+        return {'error': f"Unexpected Error: {e}"}
+    finally:
+        breaker.record(answered, time.perf_counter() - started)
+
+
+@functools.lru_cache(maxsize=None)
+def get_identification_cache() -> CacheBackend:
+    """Process-wide cache of successful identifications (with candidates), keyed by image hash."""
+    cache = make_cache(CACHE_URL, "identification", max_entries=ID_CACHE_MAX_ENTRIES,
+                       ttl_seconds=ID_CACHE_TTL_SECONDS)
+    REGISTRY.gauge("plant_identification_cache_entries", lambda: len(cache))
+    return cache
+
+
+@functools.lru_cache(maxsize=None)
+def get_identifier() -> CascadeIdentifier:
+    """PlantNet identifier, fronted by the warm-loaded local classifier when one is configured."""
+    local = None
+    if LOCAL_MODEL_PATH and LOCAL_MODEL_LABELS:
+        try:
+            care_species = [p.get('Plant Name', '') for p in plant_data.load_plant_data()]
+            local = LocalOnnxBackend(LOCAL_MODEL_PATH, LOCAL_MODEL_LABELS, care_species)
+            logger.info("Local classifier loaded with %d care-DB species.", len(local.species))
+        except Exception as e:
+            logger.exception("Could not load local classifier, using PlantNet only: %s", e)
+    return CascadeIdentifier(PlantNetBackend(identify_plant), local, confidence_threshold=LOCAL_MODEL_CONFIDENCE)
+
+
+def _cacheable(result):
+    # Don't cache errors or offline fallbacks so PlantNet gets another chance next time
+    return isinstance(result, dict) and 'error' not in result and not result.get('fallback')
+
+
+def identify_plant_cached(images, cache, identifier):
+    """
+    Identify via `identifier`, served from `cache` when the same image(s) were identified before.
+
+    Concurrent misses for the same image(s) make one identification between
+    them (across workers too, with a shared cache); the rest wait for it.
+    """
+    computed = []
+
+    def compute():
+        computed.append(True)
+        return identifier.identify(images)
+
+    result = cache.get_or_compute(image_hash(images), compute, should_cache=_cacheable)
+    incr("plant_identification_cache_total", result="miss" if computed else "hit")
+    return result
+
+
+def identify(images) -> Dict[str, Any]:
+    """Identify with the process-wide identifier and result cache (blocking; for bulk jobs, APIs, scripts)."""
+    return identify_plant_cached(images, cache=get_identification_cache(), identifier=get_identifier())
+
+
+@functools.lru_cache(maxsize=None)
+def get_identification_queue() -> IdentificationJobQueue:
+    """Process-wide identification worker pool shared by every session."""
+    return IdentificationJobQueue(
+        identify,
+        max_workers=ID_MAX_WORKERS,
+        max_active_per_user=ID_MAX_ACTIVE_PER_USER,
+        retention_seconds=ID_RESULT_RETENTION_SECONDS,
+    )
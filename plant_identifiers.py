@@ -0,0 +1,211 @@
+import io
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from plant_index import normalize_name
+
+try:
+    import numpy as np
+except ImportError:  # Only needed by the local classifier
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# ImageNet normalisation used by the usual exported image classifiers
+IMAGE_SIZE = 224
+IMAGE_MEAN = (0.485, 0.456, 0.406)
+IMAGE_STD = (0.229, 0.224, 0.225)
+
+
+def catalog_probabilities(logits: "np.ndarray", columns: "np.ndarray") -> "np.ndarray":
+    """
+    Softmax over every output column, then just the catalog `columns`: mass the
+    model puts on species outside the catalog stays out of their confidence.
+    """
+    logits = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return (exp / exp.sum(axis=1, keepdims=True))[:, columns]
+
+
+def _as_image_list(images) -> List[bytes]:
+    """Accept raw bytes or a list of (image_bytes, organ) pairs, return just the bytes."""
+    if isinstance(images, bytes):
+        return [images]
+    return [image_bytes for image_bytes, _ in images]
+
+
+class IdentifierBackend:
+    """
+    A plant identifier. `identify(images)` takes raw image bytes or a list of
+    (image_bytes, organ) photos of one plant and returns the same dict format as
+    identify_plant: {'scientific_name', 'common_name', 'confidence', 'candidates'}
+    on success or {'error': str}, with 'unavailable': True when the backend could
+    not answer at all. Results include the backend name as 'source'.
+    """
+
+    name = "base"
+
+    def identify(self, images) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class PlantNetBackend(IdentifierBackend):
+    """Remote PlantNet identification (wraps identify_plant)."""
+
+    name = "plantnet"
+
+    def __init__(self, identify_fn: Callable[[Any], Dict[str, Any]]):
+        self._identify_fn = identify_fn
+
+    def identify(self, images) -> Dict[str, Any]:
+        result = self._identify_fn(images)
+        if isinstance(result, dict) and 'error' not in result:
+            result = dict(result, source=self.name)
+        return result
+
+
+class LocalOnnxBackend(IdentifierBackend):
+    """
+    CPU image classifier served by ONNX Runtime, restricted to species in the care DB.
+
+    The model must take a float32 NCHW batch of IMAGE_SIZE x IMAGE_SIZE
+    ImageNet-normalised RGB images and return one row of logits per image;
+    `labels_path` lists the scientific name for each output column, one per
+    line. Only species in the care DB are answered, so every answer resolves
+    to a care profile, but their probabilities are the model's own over all
+    columns: a plant the catalog lacks doesn't look like a confident match.
+    The session is created and warmed up once at construction time.
+    """
+
+    name = "local"
+
+    def __init__(self, model_path: str, labels_path: str, care_species: Sequence[str],
+                 top_n: int = 5, num_threads: Optional[int] = None):
+        try:
+            import onnxruntime as ort  # Imported here: ~0.1 s, and only needed when a local model is configured
+        except ImportError:  # Optional: the app runs PlantNet-only without it
+            ort = None
+        if ort is None or np is None:
+            raise ImportError("The local classifier needs the 'onnxruntime' and 'numpy' packages.")
+
+        with open(labels_path, 'r', encoding='utf-8') as f:
+            labels = [line.strip() for line in f if line.strip()]
+        care_names = {normalize_name(name) for name in care_species}
+        self._columns = np.array([i for i, label in enumerate(labels) if normalize_name(label) in care_names],
+                                 dtype=np.int64)
+        if not len(self._columns):
+            raise ValueError(f"None of the labels in {labels_path} match a species in the care database.")
+        self._labels = [labels[i] for i in self._columns]
+        self._top_n = top_n
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self._session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self._input_name = self._session.get_inputs()[0].name
+        # InferenceSession.run is thread-safe, but serialising keeps CPU use predictable under load
+        self._lock = threading.Lock()
+        self._mean = np.array(IMAGE_MEAN, dtype=np.float32).reshape(1, 1, 3)
+        self._std = np.array(IMAGE_STD, dtype=np.float32).reshape(1, 1, 3)
+        self.warm_up()
+
+    @property
+    def species(self) -> List[str]:
+        return list(self._labels)
+
+    def warm_up(self, batch_size: int = 1):
+        """Run one dummy batch so the first real request doesn't pay for graph initialisation."""
+        self._run(np.zeros((batch_size, 3, IMAGE_SIZE, IMAGE_SIZE), dtype=np.float32))
+
+    def preprocess(self, images_bytes: Sequence[bytes]) -> "np.ndarray":
+        """Decode, resize and normalise a batch of images into one NCHW float32 array."""
+        from PIL import Image
+
+        batch = np.empty((len(images_bytes), 3, IMAGE_SIZE, IMAGE_SIZE), dtype=np.float32)
+        for i, image_bytes in enumerate(images_bytes):
+            img = Image.open(io.BytesIO(image_bytes))
+            img.draft("RGB", (IMAGE_SIZE, IMAGE_SIZE))  # JPEG: decode at reduced scale, much cheaper than full size
+            img = img.convert("RGB").resize((IMAGE_SIZE, IMAGE_SIZE), Image.BILINEAR)
+            pixels = np.asarray(img, dtype=np.float32) / 255.0
+            batch[i] = ((pixels - self._mean) / self._std).transpose(2, 0, 1)
+        return batch
+
+    def _run(self, batch: "np.ndarray") -> "np.ndarray":
+        with self._lock:
+            return self._session.run(None, {self._input_name: batch})[0]
+
+    def predict_proba(self, images_bytes: Sequence[bytes]) -> "np.ndarray":
+        """Per-image probabilities of the care-DB species (rows sum to at most 1)."""
+        return catalog_probabilities(self._run(self.preprocess(images_bytes)), self._columns)
+
+    def _result_from_proba(self, proba: "np.ndarray") -> Dict[str, Any]:
+        top = np.argsort(proba)[::-1][:self._top_n]
+        candidates = []
+        for column in top:
+            sci_name = self._labels[column]
+            candidates.append({
+                'scientific_name': sci_name,
+                'common_name': 'Unknown',
+                'common_names': [],
+                'genus': sci_name.split()[0] if sci_name else '',
+                'family': '',
+                'confidence': round(float(proba[column]) * 100, 1),
+            })
+        best = candidates[0]
+        return {
+            'scientific_name': best['scientific_name'],
+            'common_name': best['common_name'],
+            'confidence': best['confidence'],
+            'candidates': candidates,
+            'source': self.name,
+        }
+
+    def identify(self, images) -> Dict[str, Any]:
+        try:
+            # Several photos of one plant: average their probabilities
+            proba = self.predict_proba(_as_image_list(images)).mean(axis=0)
+            return self._result_from_proba(proba)
+        except Exception as e:
+            return {'error': f"Local classifier error: {e}"}
+
+    def identify_many(self, images_bytes: Sequence[bytes]) -> List[Dict[str, Any]]:
+        """Classify many single-image plants in one batched inference call."""
+        try:
+            return [self._result_from_proba(row) for row in self.predict_proba(images_bytes)]
+        except Exception as e:
+            return [{'error': f"Local classifier error: {e}"}] * len(images_bytes)
+
+
+class CascadeIdentifier(IdentifierBackend):
+    """
+    Local-first identification that escalates to PlantNet when unsure.
+
+    The local model answers on its own when its confidence reaches
+    `confidence_threshold` (percent). Otherwise PlantNet is asked; if PlantNet
+    is unavailable (timeout, network or server error, rate limit or quota, open
+    circuit: results flagged 'unavailable') the local guess is returned instead
+    of the error, flagged with 'fallback': True. Other PlantNet errors, such as
+    no match, are returned as they are.
+    """
+
+    name = "cascade"
+
+    def __init__(self, remote: IdentifierBackend, local: Optional[IdentifierBackend] = None,
+                 confidence_threshold: float = 80.0):
+        self.remote = remote
+        self.local = local
+        self.confidence_threshold = confidence_threshold
+
+    def identify(self, images) -> Dict[str, Any]:
+        local_result = self.local.identify(images) if self.local is not None else None
+        local_ok = isinstance(local_result, dict) and 'error' not in local_result
+        if local_ok and local_result.get('confidence', 0) >= self.confidence_threshold:
+            return local_result
+
+        remote_result = self.remote.identify(images)
+        if isinstance(remote_result, dict) and remote_result.get('unavailable') and local_ok:
+            logger.warning("PlantNet unavailable (%s), using local classifier result.", remote_result['error'])
+            return dict(local_result, fallback=True, remote_error=remote_result['error'])
+        return remote_result
+
@@ -0,0 +1,226 @@
+import bisect
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# How a care record was matched to an identification, most to least specific
+MATCH_EXACT = "exact"          # The identified species itself
+MATCH_CANDIDATE = "candidate"  # One of PlantNet's lower-ranked alternative species
+MATCH_GENUS = "genus"          # A different species of the same genus
+MATCH_FAMILY = "family"        # A different genus of the same family
+MATCH_FUZZY = "fuzzy"          # Closest name by string similarity
+
+# Care fields used to rank relatives: a filled-in profile is a better stand-in than a blank one
+CARE_FIELDS = ('Light Requirements', 'Watering', 'Humidity Preferences', 'Temperature Range',
+               'Feeding Schedule', 'Toxicity', 'Additional Care')
+
+
+def normalize_name(name: Any) -> str:
+    """Lowercase/strip a plant name for lookups; non-strings normalize to ''."""
+    return name.lower().strip() if isinstance(name, str) else ''
+
+
+def genus_of(scientific_name: Any) -> str:
+    """Genus (first word of a binomial name), normalized; '' if there is none."""
+    parts = normalize_name(scientific_name).split()
+    return parts[0] if parts else ''
+
+
+def _completeness(plant: Dict[str, Any]) -> int:
+    return sum(1 for field in CARE_FIELDS if isinstance(plant.get(field), str) and plant[field].strip())
+
+
+def _common_names(plant: Dict[str, Any]) -> List[str]:
+    db_commons = plant.get('Common Names', [])
+    if isinstance(db_commons, str):  # Handle single string common name
+        db_commons = [db_commons]
+    return [c for c in db_commons if isinstance(c, str)] if isinstance(db_commons, (list, tuple)) else []
+
+
+class CareIndex:
+    """
+    Hash indexes over the care database, built once per dataset.
+
+    Replaces the linear scans in find_care_instructions with O(1) lookups:
+    - scientific lookups check 'Scientific Name' and 'Plant Name'
+    - common-name lookups check 'Plant Name' and 'Common Names'
+    When several records share a name, the first one in the file wins, matching
+    the behaviour of the original in-order scan.
+
+    It also keeps a taxonomy index for species that aren't in the DB at all:
+    genus -> records (from the binomial 'Plant Name') and family -> records.
+    The care DB has no families, so genus -> family links are learned from the
+    genus/family PlantNet returns with each candidate (see learn_taxonomy).
+    """
+
+    def __init__(self, care_data: Iterable[Dict[str, Any]]):
+        self.records = list(care_data)
+        self._by_scientific: Dict[str, Dict[str, Any]] = {}
+        self._by_common: Dict[str, Dict[str, Any]] = {}
+        # Searchable name -> record for fuzzy matching (scientific/plant name first, then common names)
+        self.fuzzy_map: Dict[str, Dict[str, Any]] = {}
+
+        for plant in self.records:
+            sci = normalize_name(plant.get('Scientific Name', ''))
+            plant_name = normalize_name(plant.get('Plant Name', ''))
+            commons = [normalize_name(c) for c in _common_names(plant)]
+
+            for key in (sci, plant_name):
+                if key:
+                    self._by_scientific.setdefault(key, plant)
+            for key in [plant_name] + commons:
+                if key:
+                    self._by_common.setdefault(key, plant)
+
+            primary_key = sci or plant_name
+            if primary_key:
+                self.fuzzy_map.setdefault(primary_key, plant)
+            for key in commons:
+                if key:
+                    self.fuzzy_map.setdefault(key, plant)
+
+        self.fuzzy_names = list(self.fuzzy_map.keys())
+
+        # Sorted (key, position) pairs for prefix search; keys are full names and each word of them
+        prefix_entries = set()
+        for position, plant in enumerate(self.records):
+            names = [normalize_name(plant.get('Plant Name', '')), normalize_name(plant.get('Scientific Name', ''))]
+            names += [normalize_name(c) for c in _common_names(plant)]
+            for name in names:
+                if name:
+                    prefix_entries.add((name, position))
+                    prefix_entries.update((word, position) for word in name.split())
+        self._prefix_entries = sorted(prefix_entries)
+
+        # Taxonomy index; relatives are ordered most complete care profile first
+        self._by_genus: Dict[str, List[Dict[str, Any]]] = {}
+        for plant in self.records:
+            genus = genus_of(plant.get('Scientific Name') or plant.get('Plant Name'))
+            if genus:
+                self._by_genus.setdefault(genus, []).append(plant)
+        for relatives in self._by_genus.values():
+            relatives.sort(key=_completeness, reverse=True)  # Stable: ties keep file order
+        self._family_of_genus: Dict[str, str] = {}
+        self._by_family: Dict[str, List[Dict[str, Any]]] = {}
+        self._taxonomy_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def lookup_scientific(self, name: Any) -> Optional[Dict[str, Any]]:
+        return self._by_scientific.get(normalize_name(name))
+
+    def lookup_common(self, name: Any) -> Optional[Dict[str, Any]]:
+        return self._by_common.get(normalize_name(name))
+
+    def lookup(self, scientific_name: Any = None, common_name: Any = None) -> Optional[Dict[str, Any]]:
+        """Exact match on scientific name first, then common name."""
+        return self.lookup_scientific(scientific_name) or self.lookup_common(common_name)
+
+    def prefix_search(self, query: Any, limit: int = 10) -> List[Dict[str, Any]]:
+        """Records whose name (or any word of it) starts with `query`; exact name matches first."""
+        query = normalize_name(query)
+        if not query or limit <= 0:
+            return []
+        results = []
+        exact = self.lookup(query, query)
+        if exact is not None:
+            results.append(exact)
+        seen = {id(plant) for plant in results}
+        start = bisect.bisect_left(self._prefix_entries, (query, -1))
+        for key, position in self._prefix_entries[start:]:
+            if len(results) >= limit or not key.startswith(query):
+                break
+            plant = self.records[position]
+            if id(plant) not in seen:
+                seen.add(id(plant))
+                results.append(plant)
+        return results
+
+    def match_candidate(self, candidate: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Exact match for one PlantNet candidate, trying all of its common names."""
+        plant = self.lookup(candidate.get('scientific_name'), candidate.get('common_name'))
+        if plant is None:
+            for common_name in candidate.get('common_names', [])[1:]:
+                plant = self.lookup_common(common_name)
+                if plant is not None:
+                    break
+        return plant
+
+    def match_candidates(self, candidates: Iterable[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        Exact matches for ranked PlantNet candidates, best candidate first.
+
+        Returns:
+            (care_record, candidate) pairs with each care record appearing at most once.
+        """
+        matches = []
+        seen = set()
+        for candidate in candidates or []:
+            if not isinstance(candidate, dict):
+                continue
+            plant = self.match_candidate(candidate)
+            if plant is not None and id(plant) not in seen:
+                seen.add(id(plant))
+                matches.append((plant, candidate))
+        return matches
+
+    def learn_taxonomy(self, candidates: Iterable[Dict[str, Any]]):
+        """Record the genus -> family links PlantNet reported, so family-level lookups can use them."""
+        for candidate in candidates or []:
+            if not isinstance(candidate, dict):
+                continue
+            genus = normalize_name(candidate.get('genus')) or genus_of(candidate.get('scientific_name'))
+            family = normalize_name(candidate.get('family'))
+            if not genus or not family or genus in self._family_of_genus:
+                continue
+            with self._taxonomy_lock:
+                if genus in self._family_of_genus:
+                    continue
+                self._family_of_genus[genus] = family
+                relatives = self._by_genus.get(genus)
+                if relatives:
+                    merged = self._by_family.get(family, []) + relatives
+                    merged.sort(key=_completeness, reverse=True)
+                    self._by_family[family] = merged  # Swap in a new list; readers never see a partial one
+
+    def taxonomy_links(self) -> List[Dict[str, str]]:
+        """Learned genus -> family links, in the candidate format learn_taxonomy accepts."""
+        with self._taxonomy_lock:
+            return [{'genus': genus, 'family': family} for genus, family in self._family_of_genus.items()]
+
+    def lookup_genus(self, genus: Any) -> Optional[Dict[str, Any]]:
+        relatives = self._by_genus.get(normalize_name(genus))
+        return relatives[0] if relatives else None
+
+    def lookup_family(self, family: Any) -> Optional[Dict[str, Any]]:
+        relatives = self._by_family.get(normalize_name(family))
+        return relatives[0] if relatives else None
+
+    def lookup_relative(self, id_result: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], str, str]]:
+        """
+        Closest relative in the care DB for an identification with no exact match.
+
+        Tries every candidate's genus (best-ranked first), then every candidate's
+        family, so a genus hit on a lower-ranked candidate still beats a family hit.
+
+        Returns:
+            (care_record, match_level, taxon) with match_level MATCH_GENUS or
+            MATCH_FAMILY, or None if nothing related is in the DB.
+        """
+        candidates = [c for c in (id_result.get('candidates') or []) if isinstance(c, dict)]
+        if not candidates:
+            candidates = [{'scientific_name': id_result.get('scientific_name')}]
+        self.learn_taxonomy(candidates)
+
+        for candidate in candidates:
+            genus = normalize_name(candidate.get('genus')) or genus_of(candidate.get('scientific_name'))
+            plant = self.lookup_genus(genus)
+            if plant is not None:
+                return plant, MATCH_GENUS, genus
+        for candidate in candidates:
+            genus = normalize_name(candidate.get('genus')) or genus_of(candidate.get('scientific_name'))
+            family = normalize_name(candidate.get('family')) or self._family_of_genus.get(genus, '')
+            plant = self.lookup_family(family)
+            if plant is not None:
+                return plant, MATCH_FAMILY, family
+        return None
@@ -0,0 +1,160 @@
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Job states
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+ACTIVE_STATES = (PENDING, RUNNING)
+
+
+# Either raw image bytes or several (image_bytes, organ) photos of the same plant
+Images = Union[bytes, List[Tuple[bytes, str]]]
+
+
+def image_hash(images: Images) -> str:
+    """Stable fingerprint used to coalesce duplicate uploads of the same image(s)."""
+    if isinstance(images, bytes):
+        return hashlib.sha256(images).hexdigest()
+    digest = hashlib.sha256()
+    for image_bytes, organ in images:
+        digest.update(hashlib.sha256(image_bytes).digest())
+        digest.update(organ.encode())
+    return digest.hexdigest()
+
+
+class _Job:
+    __slots__ = ("job_id", "image_hash", "status", "result", "owners",
+                 "submitted_at", "started_at", "finished_at")
+
+    def __init__(self, job_id: str, img_hash: str, owner: str):
+        self.job_id = job_id
+        self.image_hash = img_hash
+        self.status = PENDING
+        self.result: Optional[Dict[str, Any]] = None
+        self.owners: Set[str] = {owner}
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'result': self.result,
+            'submitted_at': self.submitted_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class IdentificationJobQueue:
+    """
+    Process-wide queue that runs plant identifications on a bounded thread pool.
+
+    Callers submit image bytes (or several organ-tagged photos) and get back a
+    job ID to poll, so the Streamlit script thread never blocks on the PlantNet
+    round-trip. Identical images that are already in flight (or recently
+    finished successfully) are coalesced onto the existing job, each user may
+    only have a limited number of active jobs, and finished jobs are kept for
+    `retention_seconds` before being pruned.
+    """
+
+    def __init__(self, identify_fn: Callable[[Images], Dict[str, Any]], max_workers: int = 4,
+                 max_active_per_user: int = 2, retention_seconds: float = 600,
+                 max_retained_jobs: int = 1000):
+        self._identify_fn = identify_fn
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="plant-id")
+        self._max_active_per_user = max_active_per_user
+        self._retention_seconds = retention_seconds
+        self._max_retained_jobs = max_retained_jobs
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, _Job] = {}
+        self._jobs_by_hash: Dict[str, _Job] = {}
+
+    def submit(self, user_id: str, images: Images) -> Dict[str, Any]:
+        """
+        Queue an identification for `images` on behalf of `user_id`.
+
+        Returns:
+            Dict with either:
+            - Success: the job snapshot ({'job_id', 'status', 'result', ...})
+            - Error: {'error': str} when the user already has too many active jobs
+        """
+        img_hash = image_hash(images)
+        with self._lock:
+            self._prune_locked()
+
+            existing = self._jobs_by_hash.get(img_hash)
+            if existing is not None and existing.status != FAILED:
+                # Same image already queued, running or freshly identified: share it
+                existing.owners.add(user_id)
+                return existing.snapshot()
+
+            active = sum(1 for job in self._jobs.values()
+                         if user_id in job.owners and job.status in ACTIVE_STATES)
+            if active >= self._max_active_per_user:
+                return {'error': f"Too many identifications in progress (limit {self._max_active_per_user})."}
+
+            job = _Job(uuid.uuid4().hex, img_hash, user_id)
+            self._jobs[job.job_id] = job
+            self._jobs_by_hash[img_hash] = job
+
+        self._executor.submit(self._run, job, images)
+        return job.snapshot()
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Poll a job. Returns None if the ID is unknown or has been pruned."""
+        with self._lock:
+            self._prune_locked()
+            job = self._jobs.get(job_id)
+            return job.snapshot() if job is not None else None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counts = {PENDING: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job: _Job, images: Images):
+        with self._lock:
+            job.status = RUNNING
+            job.started_at = time.time()
+        try:
+            result = self._identify_fn(images)
+            status = FAILED if not isinstance(result, dict) or 'error' in result else DONE
+        except Exception as e:
+            logger.exception("Identification job %s crashed: %s", job.job_id, e)
+            result, status = {'error': f"Identification process failed: {e}"}, FAILED
+        with self._lock:
+            job.result = result
+            job.status = status
+            job.finished_at = time.time()
+
+    def _prune_locked(self):
+        now = time.time()
+        finished = [job for job in self._jobs.values() if job.finished_at is not None]
+        expired = [job for job in finished if now - job.finished_at > self._retention_seconds]
+        overflow = len(self._jobs) - len(expired) - self._max_retained_jobs
+        if overflow > 0:
+            # Drop the oldest finished jobs first when retention is under pressure
+            expired_ids = {job.job_id for job in expired}
+            remaining = sorted((job for job in finished if job.job_id not in expired_ids),
+                               key=lambda j: j.finished_at)
+            expired.extend(remaining[:overflow])
+        for job in expired:
+            self._jobs.pop(job.job_id, None)
+            if self._jobs_by_hash.get(job.image_hash) is job:
+                del self._jobs_by_hash[job.image_hash]
@@ -0,0 +1,310 @@
+import contextlib
+import contextvars
+import functools
+import heapq
+import itertools
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from api_config import (LIMITS_DB, PLANTNET_RATE_PER_MINUTE, PLANTNET_DAILY_QUOTA,
+                        GEMINI_RATE_PER_MINUTE, GEMINI_DAILY_QUOTA)
+from plant_metrics import REGISTRY, incr, observe
+
+logger = logging.getLogger(__name__)
+
+LIMITS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "plant_limits.db")
+
+# Lower number = served first. Interactive: someone is waiting on the page or API call;
+# batch: bulk identification and offline jobs, which wait longer and are shed first.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+# How long a request may queue for a token before it is shed instead
+MAX_WAIT_SECONDS = {PRIORITY_INTERACTIVE: 10.0, PRIORITY_BATCH: 120.0}
+# Share of the daily quota kept for interactive requests: batch work is shed once only this much is left
+QUOTA_RESERVE_FRACTION = 0.1
+# How long to stop calling an upstream that answered 429 without a Retry-After header
+DEFAULT_BACKOFF_SECONDS = 60.0
+
+WAIT_HISTOGRAM = "plant_rate_limit_wait_seconds"
+REGISTRY.describe(WAIT_HISTOGRAM, "Time requests queued for an upstream rate-limit token.")
+REGISTRY.describe("plant_rate_limit_total", "Upstream requests allowed or shed by the client-side limiters.")
+
+_priority = contextvars.ContextVar("plant_request_priority", default=PRIORITY_INTERACTIVE)
+
+
+@contextlib.contextmanager
+def request_priority(priority: int):
+    """Run upstream calls made inside the block (in this thread/context) at `priority`."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def utc_day(now: Optional[float] = None) -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime(now))
+
+
+def seconds_until_utc_midnight(now: Optional[float] = None) -> float:
+    now = time.time() if now is None else now
+    return 86400 - now % 86400
+
+
+class RateLimited(Exception):
+    """A request was shed by a limiter; `retry_after` is a hint in seconds."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LimitStore:
+    """
+    Token buckets and daily quota counters for this process only.
+
+    take() is the only operation that changes state and is atomic, so the
+    limiters never over-spend a bucket or quota when called concurrently.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, list] = {}  # name -> [tokens, updated_at, blocked_until]
+        self._quotas: Dict[Tuple[str, str], int] = {}
+
+    def take(self, name: str, rate_per_second: float, burst: float, daily_limit: int, day: str,
+             now: Optional[float] = None) -> float:
+        """Spend one token and one unit of today's quota: 0.0 if taken, otherwise the seconds to
+        wait before retrying (math.inf once the daily quota is used up)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            used = self._quotas.get((name, day), 0)
+            if daily_limit and used >= daily_limit:
+                return math.inf
+            tokens, updated_at, blocked_until = self._buckets.get(name) or (burst, now, 0.0)
+            wait, tokens = _refill(rate_per_second, burst, tokens, updated_at, blocked_until, now)
+            self._buckets[name] = [tokens, now, blocked_until]
+            if wait:
+                return wait
+            self._quotas[(name, day)] = used + 1
+            return 0.0
+
+    def block(self, name: str, until: float):
+        with self._lock:
+            bucket = self._buckets.setdefault(name, [0.0, time.time(), 0.0])
+            bucket[0], bucket[2] = 0.0, max(bucket[2], until)
+
+    def quota_used(self, name: str, day: str) -> int:
+        with self._lock:
+            return self._quotas.get((name, day), 0)
+
+
+def _refill(rate_per_second, burst, tokens, updated_at, blocked_until, now):
+    """(seconds to wait or 0, tokens left) after refilling a bucket and taking one token if possible."""
+    if now < blocked_until:
+        return blocked_until - now, 0.0
+    if rate_per_second <= 0:  # Unlimited rate
+        return 0.0, tokens
+    tokens = min(burst, tokens + max(0.0, now - updated_at) * rate_per_second)
+    if tokens >= 1:
+        return 0.0, tokens - 1
+    return (1 - tokens) / rate_per_second, tokens
+
+
+class SQLiteLimitStore(LimitStore):
+    """
+    LimitStore kept in a SQLite file, shared by every process using it (WAL
+    mode, one connection per thread). Quota counters survive restarts.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute("CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL NOT NULL,"
+                     " updated_at REAL NOT NULL, blocked_until REAL NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS quotas (name TEXT NOT NULL, day TEXT NOT NULL,"
+                     " used INTEGER NOT NULL, PRIMARY KEY (name, day))")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")  # One writer at a time across processes
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def take(self, name, rate_per_second, burst, daily_limit, day, now=None):
+        now = time.time() if now is None else now
+        with self._transaction() as conn:
+            row = conn.execute("SELECT used FROM quotas WHERE name = ? AND day = ?", (name, day)).fetchone()
+            used = row[0] if row else 0
+            if daily_limit and used >= daily_limit:
+                return math.inf
+            row = conn.execute("SELECT tokens, updated_at, blocked_until FROM buckets WHERE name = ?",
+                               (name,)).fetchone()
+            tokens, updated_at, blocked_until = row or (burst, now, 0.0)
+            wait, tokens = _refill(rate_per_second, burst, tokens, updated_at, blocked_until, now)
+            conn.execute("INSERT OR REPLACE INTO buckets (name, tokens, updated_at, blocked_until) VALUES (?, ?, ?, ?)",
+                         (name, tokens, now, blocked_until))
+            if wait:
+                return wait
+            conn.execute("INSERT INTO quotas (name, day, used) VALUES (?, ?, 1)"
+                         " ON CONFLICT (name, day) DO UPDATE SET used = used + 1", (name, day))
+            conn.execute("DELETE FROM quotas WHERE name = ? AND day < ?", (name, day))  # Keep only today
+            return 0.0
+
+    def block(self, name, until):
+        with self._transaction() as conn:
+            row = conn.execute("SELECT blocked_until FROM buckets WHERE name = ?", (name,)).fetchone()
+            conn.execute("INSERT OR REPLACE INTO buckets (name, tokens, updated_at, blocked_until) VALUES (?, 0, ?, ?)",
+                         (name, time.time(), max(until, row[0] if row else 0.0)))
+
+    def quota_used(self, name, day):
+        row = self._connect().execute("SELECT used FROM quotas WHERE name = ? AND day = ?", (name, day)).fetchone()
+        return row[0] if row else 0
+
+
+class UpstreamLimiter:
+    """
+    Client-side limit for one upstream API: a token bucket (`rate_per_minute`,
+    bursts up to `burst`) plus a daily quota, kept in a LimitStore.
+
+    Callers queue by priority, then arrival. Only the head of the queue takes
+    tokens, so interactive requests overtake queued batch work. A request is
+    shed with RateLimited instead of queueing when it couldn't get a token
+    within its max wait, when the day's quota is spent, or (batch only) when
+    the quota is down to its interactive reserve.
+    """
+
+    def __init__(self, name: str, rate_per_minute: float, daily_quota: int = 0, burst: Optional[float] = None,
+                 store: Optional[LimitStore] = None, reserve_fraction: float = QUOTA_RESERVE_FRACTION):
+        self.name = name
+        self.rate_per_second = rate_per_minute / 60
+        self.burst = burst if burst is not None else max(1.0, rate_per_minute / 6)  # 10 s worth of requests
+        self.daily_quota = daily_quota
+        self.reserve = int(daily_quota * reserve_fraction)
+        self.store = store if store is not None else LimitStore()
+        self._cond = threading.Condition()
+        self._waiters = []  # Heap of (priority, arrival)
+        self._arrivals = itertools.count()
+
+    def quota_remaining(self) -> Optional[int]:
+        if not self.daily_quota:
+            return None
+        return max(0, self.daily_quota - self.store.quota_used(self.name, utc_day()))
+
+    def _shed(self, reason: str, retry_after: float, priority: int):
+        incr("plant_rate_limit_total", upstream=self.name, outcome="shed", priority=priority)
+        raise RateLimited(f"{self.name}: {reason}", retry_after)
+
+    def acquire(self, priority: Optional[int] = None, max_wait: Optional[float] = None):
+        """Wait for permission to make one request; raises RateLimited if it is shed instead."""
+        priority = _priority.get() if priority is None else priority
+        max_wait = MAX_WAIT_SECONDS.get(priority, MAX_WAIT_SECONDS[PRIORITY_BATCH]) if max_wait is None else max_wait
+        remaining = self.quota_remaining()
+        if remaining is not None:
+            if remaining <= 0:
+                self._shed("daily quota used up", seconds_until_utc_midnight(), priority)
+            if priority > PRIORITY_INTERACTIVE and remaining <= self.reserve:
+                self._shed("remaining daily quota is reserved for interactive requests",
+                           seconds_until_utc_midnight(), priority)
+
+        started = time.monotonic()
+        deadline = started + max_wait
+        entry = (priority, next(self._arrivals))
+        with self._cond:
+            ahead = sum(1 for waiter in self._waiters if waiter < entry)
+            if ahead and self.rate_per_second > 0 and ahead / self.rate_per_second > max_wait:
+                self._shed("too many requests queued", ahead / self.rate_per_second, priority)
+            heapq.heappush(self._waiters, entry)
+            self._cond.notify_all()  # A higher-priority arrival becomes the new head
+        try:
+            while True:
+                with self._cond:
+                    at_head = self._waiters[0] == entry
+                wait = None  # Not at the head: sleep until the queue moves
+                if at_head:
+                    # Outside the condition: take() may wait on the shared SQLite file, and arrivals
+                    # and departures must not queue behind it
+                    wait = self.store.take(self.name, self.rate_per_second, self.burst, self.daily_quota, utc_day())
+                    if wait == 0:
+                        waited = time.monotonic() - started
+                        observe(WAIT_HISTOGRAM, waited, upstream=self.name)
+                        incr("plant_rate_limit_total", upstream=self.name,
+                             outcome="waited" if waited > 0.001 else "allowed", priority=priority)
+                        return
+                    if wait == math.inf:
+                        self._shed("daily quota used up", seconds_until_utc_midnight(), priority)
+                with self._cond:
+                    time_left = deadline - time.monotonic()
+                    if time_left <= 0 or (wait is not None and wait > time_left):
+                        self._shed("rate limit: no capacity within the wait budget",
+                                   wait if wait is not None else max_wait, priority)
+                    if wait is None and self._waiters[0] == entry:
+                        continue  # Became the head while the condition was released
+                    self._cond.wait(time_left if wait is None else min(wait, time_left))
+        finally:
+            with self._cond:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def backoff(self, retry_after: Optional[float] = None):
+        """The upstream answered 429: stop sending (in every process sharing the store) for a while."""
+        seconds = retry_after if retry_after is not None else DEFAULT_BACKOFF_SECONDS
+        self.store.block(self.name, time.time() + seconds)
+        incr("plant_rate_limit_total", upstream=self.name, outcome="upstream_429", priority=_priority.get())
+        logger.warning("%s rate limited us; pausing requests for %.0fs.", self.name, seconds)
+
+
+def retry_after_seconds(response) -> Optional[float]:
+    """Retry-After (in seconds) from a requests Response, if present and numeric."""
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+@functools.lru_cache(maxsize=None)
+def get_limit_store() -> LimitStore:
+    """Process-wide limit store: the shared SQLite file unless LIMITS_DB is 'memory'."""
+    if LIMITS_DB == "memory":
+        return LimitStore()
+    path = LIMITS_DB or LIMITS_FILE
+    try:
+        return SQLiteLimitStore(path)
+    except sqlite3.Error as e:
+        logger.exception("Could not open limits store %s (%s); counting in memory for this process.", path, e)
+        return LimitStore()
+
+
+@functools.lru_cache(maxsize=None)
+def get_limiter(upstream: str) -> UpstreamLimiter:
+    """Process-wide limiter for 'plantnet' or 'gemini', configured from api_config."""
+    rate, quota = {
+        "plantnet": (PLANTNET_RATE_PER_MINUTE, PLANTNET_DAILY_QUOTA),
+        "gemini": (GEMINI_RATE_PER_MINUTE, GEMINI_DAILY_QUOTA),
+    }[upstream]
+    limiter = UpstreamLimiter(upstream, rate, quota, store=get_limit_store())
+    if quota:
+        REGISTRY.gauge(f"plant_{upstream}_quota_remaining", limiter.quota_remaining)
+    return limiter
@@ -0,0 +1,282 @@
+import functools
+import json
+import logging
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Every timed stage lands in this one histogram, labelled by stage name
+STAGE_HISTOGRAM = "plant_stage_duration_seconds"
+# Seconds; roughly logarithmic from 1 ms (index lookups) to 30 s (API timeouts)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Recent raw samples kept per histogram series for percentiles on the admin page
+RESERVOIR_SIZE = 1024
+# Recent top-level span trees (e.g. one per page render) kept for the admin page
+RECENT_TRACES = 50
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class _HistogramSeries:
+    __slots__ = ("counts", "total", "count", "recent")
+
+    def __init__(self, buckets: int):
+        self.counts = [0] * (buckets + 1)  # Last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=RESERVOIR_SIZE)
+
+
+class MetricsRegistry:
+    """
+    In-process counters and histograms (thread-safe), exportable as
+    Prometheus text or JSON. Series are keyed by metric name and labels.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _HistogramSeries]] = {}
+        self._gauges: Dict[str, Callable[[], float]] = {}
+        self._help: Dict[str, str] = {}
+        self.traces = deque(maxlen=RECENT_TRACES)
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def incr(self, name: str, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels):
+        key = _label_key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            series = self._histograms.setdefault(name, {}).get(key)
+            if series is None:
+                series = self._histograms[name][key] = _HistogramSeries(len(self.buckets))
+            series.counts[index] += 1
+            series.total += value
+            series.count += 1
+            series.recent.append(value)
+
+    def gauge(self, name: str, fn: Callable[[], float]):
+        """Register a value read at export time (e.g. a cache's current size or hit rate)."""
+        with self._lock:
+            self._gauges[name] = fn
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self.traces.clear()
+
+    # --- Export ---
+
+    def _read_gauges(self) -> Dict[str, float]:
+        with self._lock:
+            gauges = dict(self._gauges)
+        values = {}
+        for name, fn in gauges.items():
+            try:
+                values[name] = float(fn())
+            except Exception as e:
+                logger.warning("Metrics gauge %s failed: %s", name, e)
+        return values
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-ready view: counters, histograms (buckets + p50/p95/p99 of recent samples), gauges, traces."""
+        with self._lock:
+            counters = {name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                        for name, series in self._counters.items()}
+            histograms = {}
+            for name, series_map in self._histograms.items():
+                histograms[name] = []
+                for key, series in series_map.items():
+                    recent = sorted(series.recent)
+                    pct = lambda p: recent[min(len(recent) - 1, int(p * len(recent)))] if recent else 0.0
+                    histograms[name].append({
+                        "labels": dict(key), "count": series.count, "sum": series.total,
+                        "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], series.counts)),
+                        "p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99),
+                    })
+            traces = list(self.traces)
+        return {"timestamp": time.time(), "counters": counters, "histograms": histograms,
+                "gauges": self._read_gauges(), "traces": traces}
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{_format_labels(key)} {value:g}")
+            for name, series_map in sorted(self._histograms.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, series in series_map.items():
+                    cumulative = 0
+                    for bound, count in zip(list(self.buckets) + ["+Inf"], series.counts):
+                        cumulative += count
+                        le = bound if bound == "+Inf" else f"{bound:g}"
+                        lines.append(f"{name}_bucket{_format_labels(key, ('le', le))} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {series.total:.6f}")
+                    lines.append(f"{name}_count{_format_labels(key)} {series.count}")
+        for name, value in sorted(self._read_gauges().items()):
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+REGISTRY.describe(STAGE_HISTOGRAM, "Wall time of instrumented app stages.")
+
+_local = threading.local()
+
+
+class span:
+    """
+    Time a stage into STAGE_HISTOGRAM{stage=...}, as a context manager or decorator:
+
+        with span("find_care_instructions"): ...
+
+        @span("send_message")
+        def send_message(...): ...
+
+    Spans nest per thread. When an outermost span ends, its tree of child
+    timings is kept in REGISTRY.traces, showing which stage dominated it.
+    """
+
+    def __init__(self, stage: str, registry: MetricsRegistry = REGISTRY):
+        self.stage = stage
+        self.registry = registry
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        node = {"stage": self.stage, "start": time.time(), "children": []}
+        if stack:
+            stack[-1]["children"].append(node)
+        stack.append(node)
+        node["_t0"] = time.perf_counter()
+        return node
+
+    def __exit__(self, exc_type, exc, tb):
+        stack = _local.stack
+        node = stack.pop()
+        node["seconds"] = time.perf_counter() - node.pop("_t0")
+        if exc_type is not None:
+            node["error"] = exc_type.__name__
+        self.registry.observe(STAGE_HISTOGRAM, node["seconds"], stage=self.stage)
+        if not stack:
+            self.registry.traces.append(node)
+        return False
+
+    def __call__(self, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(self.stage, self.registry):
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+def incr(name: str, amount: float = 1, **labels):
+    REGISTRY.incr(name, amount, **labels)
+
+
+def observe(name: str, value: float, **labels):
+    REGISTRY.observe(name, value, **labels)
+
+
+# --- Exporters ---
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        registry = self.server.registry
+        if self.path.startswith("/metrics.json"):
+            body, content_type = json.dumps(registry.snapshot()).encode(), "application/json"
+        elif self.path.startswith("/metrics"):
+            body, content_type = registry.to_prometheus().encode(), "text/plain; version=0.0.4"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_http_exporter(port: int, host: str = "0.0.0.0", registry: MetricsRegistry = REGISTRY) -> ThreadingHTTPServer:
+    """Serve /metrics (Prometheus text) and /metrics.json from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.registry = registry
+    threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+    logger.info("Metrics exporter listening on %s:%d", host, server.server_address[1])
+    return server
+
+
+def start_json_log(path: str, interval: float = 60.0, registry: MetricsRegistry = REGISTRY) -> threading.Thread:
+    """Append a JSON snapshot (without traces) to `path` every `interval` seconds."""
+    def loop():
+        while True:
+            time.sleep(interval)
+            snapshot = registry.snapshot()
+            snapshot.pop("traces", None)
+            try:
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(snapshot) + "\n")
+            except OSError as e:
+                logger.exception("Could not write metrics log %s: %s", path, e)
+
+    thread = threading.Thread(target=loop, name="metrics-json-log", daemon=True)
+    thread.start()
+    return thread
+
+
+def trace_breakdown(trace: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Flatten a span tree into rows of (depth, stage, ms, share of the root) for display."""
+    rows = []
+    root_seconds = trace.get("seconds") or 1e-12
+
+    def walk(node, depth):
+        rows.append({"stage": "  " * depth + node["stage"], "ms": round(node.get("seconds", 0) * 1000, 2),
+                     "share_pct": round(100 * node.get("seconds", 0) / root_seconds, 1),
+                     "error": node.get("error", "")})
+        for child in node["children"]:
+            walk(child, depth + 1)
+
+    walk(trace, 0)
+    return rows
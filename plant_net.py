@@ -1,49 +1,130 @@
-import requests
 import os
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
 import json
 
+from api_config import PLANTNET_API_URL
+
+# PlantNet accepts up to five images of the same plant per identification request
+MAX_IMAGES_PER_REQUEST = 5
+VALID_ORGANS = ('auto', 'leaf', 'flower', 'fruit', 'bark')
+# How many ranked species to keep from each PlantNet response
+MAX_CANDIDATES = 5
+
+
+def _taxon_name(taxon: Any) -> str:
+    if isinstance(taxon, dict):
+        return taxon.get('scientificNameWithoutAuthor') or taxon.get('scientificName') or ''
+    return ''
+
+
+def parse_candidates(results: List[Dict[str, Any]], top_n: int = MAX_CANDIDATES) -> List[Dict[str, Any]]:
+    """
+    Flatten PlantNet's ranked `results` into compact candidate dicts.
+
+    Returns:
+        Up to `top_n` entries, best first:
+        {'scientific_name': str, 'common_name': str, 'common_names': list,
+         'genus': str, 'family': str, 'confidence': float}
+    """
+    candidates = []
+    for match in results or []:
+        if len(candidates) >= top_n:
+            break
+        if not isinstance(match, dict) or not isinstance(match.get('species'), dict):
+            continue
+        species = match['species']
+        common_names = [c for c in (species.get('commonNames') or []) if isinstance(c, str)]
+        candidates.append({
+            'scientific_name': species.get('scientificNameWithoutAuthor', 'Unknown'),
+            'common_name': common_names[0] if common_names else 'Unknown',
+            'common_names': common_names,
+            'genus': _taxon_name(species.get('genus')),
+            'family': _taxon_name(species.get('family')),
+            'confidence': round(float(match.get('score', 0)) * 100, 1),
+        })
+    return candidates
+
+
 class PlantNetAPI:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, base_url: str = PLANTNET_API_URL):
         self.api_key = api_key
-        self.base_url = "https://my-api.plantnet.org/v2/identify/all"
+        self.base_url = base_url
 
-    def identify_plant(self, image_path: str) -> Dict[str, Any]:
+    def identify_plant(self, image_path: str, organ: str = 'auto') -> Dict[str, Any]:
         """
         Identify plant from image with robust error handling.
         
         Returns:
             Dict with either:
-            - Success: {'scientific_name': str, 'common_name': str, 'confidence': float}
+            - Success: {'scientific_name': str, 'common_name': str, 'confidence': float,
+                        'candidates': list}  (see parse_candidates)
             - Error: {'error': str}
         """
-        try:
-            # Validate image exists
+        return self.identify_plant_images([(image_path, organ)])
+
+    def identify_plant_images(self, images: List[Tuple[str, str]]) -> Dict[str, Any]:
+        """
+        Identify one plant from several photos (e.g. leaf, flower, fruit, bark) in a single request.
+
+        Args:
+            images: Up to MAX_IMAGES_PER_REQUEST (image_path, organ) pairs.
+
+        Returns:
+            Same format as identify_plant.
+        """
+        if not images:
+            return {'error': "No images provided"}
+        if len(images) > MAX_IMAGES_PER_REQUEST:
+            return {'error': f"Too many images: PlantNet accepts at most {MAX_IMAGES_PER_REQUEST} per request"}
+        for image_path, organ in images:
             if not os.path.exists(image_path):
-                return {'error': "Image file not found"}
-
-            with open(image_path, 'rb') as img_file:
-                files = [('images', (os.path.basename(image_path), img_file, 'image/jpeg'))]
-                params = {'api-key': self.api_key}
-                data = {'organs': ['auto']}
-
-                response = requests.post(
-                    self.base_url,
-                    files=files,
-                    params=params,
-                    data=data,
-                    timeout=15
-                )
-
-                # Check for API errors
-                if response.status_code != 200:
-                    try:
-                        error_msg = response.json().get('message', response.text)
-                    except:
-                        error_msg = response.text
-                    return {'error': f"API Error {response.status_code}: {error_msg}"}
-
-                return self._parse_response(response.json())
+                return {'error': f"Image file not found: {image_path}"}
+            if organ not in VALID_ORGANS:
+                return {'error': f"Invalid organ '{organ}'. Expected one of: {', '.join(VALID_ORGANS)}"}
+
+        try:
+            image_payload = []
+            for image_path, organ in images:
+                with open(image_path, 'rb') as img_file:
+                    image_payload.append((os.path.basename(image_path), img_file.read(), organ))
+            return self.identify_image_bytes(image_payload)
+        except OSError as e:
+            return {'error': f"Could not read image: {str(e)}"}
+
+    def identify_image_bytes(self, images: List[Tuple[str, bytes, str]]) -> Dict[str, Any]:
+        """
+        Identify one plant from in-memory images.
+
+        Args:
+            images: Up to MAX_IMAGES_PER_REQUEST (filename, image_bytes, organ) triples.
+
+        Returns:
+            Same format as identify_plant.
+        """
+        import requests  # Deferred: costs ~0.1 s at import and is only needed once a request is made
+
+        try:
+            files = [('images', (filename, image_bytes, 'image/jpeg')) for filename, image_bytes, _ in images]
+            params = {'api-key': self.api_key}
+            data = {'organs': [organ for _, _, organ in images]}
+
+            response = requests.post(
+                self.base_url,
+                files=files,
+                params=params,
+                data=data,
+                timeout=15
+            )
+
+            # Check for API errors
+            if response.status_code != 200:
+                try:
+                    error_msg = response.json().get('message', response.text)
+                except:
+                    error_msg = response.text
+                return {'error': f"API Error {response.status_code}: {error_msg}"}
+
+            return self._parse_response(response.json())
 
         except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
             return {'error': f"Network/API Error: {str(e)}"}
@@ -72,6 +153,7 @@ class PlantNetAPI:
                 'scientific_name': species.get('scientificNameWithoutAuthor', 'Unknown'),
                 'common_name': (species.get('commonNames', ['Unknown']) or ['Unknown'])[0],
                 'confidence': round(float(best_match.get('score', 0)) * 100, 1),
+                'candidates': parse_candidates(results),
                 'raw_data': best_match  # For debugging
             }
 
@@ -0,0 +1,194 @@
+import sys
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# JSON key -> slot name. Categorical fields repeat the same few strings across
+# thousands of records, so their values are interned (one shared str each).
+CARE_FIELDS: Dict[str, str] = {
+    'Plant Name': 'plant_name',
+    'Light Requirements': 'light',
+    'Watering': 'watering',
+    'Humidity Preferences': 'humidity',
+    'Temperature Range': 'temperature',
+    'Feeding Schedule': 'feeding',
+    'Toxicity': 'toxicity',
+    'Additional Care': 'additional_care',
+    'Personality': 'personality',
+}
+INTERNED_FIELDS = ('light', 'watering', 'humidity', 'temperature', 'feeding', 'toxicity')
+
+PERSONALITY_FIELDS: Dict[str, str] = {'Title': 'title', 'Traits': 'traits', 'Prompt': 'prompt'}
+
+class _Unset:
+    """Slot value for a key the JSON record did not have (None is a value like any other)."""
+
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return "<unset>"
+
+    def __reduce__(self) -> str:
+        return "_UNSET"  # Pickled and copied as a reference to the one instance
+
+
+_UNSET = _Unset()
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def freeze(value: Any) -> Any:
+    """Read-only view of parsed JSON: dicts become MappingProxyType, lists become tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    """freeze() undone, for pickling (MappingProxyType can't be pickled); freeze(_thaw(v)) == v."""
+    if isinstance(value, MappingProxyType):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+
+def _restore(cls, values: Dict[str, Any]) -> "_SlotMapping":
+    return cls(**{attr: freeze(value) for attr, value in values.items()})
+
+
+class _SlotMapping(Mapping):
+    """Read-only Mapping over __slots__ so records keep working with `.get('Plant Name')` style callers."""
+
+    __slots__ = ()
+    _fields: Dict[str, str] = {}
+
+    def __getitem__(self, key: str) -> Any:
+        attr = self._fields.get(key)
+        value = getattr(self, attr) if attr is not None else self._extra_get(key)
+        if value is _UNSET:
+            raise KeyError(key)
+        return value
+
+    def _extra_get(self, key: str) -> Any:
+        return _UNSET
+
+    def __iter__(self) -> Iterator[str]:
+        for key, attr in self._fields.items():
+            if getattr(self, attr) is not _UNSET:
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self)!r})"
+
+    def __reduce__(self):
+        # The slots that are set, thawed; unpickling freezes them again
+        values = {attr: _thaw(getattr(self, attr)) for attr in type(self).__slots__}
+        return _restore, (type(self), {attr: value for attr, value in values.items() if value is not _UNSET})
+
+
+class Personality(_SlotMapping):
+    """A record's 'Personality' block ({'Title', 'Traits', 'Prompt'})."""
+
+    __slots__ = ('title', 'traits', 'prompt')
+    _fields = PERSONALITY_FIELDS
+
+    def __init__(self, title: Optional[str] = _UNSET, traits: Optional[Tuple[str, ...]] = _UNSET,
+                 prompt: Optional[str] = _UNSET):
+        self.title = title
+        self.traits = traits
+        self.prompt = prompt
+
+
+class PlantCareRecord(_SlotMapping):
+    """
+    Compact, read-only care record.
+
+    Behaves like the original JSON dict for reads (`record.get('Watering')`,
+    `record['Personality']['Traits']`), but stores fields in __slots__, interns
+    the categorical strings and shares identical Personality blocks. Keys
+    outside CARE_FIELDS (e.g. 'Scientific Name', 'Common Names') are kept
+    frozen in `extra`.
+    """
+
+    __slots__ = tuple(CARE_FIELDS.values()) + ('extra',)
+    _fields = CARE_FIELDS
+
+    def __init__(self, plant_name=_UNSET, light=_UNSET, watering=_UNSET, humidity=_UNSET, temperature=_UNSET,
+                 feeding=_UNSET, toxicity=_UNSET, additional_care=_UNSET, personality=_UNSET, extra=None):
+        self.plant_name = plant_name
+        self.light = light
+        self.watering = watering
+        self.humidity = humidity
+        self.temperature = temperature
+        self.feeding = feeding
+        self.toxicity = toxicity
+        self.additional_care = additional_care
+        self.personality = personality
+        self.extra = extra
+
+    def _extra_get(self, key: str) -> Any:
+        return self.extra.get(key, _UNSET) if self.extra else _UNSET
+
+    def __iter__(self) -> Iterator[str]:
+        yield from super().__iter__()
+        if self.extra:
+            yield from self.extra
+
+
+class RecordBuilder:
+    """
+    Builds PlantCareRecords from parsed JSON, sharing equal Personality blocks
+    and trait tuples across the whole dataset.
+    """
+
+    def __init__(self):
+        self._personalities: Dict[Tuple, Personality] = {}
+        self._traits: Dict[Tuple, Tuple[str, ...]] = {}
+
+    def personality(self, data: Any) -> Any:
+        if not isinstance(data, dict):
+            return freeze(data)  # Unexpected shape: keep it, read-only
+        traits = data.get('Traits', _UNSET)
+        if isinstance(traits, list):
+            traits = tuple(_intern(t) for t in traits)
+            traits = self._traits.setdefault(traits, traits)
+        key = (data.get('Title', _UNSET), traits, data.get('Prompt', _UNSET))
+        try:
+            shared = self._personalities.get(key)
+        except TypeError:  # Unhashable (unexpected) values: don't share
+            return freeze(data)
+        if shared is None:
+            shared = Personality(_intern(key[0]), traits, _intern(key[2]))
+            self._personalities[key] = shared
+        return shared
+
+    def record(self, data: Dict[str, Any]) -> PlantCareRecord:
+        values = {}
+        extra = {}
+        for key, value in data.items():
+            attr = CARE_FIELDS.get(key)
+            if attr is None:
+                extra[key] = value
+            elif attr == 'personality':
+                values[attr] = self.personality(value)
+            elif attr in INTERNED_FIELDS:
+                values[attr] = _intern(value)
+            else:
+                values[attr] = value
+        if extra:
+            values['extra'] = freeze(extra)
+        return PlantCareRecord(**values)
+
+
+def to_records(data):
+    """Convert a parsed care JSON list into a tuple of PlantCareRecords (non-dict entries are frozen as-is)."""
+    builder = RecordBuilder()
+    return tuple(builder.record(item) if isinstance(item, dict) else freeze(item) for item in data)
@@ -0,0 +1,194 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from plant_facets import WATER_HIGH, WATER_LOW, WATER_MODERATE, parse_temperature, parse_watering
+
+# Raw soil-moisture readings (higher = wetter) per watering need:
+# (needs water below, okay below -- "happy" from here up, too wet above)
+MOISTURE_THRESHOLDS: Dict[Optional[str], Tuple[float, float, float]] = {
+    WATER_LOW: (250, 400, 800),         # Let the soil dry out; soggy soil rots these
+    WATER_MODERATE: (400, 600, np.inf),
+    WATER_HIGH: (500, 700, np.inf),     # Keep evenly moist
+    None: (400, 600, np.inf),           # Unknown: the original fixed cutoffs
+}
+# Temperature band when the care record gives none (°C)
+DEFAULT_TEMP_RANGE_C = (10.0, 30.0)
+# Care records mostly state an optimum ("22°C", "18-24°C"); alert this far outside it
+TEMP_TOLERANCE_C = 5.0
+
+# Moisture status codes (index into MOISTURE_STATUSES)
+NEEDS_WATER, OKAY, HAPPY, TOO_WET = range(4)
+MOISTURE_STATUSES = ("needs_water", "okay", "happy", "too_wet")
+
+# Alert kinds
+ALERT_NEEDS_WATER = "needs_water"
+ALERT_TOO_WET = "too_wet"
+ALERT_TOO_COLD = "too_cold"
+ALERT_TOO_HOT = "too_hot"
+
+
+def fahrenheit_to_celsius(value):
+    return (np.asarray(value, dtype=np.float64) - 32.0) * 5.0 / 9.0
+
+
+def compile_thresholds(care_record: Optional[Mapping[str, Any]]) -> Dict[str, Any]:
+    """Per-plant thresholds from one care record's Watering and Temperature Range (None -> defaults)."""
+    care_record = care_record or {}
+    watering = parse_watering(care_record.get('Watering'))
+    dry, okay, wet = MOISTURE_THRESHOLDS[watering]
+    temp_min, temp_max = parse_temperature(care_record.get('Temperature Range'))
+    if temp_min is None:
+        temp_low, temp_high = DEFAULT_TEMP_RANGE_C
+    else:
+        temp_low, temp_high = temp_min - TEMP_TOLERANCE_C, temp_max + TEMP_TOLERANCE_C
+    return {
+        'plant_name': care_record.get('Plant Name'),
+        'watering': watering or WATER_MODERATE,
+        'moisture_dry': dry, 'moisture_okay': okay, 'moisture_wet': wet,
+        'temp_low_c': temp_low, 'temp_high_c': temp_high,
+    }
+
+
+class ThresholdTable:
+    """
+    Compiled thresholds for many sensors, one row per sensor, as numpy columns.
+
+    Built once from each sensor's matched care record (rebuild it when the
+    sensor -> plant assignment or the care data changes); evaluate() then
+    checks any number of readings in a handful of vectorised comparisons.
+    """
+
+    def __init__(self, sensor_profiles: Mapping[str, Optional[Mapping[str, Any]]]):
+        self.sensor_ids = list(sensor_profiles)
+        self.rows = {sensor_id: i for i, sensor_id in enumerate(self.sensor_ids)}
+        self.profiles = [compile_thresholds(sensor_profiles[s]) for s in self.sensor_ids]
+        column = lambda key: np.array([p[key] for p in self.profiles], dtype=np.float64)
+        self.moisture_dry = column('moisture_dry')
+        self.moisture_okay = column('moisture_okay')
+        self.moisture_wet = column('moisture_wet')
+        self.temp_low_c = column('temp_low_c')
+        self.temp_high_c = column('temp_high_c')
+
+    def __len__(self) -> int:
+        return len(self.sensor_ids)
+
+    def profile(self, sensor_id: str) -> Optional[Dict[str, Any]]:
+        row = self.rows.get(sensor_id)
+        return self.profiles[row] if row is not None else None
+
+    def evaluate(self, sensor_ids: Sequence[str], moisture: Sequence[float],
+                 temperature_f: Sequence[float]) -> Dict[str, np.ndarray]:
+        """
+        Vectorised check of readings (sensor temperatures are in °F, as logged).
+
+        Returns:
+            Arrays aligned with the input: 'row' (-1 for unknown sensors),
+            'moisture_status' (NEEDS_WATER / OKAY / HAPPY / TOO_WET), 'temp_c',
+            'too_cold' and 'too_hot'.
+        """
+        rows = np.array([self.rows.get(s, -1) for s in sensor_ids], dtype=np.int64)
+        known = rows >= 0
+        r = np.where(known, rows, 0)
+        moisture = np.asarray(moisture, dtype=np.float64)
+        temp_c = fahrenheit_to_celsius(temperature_f)
+        if not len(self):  # No sensors compiled: every reading is unknown
+            empty = np.zeros(len(rows), dtype=bool)
+            return {'row': rows, 'moisture_status': np.full(len(rows), OKAY), 'temp_c': temp_c,
+                    'too_cold': empty, 'too_hot': empty}
+
+        status = np.full(len(rows), HAPPY, dtype=np.int8)
+        status[moisture < self.moisture_okay[r]] = OKAY
+        status[moisture < self.moisture_dry[r]] = NEEDS_WATER
+        status[moisture > self.moisture_wet[r]] = TOO_WET
+        status[np.isnan(moisture)] = OKAY  # No moisture reading: nothing to say
+        return {
+            'row': rows,
+            'moisture_status': np.where(known, status, OKAY),
+            'temp_c': temp_c,
+            'too_cold': known & (temp_c < self.temp_low_c[r]),
+            'too_hot': known & (temp_c > self.temp_high_c[r]),
+        }
+
+
+class AlertDeduplicator:
+    """Suppresses repeats of the same (sensor, alert kind) within `window_seconds`."""
+
+    def __init__(self, window_seconds: float = 3600):
+        self.window_seconds = window_seconds
+        self._last_sent: Dict[Tuple[str, str], float] = {}
+        # (sent at, key) in the order they were sent, so expired entries are found at the front
+        self._sent_order: Deque[Tuple[float, Tuple[str, str]]] = deque()
+        self._lock = threading.Lock()
+
+    def should_send(self, sensor_id: str, kind: str, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        key = (sensor_id, kind)
+        with self._lock:
+            self._forget_expired(now - self.window_seconds)
+            last = self._last_sent.get(key)
+            if last is not None and now - last < self.window_seconds:
+                return False
+            self._last_sent[key] = now
+            self._sent_order.append((now, key))
+            return True
+
+    def _forget_expired(self, cutoff: float):
+        """Drop entries that can no longer suppress anything: amortised O(1) per call."""
+        while self._sent_order and self._sent_order[0][0] < cutoff:
+            sent_at, key = self._sent_order.popleft()
+            if self._last_sent.get(key) == sent_at:  # Not re-sent since
+                del self._last_sent[key]
+
+
+class RulesEngine:
+    """Evaluates sensor readings against compiled care thresholds and emits de-duplicated alerts."""
+
+    def __init__(self, thresholds: ThresholdTable, dedup_window_seconds: float = 3600):
+        self.thresholds = thresholds
+        self.deduplicator = AlertDeduplicator(dedup_window_seconds)
+
+    def evaluate(self, readings: Iterable[Mapping[str, Any]]) -> Tuple[Dict[str, np.ndarray], List[Dict[str, Any]]]:
+        """
+        Check a batch of readings ({'sensor_id', 'moisture_value', 'temperature' (°F), 'timestamp'}).
+
+        Returns:
+            (evaluation arrays as from ThresholdTable.evaluate, new alerts). Alerts
+            already sent for the same sensor and kind within the window are dropped.
+        """
+        readings = list(readings)
+        sensor_ids = [r.get('sensor_id') for r in readings]
+        result = self.thresholds.evaluate(sensor_ids,
+                                          [r.get('moisture_value', np.nan) for r in readings],
+                                          [r.get('temperature', np.nan) for r in readings])
+        # Only readings that tripped a rule get looked at individually
+        tripped = np.flatnonzero(np.isin(result['moisture_status'], (NEEDS_WATER, TOO_WET))
+                                 | result['too_cold'] | result['too_hot'])
+        alerts = []
+        for i in tripped:
+            reading = readings[i]
+            profile = self.thresholds.profiles[result['row'][i]]
+            status = result['moisture_status'][i]
+            kinds = []
+            if status == NEEDS_WATER:
+                kinds.append((ALERT_NEEDS_WATER, f"needs water (moisture {reading['moisture_value']} < "
+                                                 f"{profile['moisture_dry']:g})"))
+            elif status == TOO_WET:
+                kinds.append((ALERT_TOO_WET, f"soil is too wet for a {profile['watering']}-water plant "
+                                             f"(moisture {reading['moisture_value']} > {profile['moisture_wet']:g})"))
+            if result['too_cold'][i]:
+                kinds.append((ALERT_TOO_COLD, f"too cold ({result['temp_c'][i]:.1f}°C < "
+                                              f"{profile['temp_low_c']:.1f}°C)"))
+            if result['too_hot'][i]:
+                kinds.append((ALERT_TOO_HOT, f"too hot ({result['temp_c'][i]:.1f}°C > "
+                                             f"{profile['temp_high_c']:.1f}°C)"))
+            for kind, message in kinds:
+                if self.deduplicator.should_send(sensor_ids[i], kind, reading.get('timestamp')):
+                    alerts.append({
+                        'sensor_id': sensor_ids[i], 'plant_name': profile['plant_name'], 'kind': kind,
+                        'message': message, 'timestamp': reading.get('timestamp'),
+                    })
+        return result, alerts
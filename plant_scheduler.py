@@ -0,0 +1,279 @@
+import heapq
+import itertools
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from plant_facets import WATER_HIGH, WATER_LOW, parse_watering
+
+logger = logging.getLogger(__name__)
+
+DAY_SECONDS = 24 * 60 * 60
+WATERING = "watering"
+FEEDING = "feeding"
+EVENT_KINDS = (WATERING, FEEDING)
+
+# Days between waterings by watering need (parse_watering); unknown -> weekly
+WATERING_INTERVAL_DAYS = {WATER_HIGH: 3, WATER_LOW: 14}
+DEFAULT_WATERING_INTERVAL_DAYS = 7
+# Feeding text without a usable interval ("during the growing season", "sparingly")
+DEFAULT_FEEDING_INTERVAL_DAYS = 28
+SCHEDULE_FORMAT_VERSION = 1
+
+_NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9,
+                 "ten": 10, "twelve": 12}
+_EVERY = re.compile(r"every\s+(\d+|" + "|".join(_NUMBER_WORDS) + r")(?:\s*(?:-|–|to)\s*\d+)?\s*(day|week|month)s?")
+
+
+def watering_interval_days(care_info: Optional[Mapping[str, Any]]) -> int:
+    watering = parse_watering((care_info or {}).get('Watering'))
+    return WATERING_INTERVAL_DAYS.get(watering, DEFAULT_WATERING_INTERVAL_DAYS)
+
+
+def feeding_interval_days(care_info: Optional[Mapping[str, Any]]) -> Optional[int]:
+    """'every 4-6 weeks' -> 28 (the shorter end), 'monthly' -> 28; None if there is no feeding advice."""
+    text = (care_info or {}).get('Feeding Schedule')
+    if not isinstance(text, str) or not text.strip():
+        return None
+    lower = text.lower()
+    match = _EVERY.search(lower)
+    if match:
+        count = _NUMBER_WORDS.get(match.group(1)) or int(match.group(1))
+        return count * {"day": 1, "week": 7, "month": 28}[match.group(2)]
+    if "monthly" in lower or "once a month" in lower:
+        return 28
+    return DEFAULT_FEEDING_INTERVAL_DAYS
+
+
+class NotificationSink:
+    """Where due care reminders go. Subclass and override notify()."""
+
+    def notify(self, event: Dict[str, Any]):
+        raise NotImplementedError
+
+
+class LogSink(NotificationSink):
+    def notify(self, event: Dict[str, Any]):
+        logger.info("Care reminder: %s", event['message'])
+
+
+class FileSink(LogSink):
+    """Appends each reminder as one JSON line to `path` (and logs it). Handy for testing."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def notify(self, event: Dict[str, Any]):
+        super().notify(event)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(event) + "\n")
+
+
+class CareScheduler:
+    """
+    Watering / feeding reminders for saved plants.
+
+    Upcoming events live in a min-heap keyed on due time, so scheduling is
+    O(log n) and the worker thread only ever looks at the heap top: it sleeps
+    until the earliest event is due (or a new plant is scheduled), fires every
+    due event through the sink and pushes each plant's next occurrence.
+    Removing or re-scheduling a plant bumps its generation instead of
+    searching the heap; stale entries are discarded when they surface.
+
+    The schedule (not the heap itself) is saved to `state_path` as JSON,
+    at most every `save_interval` seconds and on stop(), and reloaded on start;
+    loaded plants for which `keep_loaded(plant)` is false are dropped (and the
+    file rewritten without them).
+    """
+
+    def __init__(self, sink: Optional[NotificationSink] = None, state_path: Optional[str] = None,
+                 save_interval: float = 5.0, keep_loaded: Optional[Callable[[Dict[str, Any]], bool]] = None):
+        self.sink = sink or LogSink()
+        self.state_path = state_path
+        self.save_interval = save_interval
+        self.keep_loaded = keep_loaded
+        self._plants: Dict[str, Dict[str, Any]] = {}
+        self._heap: List[Tuple[float, int, str, str, int]] = []  # (due, seq, plant_key, kind, generation)
+        self._seq = 0
+        self._generations = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._dirty = False
+        self._last_save = 0.0
+        if state_path:
+            self._load()
+
+    # --- Scheduling ---
+
+    def schedule_plant(self, plant_key: str, nickname: str, care_info: Optional[Mapping[str, Any]] = None,
+                       now: Optional[float] = None, owner: Optional[str] = None):
+        """Start (or restart) reminders for a plant; the first of each kind is due one interval from now."""
+        now = time.time() if now is None else now
+        intervals = {WATERING: watering_interval_days(care_info) * DAY_SECONDS}
+        feeding_days = feeding_interval_days(care_info)
+        if feeding_days:
+            intervals[FEEDING] = feeding_days * DAY_SECONDS
+        with self._cond:
+            plant = {
+                'nickname': nickname, 'owner': owner,
+                'plant_name': (care_info or {}).get('Plant Name'),
+                'intervals': intervals,
+                'next_due': {kind: now + seconds for kind, seconds in intervals.items()},
+                'generation': next(self._generations),
+            }
+            self._plants[plant_key] = plant
+            for kind, due in plant['next_due'].items():
+                self._push(due, plant_key, kind, plant['generation'])
+            self._dirty = True
+            self._cond.notify()
+
+    def remove_plant(self, plant_key: str) -> bool:
+        with self._cond:
+            removed = self._plants.pop(plant_key, None) is not None
+            self._dirty = self._dirty or removed
+            return removed  # Its heap entries are now stale and get skipped when popped
+
+    def next_due(self, plant_key: str) -> Dict[str, float]:
+        with self._cond:
+            plant = self._plants.get(plant_key)
+            return dict(plant['next_due']) if plant else {}
+
+    def __len__(self) -> int:
+        return len(self._plants)
+
+    def _push(self, due: float, plant_key: str, kind: str, generation: int):
+        self._seq += 1
+        heapq.heappush(self._heap, (due, self._seq, plant_key, kind, generation))
+        if len(self._heap) > 4 * len(EVENT_KINDS) * len(self._plants) + 64:
+            self._compact()
+
+    def _compact(self):
+        """Drop stale entries left by re-scheduled / removed plants (amortised O(1) per push)."""
+        self._heap = [entry for entry in self._heap if self._is_current(entry[2], entry[3], entry[4], entry[0])]
+        heapq.heapify(self._heap)
+
+    def _is_current(self, plant_key: str, kind: str, generation: int, due: float) -> bool:
+        plant = self._plants.get(plant_key)
+        return plant is not None and plant['generation'] == generation and plant['next_due'].get(kind) == due
+
+    # --- Firing ---
+
+    def run_due(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Fire every event due at `now` and schedule each one's next occurrence."""
+        now = time.time() if now is None else now
+        fired = []
+        with self._cond:
+            while self._heap and self._heap[0][0] <= now:
+                due, _, plant_key, kind, generation = heapq.heappop(self._heap)
+                if not self._is_current(plant_key, kind, generation, due):
+                    continue
+                plant = self._plants[plant_key]
+                interval = plant['intervals'][kind]
+                # After downtime, remind once and resume from now rather than replaying every missed interval
+                next_due = due + interval if due + interval > now else now + interval
+                plant['next_due'][kind] = next_due
+                self._push(next_due, plant_key, kind, generation)
+                fired.append({
+                    'plant_key': plant_key, 'nickname': plant['nickname'], 'owner': plant['owner'],
+                    'plant_name': plant['plant_name'], 'kind': kind, 'due': due, 'fired_at': now,
+                    'message': f"Time to {'water' if kind == WATERING else 'feed'} '{plant['nickname']}'"
+                               + (f" ({plant['plant_name']})" if plant['plant_name'] else ""),
+                })
+            if fired:
+                self._dirty = True
+        for event in fired:  # Outside the lock: a slow sink must not block scheduling
+            try:
+                self.sink.notify(event)
+            except Exception as e:
+                logger.exception("Care reminder sink failed for %s: %s", event['plant_key'], e)
+        return fired
+
+    # --- Background thread ---
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._loop, name="care-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.save()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                if self._stopping:
+                    return
+                now = time.time()
+                wait = self._heap[0][0] - now if self._heap else None
+                if self._dirty and self.state_path:
+                    # Wake up in time for the next debounced save
+                    save_in = max(0.0, self._last_save + self.save_interval - now)
+                    wait = save_in if wait is None else min(wait, save_in)
+                if wait is None or wait > 0:
+                    self._cond.wait(timeout=wait)
+                    if self._stopping:
+                        return
+            self.run_due()
+            if self._dirty and time.time() - self._last_save >= self.save_interval:
+                self.save()
+
+    # --- Persistence ---
+
+    def save(self):
+        if not self.state_path:
+            return
+        with self._cond:
+            if not self._dirty:
+                return
+            state = {'version': SCHEDULE_FORMAT_VERSION,
+                     'plants': {key: {k: v for k, v in plant.items() if k != 'generation'}
+                                for key, plant in self._plants.items()}}
+            self._dirty = False
+            self._last_save = time.time()
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            logger.exception("Could not save care schedule to %s: %s", self.state_path, e)
+            with self._cond:
+                self._dirty = True
+
+    def _load(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable care schedule %s: %s", self.state_path, e)
+            return
+        if state.get('version') != SCHEDULE_FORMAT_VERSION:
+            logger.warning("Ignoring care schedule %s with unknown version %s.", self.state_path, state.get('version'))
+            return
+        for plant_key, plant in state.get('plants', {}).items():
+            if self.keep_loaded is not None and not self.keep_loaded(plant):
+                self._dirty = True
+                continue
+            plant['generation'] = next(self._generations)
+            self._plants[plant_key] = plant
+            for kind, due in plant['next_due'].items():
+                self._seq += 1
+                self._heap.append((due, self._seq, plant_key, kind, plant['generation']))
+        heapq.heapify(self._heap)
+        logger.info("Loaded care schedule: %d plants, %d upcoming reminders.", len(self._plants), len(self._heap))
@@ -0,0 +1,213 @@
+import logging
+import os
+import re
+from collections import Counter
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# BM25 parameters (the usual defaults)
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Plant names count this many times so a name match outranks a passing mention
+NAME_WEIGHT = 3
+INDEX_FORMAT_VERSION = 1
+INDEX_SUFFIX = ".search-index.npz"
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have i if in into is it its me my of on or so that the their them
+then there these they this to was we when where which while will with you your
+""".split())
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def _stem(token: str) -> str:
+    """Very light stemming so 'leaves'/'leaf', 'drains'/'drain' meet; plural forms only."""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 4 and token.endswith("ves"):
+        return token[:-3] + "f"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    return [_stem(t) for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def iter_text(value: Any) -> Iterator[str]:
+    """Every string inside a record value (nested Personality blocks, trait lists, ...)."""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, Mapping):
+        for item in value.values():
+            yield from iter_text(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from iter_text(item)
+
+
+def index_path(care_filepath: str) -> str:
+    return os.path.splitext(care_filepath)[0] + INDEX_SUFFIX
+
+
+def file_signature(filepath: str) -> Tuple[int, int]:
+    stat = os.stat(filepath)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class SearchIndex:
+    """
+    BM25-ranked full-text index over every text field of the care records.
+
+    Postings are stored as flat numpy arrays (document ids and term
+    frequencies, sliced per term via `offsets`), so a query touches only the
+    postings of its own terms and scores them with vectorised arithmetic.
+    Result positions refer to the `records` sequence the index was built from.
+    """
+
+    def __init__(self, vocabulary: Sequence[str], offsets: np.ndarray, doc_ids: np.ndarray,
+                 term_freqs: np.ndarray, doc_lengths: np.ndarray):
+        self.vocabulary = list(vocabulary)
+        self.terms = {term: i for i, term in enumerate(self.vocabulary)}
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.term_freqs = term_freqs
+        self.doc_lengths = doc_lengths
+        self.size = len(doc_lengths)
+        self.avg_length = float(doc_lengths.mean()) if self.size else 0.0
+        # BM25 length normalisation per document, computed once
+        self._norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths / max(self.avg_length, 1e-9))
+
+    @classmethod
+    def build(cls, records: Sequence[Any]) -> "SearchIndex":
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        doc_lengths = np.zeros(len(records), dtype=np.int32)
+        token_cache: Dict[str, List[str]] = {}  # Categorical care strings repeat across records
+
+        def tokens_of(text):
+            tokens = token_cache.get(text)
+            if tokens is None:
+                tokens = token_cache[text] = tokenize(text)
+            return tokens
+
+        for doc_id, record in enumerate(records):
+            if not isinstance(record, Mapping):
+                continue
+            counts = Counter()
+            for key, value in record.items():
+                weight = NAME_WEIGHT if key == 'Plant Name' else 1
+                for text in iter_text(value):
+                    for token in tokens_of(text):
+                        counts[token] += weight
+            doc_lengths[doc_id] = sum(counts.values())
+            for token, tf in counts.items():
+                postings.setdefault(token, []).append((doc_id, tf))
+
+        vocabulary = sorted(postings)
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(postings[t]) for t in vocabulary])
+        pairs = np.array([pair for t in vocabulary for pair in postings[t]], dtype=np.int32).reshape(-1, 2)
+        return cls(vocabulary, offsets, pairs[:, 0].copy(), pairs[:, 1].copy(), doc_lengths)
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[int, float]]:
+        """
+        Returns:
+            Up to `limit` (record position, BM25 score) pairs, best first.
+        """
+        scores = np.zeros(self.size, dtype=np.float64)
+        matched = False
+        for term in set(tokenize(query)):
+            i = self.terms.get(term)
+            if i is None:
+                continue
+            start, stop = self.offsets[i], self.offsets[i + 1]
+            ids = self.doc_ids[start:stop]
+            tf = self.term_freqs[start:stop].astype(np.float64)
+            df = stop - start
+            idf = np.log(1 + (self.size - df + 0.5) / (df + 0.5))
+            scores[ids] += idf * tf * (BM25_K1 + 1) / (tf + self._norm[ids])
+            matched = True
+        if not matched:
+            return []
+        hits = np.flatnonzero(scores)
+        if len(hits) > limit:
+            hits = hits[np.argpartition(-scores[hits], limit - 1)[:limit]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(int(i), float(scores[i])) for i in hits]
+
+    def save(self, path: str, signature: Tuple[int, int]):
+        """Write atomically (temp file + rename) so concurrent readers never see a partial index."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, version=INDEX_FORMAT_VERSION, signature=np.array(signature, dtype=np.int64),
+                     vocabulary=np.array(self.vocabulary, dtype=str), offsets=self.offsets,
+                     doc_ids=self.doc_ids, term_freqs=self.term_freqs, doc_lengths=self.doc_lengths)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, signature: Tuple[int, int]) -> Optional["SearchIndex"]:
+        """The saved index, or None if it is missing, stale (different source file) or unreadable."""
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if int(data["version"]) != INDEX_FORMAT_VERSION or tuple(data["signature"]) != signature:
+                    return None
+                return cls(data["vocabulary"].tolist(), data["offsets"], data["doc_ids"],
+                           data["term_freqs"], data["doc_lengths"])
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning("Ignoring unreadable search index %s: %s", path, e)
+            return None
+
+    @classmethod
+    def load_or_build(cls, care_filepath: str, records: Sequence[Any],
+                      signature: Optional[Tuple[int, int]] = None) -> "SearchIndex":
+        """
+        Load the index persisted next to `care_filepath` if it was built from the
+        same version of that file, otherwise build it and persist it.
+
+        `signature` is the file's (st_mtime_ns, st_size) taken *before* `records`
+        were read, so an edit racing the load can't be saved under the new
+        version's signature.
+        """
+        path = index_path(care_filepath)
+        if signature is None:
+            try:
+                signature = file_signature(care_filepath)
+            except OSError:
+                return cls.build(records)
+        index = cls.load(path, signature)
+        if index is not None and index.size == len(records):
+            return index
+        index = cls.build(records)
+        try:
+            index.save(path, signature)
+        except OSError as e:  # Read-only deploys still get an in-memory index
+            logger.warning("Could not persist search index to %s: %s", path, e)
+        return index
+
+
+def snippet(record: Mapping, query: str, width: int = 160) -> str:
+    """A short excerpt of the record text that contains the most query terms."""
+    terms = set(tokenize(query))
+    best, best_hits = None, 0
+    for key, value in record.items():
+        if key == 'Plant Name':
+            continue
+        for text in iter_text(value):
+            matches = [(m.start(), _stem(m.group())) for m in _TOKEN.finditer(text.lower())]
+            matches = [(position, token) for position, token in matches if token in terms]
+            hits = len({token for _, token in matches})
+            if hits > best_hits:
+                best, best_hits = (text, matches[0][0]), hits
+    if best is None:
+        return ""
+    text, position = best
+    start = max(0, position - width // 3)
+    return ("…" if start else "") + text[start:start + width].strip() + ("…" if start + width < len(text) else "")
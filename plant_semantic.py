@@ -0,0 +1,271 @@
+import functools
+import math
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from api_config import CHAT_SEMANTIC_THRESHOLD
+from plant_metrics import REGISTRY, STAGE_HISTOGRAM, incr, observe
+from plant_search import tokenize
+
+EMBEDDING_DIM = 1024
+# Eviction: least recently used plants beyond MAX_PLANTS, least recently used answers beyond MAX_PER_PLANT
+MAX_PLANTS = 2048
+MAX_PER_PLANT = 32
+ANSWER_TTL_SECONDS = 7 * 24 * 60 * 60
+# Cosine similarity at which two questions count as the same one
+SAME_QUESTION = 0.999
+
+# Words that only say *how* something is asked ("how much", "do you need") and would
+# otherwise make paraphrases of one question look different
+QUESTION_WORDS = frozenset("""
+how what why when should do does did can could would much many often need needs like likes want prefer best
+ok okay please tell know enough right good kind type amount ideal turn turning get getting go going become
+lot lots have has around usually normally really
+""".split())
+# Same care topic, different words (keys as plant_search.tokenize leaves them: 'poisonous' -> 'poisonou')
+SYNONYMS = {
+    "watering": "water", "watered": "water", "thirsty": "water", "drink": "water", "moist": "water",
+    "sunlight": "light", "sun": "light", "bright": "light", "shade": "light", "sunny": "light",
+    "fertilizer": "feed", "fertiliser": "feed", "fertilize": "feed", "fertilise": "feed", "feeding": "feed",
+    "food": "feed", "nutrient": "feed", "poisonou": "toxic", "toxicity": "toxic", "poison": "toxic",
+    "cat": "pet", "dog": "pet", "kid": "child", "children": "child", "baby": "child",
+    "humidity": "humid", "misting": "mist", "temp": "temperature", "yellowing": "yellow", "repotting": "repot",
+}
+# Typical plant-care questions: inverse document frequencies are fitted on these, so words
+# found in many questions ("leaf", "plant") weigh less than the ones that tell them apart
+QUESTION_CORPUS = (
+    "How often should I water you?", "How much water do you need?", "Do you like to dry out between waterings?",
+    "How much light do you need?", "Can you live in low light?", "Do you need direct sun?",
+    "What temperature do you like?", "Can you survive cold winters?", "Are you frost hardy?",
+    "Are you toxic to pets?", "Are you safe for cats and dogs?", "Are you poisonous to children?",
+    "How humid should it be for you?", "Should I mist your leaves?", "When should I feed you?",
+    "What fertilizer do you like?", "How do I keep you healthy?", "Why are your leaves turning yellow?",
+    "Why are your leaves brown at the tips?", "Why are your leaves drooping?", "When should I repot you?",
+    "What soil do you like?", "How big will you grow?", "How fast do you grow?", "How do I propagate you?",
+    "Do you flower?", "When do you bloom?", "Should I prune you?", "Do you have pests?",
+    "Why are there spots on your leaves?", "Can you grow outside?", "Where should I put you?",
+)
+
+
+def _hash(term: str) -> int:
+    return zlib.crc32(term.encode())  # Stable across processes, unlike hash()
+
+
+def question_terms(text: str) -> List[str]:
+    """Content words of a question, stemmed and mapped to one word per care topic."""
+    terms = []
+    for token in tokenize(text):
+        if len(token) < 2 or token in QUESTION_WORDS:
+            continue
+        if len(token) > 5 and token.endswith("ing"):
+            token = token[:-3]
+        terms.append(SYNONYMS.get(token, token))
+    return terms
+
+
+class HashedTfidfEmbedder:
+    """
+    Questions as L2-normalised TF-IDF vectors of `dim` hashed buckets (the
+    hashing trick, with a sign bit so collisions cancel out on average).
+    Needs no model file and no training beyond the IDF of `corpus`; words
+    not in the corpus get the highest IDF.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM, corpus: Iterable[str] = QUESTION_CORPUS):
+        self.dim = dim
+        documents = [set(question_terms(q)) for q in corpus]
+        df = Counter(term for terms in documents for term in terms)
+        n = len(documents)
+        self.idf = {term: math.log((1 + n) / (1 + count)) + 1 for term, count in df.items()}
+        self.default_idf = math.log(1 + n) + 1
+
+    def embed(self, text: str) -> Optional[np.ndarray]:
+        """float32 unit vector, or None if the text has no content words."""
+        counts = Counter(question_terms(text))
+        if not counts:
+            return None
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for term, count in counts.items():
+            h = _hash(term)
+            sign = 1.0 if h & 0x80000000 else -1.0
+            vector[h % self.dim] += sign * (1 + math.log(count)) * self.idf.get(term, self.default_idf)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
+
+class _PlantAnswers:
+    """
+    One plant's stored questions: a matrix of unit vectors, searched by brute
+    force. `seeded` is the seed the plant was last seeded from.
+    """
+
+    __slots__ = ("vectors", "questions", "answers", "used_at", "seeded")
+
+    def __init__(self, dim: int):
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.questions: List[str] = []
+        self.answers: List[str] = []
+        self.used_at: List[float] = []
+        self.seeded: Tuple[Tuple[str, str], ...] = ()
+
+    def closest(self, vector: np.ndarray) -> Tuple[Optional[int], float]:
+        """(index, cosine similarity) of the stored question closest to `vector`; (None, 0.0) if empty."""
+        if not self.answers:
+            return None, 0.0
+        similarities = self.vectors @ vector
+        best = int(np.argmax(similarities))
+        return best, float(similarities[best])
+
+    def add(self, vector: np.ndarray, question: str, answer: str, now: float, max_entries: int) -> int:
+        """Store one answer (replacing the least recently used beyond max_entries); returns evictions."""
+        if len(self.answers) >= max_entries:
+            oldest = int(np.argmin(self.used_at))
+            self.vectors[oldest] = vector
+            self.questions[oldest], self.answers[oldest], self.used_at[oldest] = question, answer, now
+            return 1
+        self.vectors = np.vstack([self.vectors, vector[None, :]])
+        self.questions.append(question)
+        self.answers.append(answer)
+        self.used_at.append(now)
+        return 0
+
+    def expire(self, cutoff: float) -> int:
+        keep = [i for i, used in enumerate(self.used_at) if used >= cutoff]
+        expired = len(self.answers) - len(keep)
+        if expired:
+            self.vectors = self.vectors[keep]
+            self.questions = [self.questions[i] for i in keep]
+            self.answers = [self.answers[i] for i in keep]
+            self.used_at = [self.used_at[i] for i in keep]
+        return expired
+
+
+class SemanticAnswerCache:
+    """
+    Chat answers per plant, found by question similarity rather than exact text.
+
+    `plant_key` identifies the plant *and* its persona prompt (plant_greetings.
+    prompt_hash), so an answer is only reused for the same care record and
+    model. lookup() returns the answer to the most similar stored question if
+    its cosine similarity reaches `threshold`. Answers not used for `ttl_seconds`
+    expire; beyond `max_per_plant` answers (or `max_plants` plants) the least
+    recently used are evicted. Thread-safe.
+    """
+
+    def __init__(self, threshold: float = CHAT_SEMANTIC_THRESHOLD, embedder: Optional[HashedTfidfEmbedder] = None,
+                 max_plants: int = MAX_PLANTS, max_per_plant: int = MAX_PER_PLANT,
+                 ttl_seconds: float = ANSWER_TTL_SECONDS):
+        self.threshold = threshold
+        self.embedder = embedder or HashedTfidfEmbedder()
+        self.max_plants = max_plants
+        self.max_per_plant = max_per_plant
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._plants: "OrderedDict[str, _PlantAnswers]" = OrderedDict()
+        self.hits = self.misses = 0
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(plant.answers) for plant in self._plants.values())
+
+    def hit_rate(self) -> float:
+        with self._lock:
+            total = self.hits + self.misses
+            return self.hits / total if total else 0.0
+
+    def _plant(self, plant_key: str, seed: Sequence[Tuple[str, str]] = ()) -> _PlantAnswers:
+        """
+        Holds the lock. The plant's answers (most recently used now), seeded
+        from `seed` if the plant is new or `seed` changed since it was seeded.
+        """
+        plant = self._plants.get(plant_key)
+        if plant is not None:
+            self._plants.move_to_end(plant_key)
+        else:
+            plant = self._plants[plant_key] = _PlantAnswers(self.embedder.dim)
+            while len(self._plants) > self.max_plants:
+                _, evicted = self._plants.popitem(last=False)
+                incr("plant_semantic_cache_total", len(evicted.answers), result="evicted")
+        seed = tuple(seed)
+        if seed and seed != plant.seeded:  # E.g. the pre-generated table was (re)generated after the first chat
+            self._seed(plant, seed)
+        return plant
+
+    def _seed(self, plant: _PlantAnswers, seed: Tuple[Tuple[str, str], ...]):
+        """Holds the lock. Add the seed's answers, replacing those of the same questions."""
+        now = time.time()
+        evicted = 0
+        for question, answer in seed:
+            vector = self.embedder.embed(question)
+            if vector is None:
+                continue
+            best, similarity = plant.closest(vector)
+            if similarity >= SAME_QUESTION:
+                plant.answers[best], plant.used_at[best] = answer, now
+            else:
+                evicted += plant.add(vector, question, answer, now, self.max_per_plant)
+        plant.seeded = seed
+        if evicted:
+            incr("plant_semantic_cache_total", evicted, result="evicted")
+
+    def lookup(self, plant_key: str, question: str,
+               seed: Sequence[Tuple[str, str]] = ()) -> Optional[Tuple[str, float]]:
+        """
+        (answer, similarity) for the closest stored question, or None below the threshold.
+
+        `seed` lists (question, answer) pairs to start a plant's store with, e.g.
+        its pre-generated answers; they are added again whenever `seed` changes.
+        """
+        started = time.perf_counter()
+        vector = self.embedder.embed(question)
+        with self._lock:
+            plant = self._plant(plant_key, seed)
+            now = time.time()
+            expired = plant.expire(now - self.ttl_seconds)
+            if expired:
+                incr("plant_semantic_cache_total", expired, result="expired")
+            best, similarity = plant.closest(vector) if vector is not None else (None, 0.0)
+            hit = best is not None and similarity >= self.threshold
+            if hit:
+                plant.used_at[best] = now
+                self.hits += 1
+            else:
+                self.misses += 1
+            answer = plant.answers[best] if hit else None
+        incr("plant_semantic_cache_total", result="hit" if hit else "miss")
+        observe(STAGE_HISTOGRAM, time.perf_counter() - started, stage="semantic_cache_lookup")
+        return (answer, similarity) if hit else None
+
+    def store(self, plant_key: str, question: str, answer: str):
+        vector = self.embedder.embed(question)
+        if vector is None:
+            return
+        with self._lock:
+            plant = self._plant(plant_key)
+            if plant.closest(vector)[1] >= SAME_QUESTION:
+                return  # Same question already stored (e.g. two sessions missed at once)
+            evicted = plant.add(vector, question, answer, time.time(), self.max_per_plant)
+        incr("plant_semantic_cache_total", result="stored")
+        if evicted:
+            incr("plant_semantic_cache_total", evicted, result="evicted")
+
+    def clear(self):
+        with self._lock:
+            self._plants.clear()
+            self.hits = self.misses = 0
+
+
+@functools.lru_cache(maxsize=None)
+def get_answer_cache() -> SemanticAnswerCache:
+    """Process-wide semantic answer cache for chat (threshold from CHAT_SEMANTIC_THRESHOLD)."""
+    cache = SemanticAnswerCache()
+    REGISTRY.describe("plant_semantic_cache_total", "Chat answers served, stored, evicted or expired by the "
+                                                    "semantic answer cache.")
+    REGISTRY.gauge("plant_semantic_cache_entries", lambda: len(cache))
+    REGISTRY.gauge("plant_semantic_cache_hit_rate", cache.hit_rate)
+    return cache
@@ -1,7 +1,11 @@
+import logging
 import streamlit as st
 from pymongo import MongoClient
 from datetime import datetime
 from api_config import MONGO_URI
+import plant_data
+from plant_metrics import span
+from plant_rules import RulesEngine, ThresholdTable, NEEDS_WATER, OKAY, TOO_WET
 
 uri = MONGO_URI
 
@@ -9,14 +13,32 @@ uri = MONGO_URI
 client = MongoClient(uri)
 db = client['temp_moisture'] 
 collection = db['c1']  
+# Readings that carry no sensor_id come from the single sensor logging to this collection
+DEFAULT_SENSOR_ID = collection.name
 
+logger = logging.getLogger(__name__)
+
+@span("mongo_latest_stats")
 def get_latest_stats():
     # Fetch the latest data (no need to count documents or sort, just fetch the most recent entry)
     latest_data = collection.find_one(sort=[('timestamp', -1)])  # Sort by timestamp descending and get the most recent
     return latest_data
 
+@st.cache_resource
+def get_rules_engine(plant_name, care_version):
+    """Thresholds compiled from the plant's care record (rebuilt when the plant or the care data changes)."""
+    care_record = plant_data.get_plant(plant_name) if plant_name else None
+    return RulesEngine(ThresholdTable({DEFAULT_SENSOR_ID: care_record}))
+
 st.title("Plant Care Monitor")
 
+care_dataset = plant_data.load_dataset()
+plant_names = sorted(p.get('Plant Name') for p in care_dataset.records if p.get('Plant Name'))
+plant_name = st.selectbox("Which plant is this sensor in?", ["-- Not set (generic thresholds) --"] + plant_names)
+if plant_name.startswith("--"):
+    plant_name = None
+engine = get_rules_engine(plant_name, care_dataset.version)
+
 # Button to fetch the latest data
 if st.button("Give Me Stats Update"):
     data = get_latest_stats()
@@ -33,11 +55,28 @@ if st.button("Give Me Stats Update"):
         st.write(f"**Moisture Level**: {moisture_value}")
         st.write(f"**Last Updated**: {timestamp}")
 
-        if moisture_value < 400:  # Example threshold for moisture
+        reading = dict(data, sensor_id=data.get("sensor_id", DEFAULT_SENSOR_ID))
+        result, alerts = engine.evaluate([reading])
+        status = result["moisture_status"][0]
+        if status == NEEDS_WATER:
             st.warning("Your plant needs water!")
-        elif moisture_value < 600:
+        elif status == TOO_WET:
+            st.warning("The soil is too wet for this plant. Let it dry out before watering again.")
+        elif status == OKAY:
             st.info("Your plant is doing okay!")
         else:
             st.success("Your plant is happy and hydrated!")
+        if result["too_cold"][0]:
+            st.warning("It's too cold for this plant!")
+        elif result["too_hot"][0]:
+            st.warning("It's too hot for this plant!")
+        for alert in alerts:
+            logger.info("Sensor alert %s (%s): %s", alert['sensor_id'], alert['plant_name'], alert['message'])
+
+        profile = engine.thresholds.profile(reading["sensor_id"])
+        if profile:
+            st.caption(f"Thresholds for {profile['plant_name'] or 'a generic plant'}: water below "
+                       f"{profile['moisture_dry']:g}, happy from {profile['moisture_okay']:g}; "
+                       f"{profile['temp_low_c']:.0f}-{profile['temp_high_c']:.0f}°C")
     else:
         st.error("No data available.")
@@ -0,0 +1,183 @@
+import base64
+import contextlib
+import functools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from plant_care import care_schedule_key, get_care_scheduler
+from plant_chatlog import PAGE_SIZE, ChatLogStore, get_chat_log_store
+from plant_scheduler import CareScheduler
+
+logger = logging.getLogger(__name__)
+
+# Saved plants belong to a browser session. An open page sends a heartbeat (touch()) this often,
+# and an owner whose page has sent nothing for SAVED_PLANTS_IDLE_SECONDS has closed it
+SAVED_PLANTS_HEARTBEAT_SECONDS = 60
+SAVED_PLANTS_IDLE_SECONDS = 10 * 60
+# Memory all owners' profiles (mostly their photos) may take; saves beyond it are refused
+SAVED_PLANTS_MAX_BYTES = 256 * 1024 * 1024
+# Rough size of a profile besides its photo (care record, identification)
+ENTRY_OVERHEAD_BYTES = 4 * 1024
+
+
+def image_data_url(image_bytes: bytes, mime_type: Optional[str]) -> str:
+    encoded = base64.b64encode(image_bytes).decode()
+    return f"data:{mime_type or 'image/jpeg'};base64,{encoded}"
+
+
+class SavedPlantStore:
+    """
+    Saved plant profiles per owner (one browser session), kept in memory and thread-safe.
+
+    Saving a plant schedules its watering/feeding reminders and deleting it
+    cancels them. Each plant's chat history goes to an append-only ChatLogStore
+    (one append per message, read back a page at a time) rather than living in
+    the profile. An owner's plants live as long as its browser session: the
+    open page calls touch() every SAVED_PLANTS_HEARTBEAT_SECONDS, and owners
+    not heard from for `idle_seconds` are forgotten (pruned on access), as
+    their Streamlit session state would have been, reminders and chat
+    histories included. Once the profiles add up to `max_bytes`, new saves
+    are refused; no owner's plants are dropped to make room for another's.
+    """
+
+    def __init__(self, scheduler: Optional[CareScheduler] = None, idle_seconds: float = SAVED_PLANTS_IDLE_SECONDS,
+                 chat_log: Optional[ChatLogStore] = None, max_bytes: int = SAVED_PLANTS_MAX_BYTES):
+        self.scheduler = scheduler
+        self.idle_seconds = idle_seconds
+        self.max_bytes = max_bytes
+        self.chat_log = chat_log or ChatLogStore(":memory:")
+        self._lock = threading.Lock()
+        self._owners: "OrderedDict[str, Dict[str, Dict[str, Any]]]" = OrderedDict()  # Least recently used first
+        self._last_seen: Dict[str, float] = {}
+        self._owner_bytes: Dict[str, int] = {}
+        self._bytes = 0
+        self._forgotten: List[Tuple[str, List[str]]] = []  # (owner, nicknames) to clean up once the lock is released
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """The store lock; reminders and chat logs of owners forgotten meanwhile are removed after releasing it."""
+        with self._lock:
+            yield
+            forgotten, self._forgotten = self._forgotten, []
+        for owner, nicknames in forgotten:
+            for nickname in nicknames:
+                if self.scheduler is not None:
+                    self.scheduler.remove_plant(care_schedule_key(owner, nickname))
+            self.chat_log.delete(owner)
+
+    def _plants_locked(self, owner: str, create: bool = False) -> Optional[Dict[str, Dict[str, Any]]]:
+        now = time.time()
+        while self._owners:  # Prune idle owners, oldest first
+            oldest = next(iter(self._owners))
+            if oldest == owner or now - self._last_seen[oldest] <= self.idle_seconds:
+                break
+            self._forget_locked(oldest)
+        plants = self._owners.get(owner)
+        if plants is None and create:
+            plants = self._owners[owner] = {}
+        if plants is not None:
+            self._owners.move_to_end(owner)
+            self._last_seen[owner] = now
+        return plants
+
+    def _forget_locked(self, owner: str):
+        self._forgotten.append((owner, list(self._owners.pop(owner, {}))))
+        self._bytes -= self._owner_bytes.pop(owner, 0)
+        self._last_seen.pop(owner, None)
+
+    def _resize_locked(self, owner: str, delta: int):
+        self._owner_bytes[owner] = self._owner_bytes.get(owner, 0) + delta
+        self._bytes += delta
+
+    def touch(self, owner: str):
+        """Heartbeat from the owner's open page: keeps its plants (and their chat histories) alive."""
+        with self._locked():
+            has_plants = bool(self._plants_locked(owner))
+        if has_plants:
+            self.chat_log.touch(owner)
+
+    def nicknames(self, owner: str) -> List[str]:
+        with self._locked():
+            return list(self._plants_locked(owner) or {})
+
+    def get(self, owner: str, nickname: str) -> Optional[Dict[str, Any]]:
+        with self._locked():
+            return (self._plants_locked(owner) or {}).get(nickname)
+
+    def save(self, owner: str, nickname: str, image_bytes: Optional[bytes] = None, image_type: Optional[str] = None,
+             id_result: Optional[Dict[str, Any]] = None, care_info=None, care_match=None,
+             chat_log: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Save a new profile, with the chat so far; returns the entry, or {'error': ...}
+        if the nickname is empty or taken.
+        """
+        if not nickname:
+            return {'error': "Please enter a nickname to save."}
+        entry = {
+            "nickname": nickname,
+            "image": image_data_url(image_bytes, image_type) if image_bytes else None,
+            "id_result": id_result,
+            "care_info": care_info, # None if no care profile was found
+            "care_match": care_match,
+        }
+        with self._locked():
+            plants = self._plants_locked(owner, create=True)
+            if nickname in plants:
+                return {'error': f"A plant named '{nickname}' already exists. Please choose a different name."}
+            if self._bytes + _entry_bytes(entry) > self.max_bytes:
+                logger.warning("Saved plants at %d MiB; refusing a new save.", self.max_bytes // (1024 * 1024))
+                return {'error': "There's no room to save more plants right now. Please try again later."}
+            plants[nickname] = entry
+            self._resize_locked(owner, _entry_bytes(entry))
+        self.chat_log.delete(owner, nickname)  # Never resurface a log an earlier process left behind
+        self.chat_log.extend(owner, nickname, chat_log or [])
+        if self.scheduler is not None:
+            self.scheduler.schedule_plant(care_schedule_key(owner, nickname), nickname, care_info, owner=owner)
+        return entry
+
+    def append_chat(self, owner: str, nickname: str, message: Dict[str, Any]) -> Optional[int]:
+        """Add one message to a saved plant's chat; returns its seq, or None if there is no such plant."""
+        with self._locked():
+            if nickname not in (self._plants_locked(owner) or {}):
+                return None
+        return self.chat_log.append(owner, nickname, message)
+
+    def chat_page(self, owner: str, nickname: str, limit: int = PAGE_SIZE,
+                  before: Optional[int] = None) -> List[Dict[str, Any]]:
+        """The latest `limit` messages of a saved plant's chat, or those before seq `before` (oldest first)."""
+        return self.chat_log.page(owner, nickname, limit, before)
+
+    def has_earlier_chat(self, owner: str, nickname: str, before: int) -> bool:
+        """Whether a saved plant's chat has messages older than seq `before`."""
+        return self.chat_log.has_before(owner, nickname, before)
+
+    def delete(self, owner: str, nickname: str) -> bool:
+        with self._locked():
+            entry = (self._plants_locked(owner) or {}).pop(nickname, None)
+            if entry is not None:
+                self._resize_locked(owner, -_entry_bytes(entry))
+        if entry is None:
+            return False
+        self.chat_log.delete(owner, nickname)
+        if self.scheduler is not None:
+            self.scheduler.remove_plant(care_schedule_key(owner, nickname))
+        return True
+
+
+def _entry_bytes(entry: Dict[str, Any]) -> int:
+    return len(entry["image"] or "") + ENTRY_OVERHEAD_BYTES
+
+
+@functools.lru_cache(maxsize=None)
+def get_saved_plant_store() -> SavedPlantStore:
+    """
+    Process-wide saved-plant store, wired to the reminder scheduler and the
+    chat log (compacted in the background; histories no process has touched
+    for the same idle time expire).
+    """
+    chat_log = get_chat_log_store()
+    chat_log.start_compactor(max_idle_seconds=SAVED_PLANTS_IDLE_SECONDS)
+    return SavedPlantStore(get_care_scheduler(), chat_log=chat_log)
@@ -0,0 +1,34 @@
+# Static HTML/CSS for the Streamlit UI, kept out of streamlit_app.py so reruns don't rebuild it
+
+# ===== Animation HTML =====
+# IMPORTANT: Replace the placeholder in the img src attribute!
+LOADING_ANIMATION_HTML = """
+<!DOCTYPE html>
+<html>
+<head>
+<title>Loading Animation</title>
+<style> /* Keep CSS as is */ </style>
+</head>
+<body>
+    <div class="halftone-container" id="halftoneContainer"></div>
+    <img id="sourceImage" src="<<<--- PASTE YOUR COMPLETE BASE64 DATA URL FROM THE **THREE-LEAF** TRANSPARENT PNG HERE --->>>" style="display: none;">
+    <canvas id="samplingCanvas" style="display: none;"></canvas>
+<script> /* Keep FULL JS as is */ </script>
+</body>
+</html>
+""" # Remember to paste your Base64 image data URL here
+
+# ===== Chat bubble styles =====
+CHAT_CSS = """
+        <style>
+            /* ... Your existing CSS ... */
+            .message-container { padding: 1px 5px; } /* Reduced vertical padding */
+            .user-message { background: #0b81fe; color: white; border-radius: 18px 18px 0 18px; padding: 8px 14px; margin: 3px 0 3px auto; width: fit-content; max-width: 80%; word-wrap: break-word; box-shadow: 0 1px 2px rgba(0,0,0,0.1); animation: fadeIn 0.3s ease-out; }
+            .bot-message { background: #e5e5ea; color: #000; border-radius: 18px 18px 18px 0; padding: 8px 14px; margin: 3px auto 3px 0; width: fit-content; max-width: 80%; word-wrap: break-word; box-shadow: 0 1px 2px rgba(0,0,0,0.05); animation: fadeIn 0.3s ease-out; }
+            .message-meta { font-size: 0.70rem; color: #777; margin-top: 3px; } /* Reduced margin */
+            .bot-message .message-meta { text-align: left; color: #555;}
+            .user-message .message-meta { text-align: right; }
+            @keyframes fadeIn { from { opacity: 0; transform: translateY(5px); } to { opacity: 1; transform: translateY(0); } }
+            .stChatInputContainer { position: sticky; bottom: 0; background: white; padding-top: 10px; }
+        </style>
+    """
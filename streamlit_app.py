@@ -1,48 +1,54 @@
 import streamlit as st
 st.set_page_config(page_title="Plant Buddy", page_icon="🌿", layout="wide")
-from PIL import Image
-import os
+# Only rendering lives here: Streamlit re-executes this script on every interaction.
+# Identification, care lookup, chat and storage are services with process-wide
+# singletons (plant_identification, plant_care, plant_chat, plant_storage), usable
+# and benchmarkable without Streamlit. PIL is imported where it is used.
 import json
-import requests
 import base64
-import tempfile
+import logging
 from io import BytesIO
-from fuzzywuzzy import process
-import pytz
+import uuid
+import zipfile
+from collections.abc import Mapping
 from datetime import datetime
-# Use api_config for keys
-from api_config import PLANTNET_API_KEY, GEMINI_API_KEY
-import streamlit.components.v1 as components
-
-# ===== Animation HTML =====
-# IMPORTANT: Replace the placeholder in the img src attribute!
-loading_animation_html = """
-<!DOCTYPE html>
-<html>
-<head>
-<title>Loading Animation</title>
-<style> /* Keep CSS as is */ </style>
-</head>
-<body>
-    <div class="halftone-container" id="halftoneContainer"></div>
-    <img id="sourceImage" src="<<<--- PASTE YOUR COMPLETE BASE64 DATA URL FROM THE **THREE-LEAF** TRANSPARENT PNG HERE --->>>" style="display: none;">
-    <canvas id="samplingCanvas" style="display: none;"></canvas>
-<script> /* Keep FULL JS as is */ </script>
-</body>
-</html>
-""" # Remember to paste your Base64 image data URL here
-
-# --- Constants and Global Init ---
-# PLANTNET_API_KEY and GEMINI_API_KEY are imported from api_config.py
-PLANTNET_URL = "https://my-api.plantnet.org/v2/identify/all"
-# Use the imported GEMINI_API_KEY
-GEMINI_API_URL = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key={GEMINI_API_KEY}"
-EASTERN_TZ = pytz.timezone('US/Eastern')
-PLANT_CARE_FILE = "plants_with_personality3_copy.json" # Use the original filename
+from api_config import PLANTNET_API_KEY, GEMINI_API_KEY, METRICS_PORT, METRICS_LOG_FILE, ENABLE_ADMIN_PAGE
+import plant_metrics as metrics
+from plant_metrics import span, incr, trace_breakdown, STAGE_HISTOGRAM
+from plant_jobs import DONE, FAILED
+from plant_net import MAX_IMAGES_PER_REQUEST, VALID_ORGANS
+from plant_facets import LIGHT_CATEGORIES, WATERING_CATEGORIES
+from plant_search import snippet
+from plant_scheduler import WATERING, FEEDING
+from plant_index import MATCH_CANDIDATE, MATCH_GENUS, MATCH_FAMILY, MATCH_FUZZY
+from plant_batch import identify_bulk, iter_zip_images, format_throughput_report
+from plant_identification import identify, get_identification_queue
+from plant_care import (PLANT_CARE_FILE, load_care_dataset, match_care_instructions, find_similar_plant_matches,
+                        get_care_scheduler, care_schedule_key)
+from plant_chat import chat_with_plant, chat_timestamp, opening_greeting
+from plant_greetings import COMMON_QUESTIONS
+from plant_chatlog import PAGE_SIZE as CHAT_PAGE_SIZE
+from plant_storage import SAVED_PLANTS_HEARTBEAT_SECONDS, get_saved_plant_store
+from plant_theme import CHAT_CSS
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+ID_POLL_INTERVAL_SECONDS = 0.5
+BULK_MAX_WORKERS = 8
+FINDER_MAX_RESULTS = 200 # Rows shown on the Find Plants page
+SEARCH_MAX_RESULTS = 10 # Full-text search hits shown
+QUICK_QUESTIONS = 3 # Common first questions offered as buttons in a new chat
+CHAT_WINDOW = 2 * CHAT_PAGE_SIZE # A saved plant's chat keeps at most this many messages in session state
+ID_MODE_SINGLE = "📷 Single photo"
+ID_MODE_MULTI = "🌸 Several photos of one plant"
+ID_MODE_BULK = "📦 Bulk (zip of many plants)"
+ID_MODES = [ID_MODE_SINGLE, ID_MODE_MULTI, ID_MODE_BULK]
 
 # =======================================================
 # ===== IMAGE DISPLAY HELPER FUNCTION =====
 # =======================================================
+@span("render_image")
 def display_image_with_max_height(image_source, caption="", max_height_px=300, min_height_px=0):
     """
     Displays an image centered with max and min height constraints, letting width adjust.
@@ -53,6 +59,8 @@ def display_image_with_max_height(image_source, caption="", max_height_px=300, m
         max_height_px (int): The maximum vertical size for the image.
         min_height_px (int): The minimum vertical size for the image (0 for no minimum).
     """
+    from PIL import Image
+
     img_data_url = None
 
     # --- Image source processing ---
@@ -126,352 +134,47 @@ def display_image_with_max_height(image_source, caption="", max_height_px=300, m
 # =======================================================
 
 
-# ===== API Functions =====
-
-def identify_plant(image_bytes):
-    """Identifies plant using PlantNet API with refined error logging."""
-    # PLANTNET_API_KEY is imported from api_config
-    if not PLANTNET_API_KEY:
-        return {'error': "PlantNet API Key is not configured."}
-    files = {'images': ('image.jpg', image_bytes)}
-    params = {'api-key': PLANTNET_API_KEY, 'include-related-images': 'false'}
-    try:
-        response = requests.post(PLANTNET_URL, files=files, params=params, timeout=20)
-        response.raise_for_status()
-        data = response.json()
-        if "results" in data and data["results"]:
-            best_result = data["results"][0]
-            sci_name = best_result["species"].get("scientificNameWithoutAuthor", "Unknown")
-            common_name = (best_result["species"].get("commonNames") or ["Unknown"])[0]
-            confidence = round(best_result.get("score", 0) * 100, 1)
-            return {'scientific_name': sci_name, 'common_name': common_name, 'confidence': confidence}
-        else:
-            return {'error': "No plant matches found by PlantNet."}
-    except requests.exceptions.Timeout:
-         st.error("PlantNet API request timed out.")
-         print("ERROR: PlantNet API timed out.") # Log for server console
-         return {'error': "API request timed out"}
-    except requests.exceptions.RequestException as e:
-        err_msg = f"Network/API error connecting to PlantNet: {e}"
-        resp_text = f" | Response: {e.response.text}" if e.response else " | Response: None"
-        st.error(err_msg)
-        print(f"ERROR: {err_msg}{resp_text}") # Log details
-        return {'error': err_msg}
-    except json.JSONDecodeError:
-         st.error("Failed to decode PlantNet API response (invalid JSON).")
-         print("ERROR: PlantNet invalid JSON response.")
-         return {'error': "Invalid API response format"}
-    except Exception as e:
-        st.error(f"An unexpected error occurred during identification: {e}")
-        print(f"ERROR: Unexpected PlantNet Error: {e}")
-        return {'error': f"Unexpected Error: {e}"}
-
-def create_personality_profile(care_info):
-    """Creates personality details, handling missing data and types."""
-    default_personality = {"title": "Standard Plant", "traits": "observant", "prompt": "You are a plant. Respond factually but briefly."}
-    if not care_info or not isinstance(care_info, dict):
-        return default_personality
-
-    personality_data = care_info.get("Personality")
-    if not personality_data or not isinstance(personality_data, dict):
-        # If no personality dict, try to use plant name as title at least
-        plant_name = care_info.get("Plant Name", "Plant")
-        return {"title": f"The {plant_name}", "traits": "resilient", "prompt": "Respond simply."}
-
-    # Get data with defaults
-    title = personality_data.get("Title", care_info.get("Plant Name", "Plant"))
-    traits_list = personality_data.get("Traits", ["observant"]) # Default to a list
-    prompt = personality_data.get("Prompt", "Respond in character.")
-
-    # Ensure traits_list is ACTUALLY a list before processing
-    if not isinstance(traits_list, list):
-        print(f"WARN: Traits data for {title} was not a list, using default.") # Optional warning
-        traits_list = ["observant"] # Default if type is wrong
-
-    # Now, traits_list is guaranteed to be a list. Create traits_str from it.
-    valid_traits = [str(t) for t in traits_list if t] # Ensure items are strings and not empty
-    traits_str = ", ".join(valid_traits)
-
-    # Ensure traits_str isn't empty AFTER joining/filtering
-    final_traits = traits_str if traits_str else "observant" # Default if filtering removed everything
-
-    return {"title": title, "traits": final_traits, "prompt": prompt}
-
-
-def send_message(messages):
-    """Sends messages to the Gemini API with refined error logging."""
-    # GEMINI_API_KEY is imported from api_config
-    if not GEMINI_API_KEY:
-        return "Gemini API Key is not configured. Cannot send message."
-    payload = {"contents": messages}
-    headers = {"Content-Type": "application/json"}
-    try:
-        response = requests.post(GEMINI_API_URL, json=payload, headers=headers, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-        # Enhanced parsing to prevent errors
-        candidates = data.get('candidates')
-        if candidates and isinstance(candidates, list) and len(candidates) > 0:
-            first_candidate = candidates[0]
-            if first_candidate and isinstance(first_candidate, dict):
-                content = first_candidate.get('content')
-                if content and isinstance(content, dict):
-                    parts = content.get('parts')
-                    # Check if 'parts' is a list and has at least one element which is a dict with 'text'
-                    if parts and isinstance(parts, list) and len(parts) > 0 and isinstance(parts[0], dict) and 'text' in parts[0]:
-                        return parts[0]['text']
-        # If the expected structure isn't found, log it and return a user-friendly message
-        st.warning("Received an unexpected response format from the Gemini API.")
-        print("WARN: Unexpected Gemini Response Structure:", json.dumps(data, indent=2)) # Log the structure
-        return "Sorry, I received a response I couldn't quite understand from the chat model."
-    except requests.exceptions.Timeout:
-         st.error("Gemini API request timed out."); print("ERROR: Gemini timed out.")
-         return "Sorry, I'm feeling a bit slow right now and the request timed out."
-    except requests.exceptions.RequestException as e:
-        err_msg = f"Error calling Gemini API: {e}"
-        resp_text = ""
-        # Try to get more detail from the response if available
-        if e.response is not None:
-            try:
-                resp_json = e.response.json()
-                error_detail = resp_json.get('error', {}).get('message', e.response.text)
-                resp_text = f" | Response Status: {e.response.status_code}, Details: {error_detail}"
-            except json.JSONDecodeError:
-                resp_text = f" | Response Status: {e.response.status_code}, Response Body: {e.response.text}"
-        else:
-             resp_text = " | Response: None"
-        st.error(err_msg + resp_text.split('| Response Body:')[0]) # Show status code and message, not full text body in UI
-        print(f"ERROR: {err_msg}{resp_text}") # Log full details
-        return "Sorry, I'm having trouble communicating with the language model right now."
-    except json.JSONDecodeError: # If the response isn't valid JSON (though raise_for_status should catch HTTP errors)
-        st.error("Failed to decode Gemini API response (invalid JSON).")
-        print("ERROR: Gemini invalid JSON response.")
-        return "Sorry, I received an invalid response from the language model."
-    except Exception as e:
-        st.error(f"An unexpected error occurred while interacting with Gemini: {e}")
-        print(f"ERROR: Unexpected Gemini Error: {e}")
-        return "Oops, something unexpected went wrong on my end while processing the chat."
-
-
-def chat_with_plant(care_info, conversation_history, id_result=None): # Add id_result parameter
-    """Constructs the prompt and calls the Gemini API. Handles missing care_info for generic chat."""
-
-    # GEMINI_API_KEY is imported from api_config
-    if not GEMINI_API_KEY:
-        return "Chat feature disabled: Gemini API Key not set."
-
-    plant_name = "this plant" # Default
-    system_prompt = ""
-
-    # --- Case 1: Specific Care Info IS available ---
-    if care_info and isinstance(care_info, dict):
-        personality = create_personality_profile(care_info)
-        plant_name = care_info.get('Plant Name', 'a plant') # Use care_info name
-
-        # Extract Specific Care Details
-        light = care_info.get('Light Requirements', 'not specified')
-        watering = care_info.get('Watering', 'not specified')
-        humidity = care_info.get('Humidity Preferences', 'not specified')
-        temp = care_info.get('Temperature Range', 'not specified')
-        feeding = care_info.get('Feeding Schedule', 'not specified')
-        toxicity = care_info.get('Toxicity', 'not specified')
-
-        # Construct Enhanced System Prompt with specific details
-        system_prompt = f"""
-        CONTEXT: You are providing a short chatbot response (1-3 sentences maximum).
-        TASK: Act *exclusively* as the plant named '{plant_name}'. Stay fully in character. Absolutely DO NOT mention being an AI, model, language model, or similar concepts. Never break character.
-
-        YOUR PERSONALITY:
-        - You are: '{personality['title']}'
-        - Key traits: {personality['traits']}
-        - Guiding philosophy: {personality['prompt']}
-
-        YOUR SPECIFIC CARE NEEDS (Refer *directly* to these details when asked about your care):
-        - My Light Needs: {light}
-        - My Watering Needs: {watering}
-        - My Preferred Humidity: {humidity}
-        - My Ideal Temperature: {temp}
-        - My Feeding Schedule: {feeding}
-        - A Note on Toxicity: {toxicity}
-
-        RESPONSE RULES:
-        1. Always speak in the first person ("I", "me", "my").
-        2. Fully embody the personality described above.
-        3. When asked about light, water, temperature, etc., give answers BASED *ONLY* ON "YOUR SPECIFIC CARE NEEDS" listed above. Do not invent or generalize.
-        4. Keep responses very concise (1-3 sentences max). Be brief.
-        5. **Crucially: Never reveal you are an AI or break character.** Do not use phrases like "As a large language model...".
-        """
-
-    # --- Case 2: Specific Care Info is MISSING, use generic prompt based on ID ---
-    elif id_result and isinstance(id_result, dict) and 'error' not in id_result:
-        # Try to get a name from the ID result
-        plant_name = id_result.get('common_name', id_result.get('scientific_name', 'this plant'))
-        # Clean up potential 'N/A' or empty names
-        if plant_name == 'N/A' or not plant_name.strip():
-            plant_name = 'this plant'
-
-        # Construct Generic System Prompt
-        system_prompt = f"""
-        CONTEXT: You are providing a short chatbot response (1-3 sentences maximum).
-        TASK: Act *exclusively* as the plant identified as '{plant_name}'. Stay fully in character. Absolutely DO NOT mention being an AI, model, language model, or similar concepts. Never break character.
-
-        YOUR SITUATION:
-        - You don't have a specific detailed profile stored here.
-        - Answer questions generally based on your knowledge of '{plant_name}' plants.
-        - If asked about specific preferences (like exact watering schedule, temperature range), politely state you don't have those exact details readily available but can offer general advice for your type.
-
-        RESPONSE RULES:
-        1. Always speak in the first person ("I", "me", "my").
-        2. Embody the general nature of a '{plant_name}'. Be helpful but brief.
-        3. Keep responses very concise (1-3 sentences max).
-        4. **Crucially: Never reveal you are an AI or break character.** Do not use phrases like "As a large language model...". Acknowledge you lack *specific stored details*, not that you are an AI.
-        """
-    # --- Case 3: Cannot Chat (No care_info and no valid id_result) ---
-    else:
-        return "Sorry, I don't have enough information about this plant to chat right now."
-
+@st.cache_resource(show_spinner=False)
+def get_metrics_exporters():
+    """Start the optional Prometheus endpoint / JSON metrics log once per process."""
+    exporters = {}
+    if METRICS_PORT:
+        try:
+            exporters['http'] = metrics.start_http_exporter(METRICS_PORT)
+        except OSError as e:
+            logger.exception("Could not start metrics endpoint on port %s: %s", METRICS_PORT, e)
+    if METRICS_LOG_FILE:
+        exporters['json_log'] = metrics.start_json_log(METRICS_LOG_FILE)
+    return exporters
 
-    # --- Prepare message list for Gemini (common for all valid chat cases) ---
-    messages = [
-        {"role": "user", "parts": [{"text": system_prompt}]},
-        {"role": "model", "parts": [{"text": f"Understood. I am {plant_name}. What would you like to know?"}]} # Generic acknowledgement
-    ]
 
-    # Add conversation history (ensure it's valid)
-    valid_history = [
-        m for m in conversation_history
-        if isinstance(m, dict) and "role" in m and "content" in m and m.get("role") in ["user", "assistant", "model"]
-    ]
-    for message_entry in valid_history:
-        api_role = "model" if message_entry["role"] in ["assistant", "model"] else "user"
-        messages.append({"role": api_role, "parts": [{"text": str(message_entry["content"])}]})
+def get_session_user_id():
+    """Stable per-session ID used for per-user job limits."""
+    if "session_user_id" not in st.session_state:
+        st.session_state.session_user_id = uuid.uuid4().hex
+    return st.session_state.session_user_id
 
-    # Call the API
-    response = send_message(messages)
-    return response
 
+@st.fragment(run_every=SAVED_PLANTS_HEARTBEAT_SECONDS)
+def saved_plants_heartbeat():
+    """Tell the saved-plant store this session's page is still open (it keeps the plants while it is)."""
+    get_saved_plant_store().touch(get_session_user_id())
 
 # --- Helper Functions ---
 
-@st.cache_data(show_spinner=False)
-def load_plant_care_data(filepath=PLANT_CARE_FILE):
+def load_plant_care_dataset(filepath=PLANT_CARE_FILE):
+    """This rerun's snapshot of the care dataset (see plant_care.load_care_dataset), or None after showing why not."""
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            # Basic validation: Check if it's a list
-            if isinstance(data, list):
-                return data
-            else:
-                st.error(f"Error in {filepath}: Expected a JSON list, but got {type(data).__name__}.")
-                return []
+        return load_care_dataset(filepath)
     except FileNotFoundError:
         st.error(f"Plant care file not found at {filepath}. Please ensure it exists.")
-        return []
     except json.JSONDecodeError as e:
         st.error(f"Error decoding JSON from {filepath}: {e}")
-        return []
+    except ValueError as e: # Not a JSON list
+        st.error(str(e))
     except Exception as e:
         st.error(f"Failed to load or process {filepath}: {e}")
-        return []
-
-
-def find_care_instructions(plant_name_id, care_data, match_threshold=75):
-    if not care_data: return None # No data to search
-    sci_name = None
-    common_name = None
-
-    # Determine scientific/common name from input
-    if isinstance(plant_name_id, dict):
-        sci_name = plant_name_id.get('scientific_name')
-        common_name = plant_name_id.get('common_name')
-    elif isinstance(plant_name_id, str):
-        sci_name = plant_name_id # Assume string input is scientific name for initial search
-
-    # Prepare search terms (lowercase, stripped)
-    search_sci = sci_name.lower().strip() if sci_name and isinstance(sci_name, str) else None
-    search_common = common_name.lower().strip() if common_name and isinstance(common_name, str) else None
-
-    # --- Direct Match Logic ---
-    # 1. Match Scientific Name exactly
-    if search_sci:
-        for plant in care_data:
-            # Check both 'Scientific Name' and 'Plant Name' as potential scientific name fields
-            db_sci = plant.get('Scientific Name', '').lower().strip()
-            db_plant_name_as_sci = plant.get('Plant Name', '').lower().strip()
-            if search_sci == db_sci or search_sci == db_plant_name_as_sci:
-                return plant
-
-    # 2. Match Common Name(s) exactly
-    if search_common:
-        for plant in care_data:
-            # Check 'Plant Name' field
-            if search_common == plant.get('Plant Name', '').lower().strip():
-                return plant
-            # Check 'Common Names' list (if it exists and is a list)
-            db_commons = plant.get('Common Names', [])
-            if isinstance(db_commons, list):
-                for db_c in db_commons:
-                    if isinstance(db_c, str) and search_common == db_c.lower().strip():
-                        return plant
-            # Also handle if 'Common Names' is just a single string
-            elif isinstance(db_commons, str):
-                 if search_common == db_commons.lower().strip():
-                     return plant
-
-
-    # --- Fuzzy Match Logic (if no exact match found) ---
-    # Create a mapping of searchable names (sci/common) to plant data entries
-    # Prioritize scientific name if available, otherwise use plant name
-    all_db_plants_map = {}
-    for p in care_data:
-        key_sci = p.get('Scientific Name', '').lower().strip()
-        key_plant_name = p.get('Plant Name', '').lower().strip()
-
-        # Use scientific name as primary key if valid, otherwise plant name
-        primary_key = key_sci if key_sci else key_plant_name
-        if primary_key and primary_key not in all_db_plants_map:
-             all_db_plants_map[primary_key] = p
-
-        # Add common names to the map as well, pointing to the same plant object
-        db_commons = p.get('Common Names', [])
-        if isinstance(db_commons, list):
-             for db_c in db_commons:
-                 key_common = db_c.lower().strip() if isinstance(db_c, str) else None
-                 if key_common and key_common not in all_db_plants_map:
-                     all_db_plants_map[key_common] = p
-        elif isinstance(db_commons, str): # Handle single string common name
-             key_common = db_commons.lower().strip()
-             if key_common and key_common not in all_db_plants_map:
-                 all_db_plants_map[key_common] = p
-
-
-    all_db_names = list(all_db_plants_map.keys())
-    if not all_db_names: return None # No names to search fuzzily
-
-    best_match_result = None
-    highest_score = 0
-
-    # Fuzzy match using scientific name
-    if search_sci:
-        results_sci = process.extract(search_sci, all_db_names, limit=1) # Find the single best match
-        if results_sci: # Check if any match was found
-            best_sci_match, score_sci = results_sci[0]
-            if score_sci >= match_threshold and score_sci > highest_score: # Use >= threshold
-                highest_score = score_sci
-                best_match_result = all_db_plants_map.get(best_sci_match)
-
-
-    # Fuzzy match using common name (potentially overriding sci match if score is higher)
-    if search_common:
-        results_common = process.extract(search_common, all_db_names, limit=1) # Find the single best match
-        if results_common: # Check if any match was found
-            best_common_match, score_common = results_common[0]
-            if score_common >= match_threshold and score_common > highest_score: # Use >= threshold
-                # highest_score = score_common # Not needed to update highest_score again here
-                best_match_result = all_db_plants_map.get(best_common_match)
-
-
-    return best_match_result # Will be None if no match met threshold
+    return None
 
 
 def display_identification_result(result):
@@ -496,9 +199,53 @@ def display_identification_result(result):
     - **Confidence:** <strong style='color:{color};'>{conf:.1f}%</strong>
     """, unsafe_allow_html=True)
 
+    if result.get('fallback'):
+        st.caption("⚠️ PlantNet is unavailable right now, so this answer comes from the offline classifier.")
+    elif result.get('source') == 'local':
+        st.caption("⚡ Identified instantly by the offline classifier.")
+
+    # Other ranked species PlantNet considered (first candidate is the result above)
+    alternates = (result.get('candidates') or [])[1:]
+    if alternates:
+        with st.expander(f"🔀 Other possible matches ({len(alternates)})"):
+            for candidate in alternates:
+                st.markdown(f"- `{candidate.get('scientific_name', 'N/A')}` "
+                            f"({candidate.get('common_name', 'N/A')}) — {candidate.get('confidence', 0):.1f}%")
+
+
+def display_care_match_notice(care_match, care_info, id_result):
+    """Flags care profiles that belong to a relative (or a fuzzy name match) rather than the identified species."""
+    if not care_match or not care_info:
+        return
+    level = care_match.get('level')
+    identified = (id_result or {}).get('scientific_name', 'this plant')
+    relative = care_info.get('Plant Name', 'a related plant')
+    if level == MATCH_GENUS:
+        st.info(f"🧬 **Genus-level match:** we don't have a profile for `{identified}`, so this is the care guide "
+                f"for its close relative `{relative}` (same genus, *{care_match.get('taxon', '').capitalize()}*).")
+    elif level == MATCH_FAMILY:
+        st.info(f"🧬 **Family-level match:** we don't have a profile for `{identified}` or its genus, so this is the care "
+                f"guide for `{relative}` from the same family (*{care_match.get('taxon', '').capitalize()}*).")
+    elif level == MATCH_CANDIDATE:
+        st.caption(f"Matched PlantNet's alternative identification `{relative}`.")
+    elif level == MATCH_FUZZY:
+        st.caption(f"Closest name match in our database: `{relative}`.")
+
+
+def display_care_reminders(nickname):
+    """Next watering / feeding reminder for a saved plant, if one is scheduled."""
+    next_due = get_care_scheduler().next_due(care_schedule_key(get_session_user_id(), nickname))
+    if not next_due:
+        return
+    parts = []
+    for kind, label in ((WATERING, "💧 Next watering"), (FEEDING, "🍃 Next feeding")):
+        if kind in next_due:
+            parts.append(f"{label}: {datetime.fromtimestamp(next_due[kind]).strftime('%a %d %b')}")
+    st.caption(" · ".join(parts))
+
 
 def display_care_instructions(care_info):
-    if not care_info or not isinstance(care_info, dict):
+    if not care_info or not isinstance(care_info, Mapping):
         st.warning("Care information is missing or invalid.")
         return
 
@@ -530,72 +277,6 @@ def display_care_instructions(care_info):
              st.markdown(additional_care)
 
 
-def find_similar_plant_matches(id_result, plant_care_data, limit=3, score_threshold=60):
-    if not id_result or 'error' in id_result or not plant_care_data:
-        return [] # Cannot find matches without valid ID or care data
-
-    # Create a map of unique plant names (prefer scientific, fallback to common) to plant data
-    all_db_plants_map = {}
-    for p in plant_care_data:
-        primary_name = p.get('Scientific Name', p.get('Plant Name', '')).lower().strip()
-        if primary_name: # Only add if there's a name
-            all_db_plants_map[primary_name] = p
-            # Also map common names if they differ from the primary name
-            common_names = p.get('Common Names', [])
-            if isinstance(common_names, str): common_names = [common_names] # Ensure list
-            if isinstance(common_names, list):
-                for cn in common_names:
-                    cn_lower = cn.lower().strip() if isinstance(cn, str) else None
-                    if cn_lower and cn_lower != primary_name and cn_lower not in all_db_plants_map:
-                         all_db_plants_map[cn_lower] = p
-
-
-    all_db_names = list(all_db_plants_map.keys())
-    if not all_db_names: return [] # No names in DB to compare against
-
-    # Get search terms from ID result
-    search_sci = id_result.get('scientific_name','').lower().strip()
-    search_common = id_result.get('common_name','').lower().strip()
-
-    # Use fuzzywuzzy to find potential matches based on scientific and common names
-    matches = {} # Store best score for each potential match {db_name: score}
-
-    # Process scientific name matches
-    if search_sci:
-        # Increase limit for extract to get more candidates initially
-        sci_results = process.extract(search_sci, all_db_names, limit=limit * 2)
-        for name, score in sci_results:
-            if score >= score_threshold:
-                # Keep the highest score found for this name (sci vs common)
-                matches[name] = max(matches.get(name, 0), score)
-
-    # Process common name matches
-    if search_common:
-        common_results = process.extract(search_common, all_db_names, limit=limit * 2)
-        for name, score in common_results:
-            if score >= score_threshold:
-                matches[name] = max(matches.get(name, 0), score)
-
-    # Sort matches by score (descending)
-    sorted_matches = sorted(matches.items(), key=lambda item: item[1], reverse=True)
-
-    # Get the unique plant data entries corresponding to the top matches, up to the limit
-    final_suggestions = []
-    seen_plants = set() # Track plant objects to avoid duplicates if multiple names map to same plant
-    for name, score in sorted_matches:
-        plant_info = all_db_plants_map.get(name)
-        if plant_info:
-            # Use a unique identifier for the plant object, e.g., its name or a hash
-            plant_id = plant_info.get('Plant Name', '') + plant_info.get('Scientific Name', '')
-            if plant_id not in seen_plants:
-                final_suggestions.append(plant_info)
-                seen_plants.add(plant_id)
-                if len(final_suggestions) >= limit:
-                    break # Stop once we reach the desired number of suggestions
-
-    return final_suggestions
-
-
 def display_suggestion_buttons(suggestions):
      if not suggestions:
          # Don't display anything if no suggestions
@@ -620,6 +301,7 @@ def display_suggestion_buttons(suggestions):
             print(f"DEBUG: Suggestion button '{p_name}' clicked.")
             # Set selected plant's info as the main care info
             st.session_state.plant_care_info = p_info
+            st.session_state.plant_care_match = None # Picked by the user, not inferred
             # Update ID result to reflect the chosen plant (assume 100% confidence)
             new_id_result = {
                  'scientific_name': p_info.get('Scientific Name', 'N/A'),
@@ -644,6 +326,12 @@ def display_suggestion_buttons(suggestions):
             st.rerun() # Rerun to display the new care info and chat for the selected suggestion
 
 
+def opening_messages(care_info):
+    """A new chat's history: the plant's pre-generated greeting, if there is one."""
+    greeting = opening_greeting(care_info)
+    return [{"role": "assistant", "content": greeting, "time": chat_timestamp()}] if greeting else []
+
+
 def display_chat_interface(current_plant_care_info=None, plant_id_result=None): # Make care_info optional, add id_result
     """Displays the chat UI, handles both specific and generic chat modes."""
 
@@ -652,7 +340,7 @@ def display_chat_interface(current_plant_care_info=None, plant_id_result=None):
     can_chat = False
 
     # Prioritize care_info for name and enabling chat
-    if current_plant_care_info and isinstance(current_plant_care_info, dict):
+    if current_plant_care_info and isinstance(current_plant_care_info, Mapping):
         chatbot_display_name = current_plant_care_info.get("Plant Name", "this plant")
         can_chat = True
     # Fallback to id_result if care_info is missing or invalid
@@ -676,20 +364,7 @@ def display_chat_interface(current_plant_care_info=None, plant_id_result=None):
 
     st.subheader(f"💬 Chat with {chatbot_display_name}")
 
-    # --- CSS Styling (Keep as is) ---
-    st.markdown("""
-        <style>
-            /* ... Your existing CSS ... */
-            .message-container { padding: 1px 5px; } /* Reduced vertical padding */
-            .user-message { background: #0b81fe; color: white; border-radius: 18px 18px 0 18px; padding: 8px 14px; margin: 3px 0 3px auto; width: fit-content; max-width: 80%; word-wrap: break-word; box-shadow: 0 1px 2px rgba(0,0,0,0.1); animation: fadeIn 0.3s ease-out; }
-            .bot-message { background: #e5e5ea; color: #000; border-radius: 18px 18px 18px 0; padding: 8px 14px; margin: 3px auto 3px 0; width: fit-content; max-width: 80%; word-wrap: break-word; box-shadow: 0 1px 2px rgba(0,0,0,0.05); animation: fadeIn 0.3s ease-out; }
-            .message-meta { font-size: 0.70rem; color: #777; margin-top: 3px; } /* Reduced margin */
-            .bot-message .message-meta { text-align: left; color: #555;}
-            .user-message .message-meta { text-align: right; }
-            @keyframes fadeIn { from { opacity: 0; transform: translateY(5px); } to { opacity: 1; transform: translateY(0); } }
-            .stChatInputContainer { position: sticky; bottom: 0; background: white; padding-top: 10px; }
-        </style>
-    """, unsafe_allow_html=True)
+    st.markdown(CHAT_CSS, unsafe_allow_html=True)
 
     # --- Chat Initialization/Reset Logic ---
     current_tracked_name = st.session_state.get("current_chatbot_plant_name")
@@ -699,23 +374,36 @@ def display_chat_interface(current_plant_care_info=None, plant_id_result=None):
         # If viewing saved details, try to load log, otherwise start fresh
         if st.session_state.get("viewing_saved_details"):
              saved_plant_nickname = st.session_state.viewing_saved_details
-             saved_plant_data = st.session_state.saved_photos.get(saved_plant_nickname)
-             # Ensure saved_plant_data exists before accessing 'chat_log'
-             if saved_plant_data and 'chat_log' in saved_plant_data:
-                 st.session_state.chat_history = saved_plant_data['chat_log']
+             # Only the latest page of the log; "Show earlier messages" loads more
+             recent_messages = get_saved_plant_store().chat_page(get_session_user_id(), saved_plant_nickname)
+             if recent_messages:
+                 st.session_state.chat_history = recent_messages
                  print(f"DEBUG: Loaded chat log for saved plant '{saved_plant_nickname}'")
              else:
                  st.session_state.chat_history = [] # Start fresh if no log saved
+                 for message in opening_messages(current_plant_care_info):
+                     append_chat_message(message)
                  print(f"DEBUG: Starting fresh chat log for saved plant '{saved_plant_nickname}' (no log found).")
         else:
-            st.session_state.chat_history = [] # Start fresh for new ID or generic chat
+            st.session_state.chat_history = opening_messages(current_plant_care_info) # Start fresh for new ID or generic chat
             print(f"DEBUG: Starting fresh chat log for '{chatbot_display_name}'.")
 
         st.session_state.current_chatbot_plant_name = chatbot_display_name # Track the new name
+        st.session_state.chat_paged_in = False
 
     # --- Chat History Display using st.container ---
     chat_container = st.container(height=400)
     with chat_container:
+        earliest_seq = (st.session_state.chat_history or [{}])[0].get("seq")
+        saved_nickname = st.session_state.get("viewing_saved_details")
+        if saved_nickname and earliest_seq is not None and get_saved_plant_store().has_earlier_chat(
+                get_session_user_id(), saved_nickname, earliest_seq):
+            if st.button("Show earlier messages", key="chat_earlier_messages"):
+                earlier = get_saved_plant_store().chat_page(get_session_user_id(), saved_nickname,
+                                                            before=earliest_seq)
+                st.session_state.chat_history[:0] = earlier
+                st.session_state.chat_paged_in = True # Keep what the reader scrolled back to
+                st.rerun()
         for message in st.session_state.get("chat_history", []):
             role = message.get("role")
             content = message.get("content", "")
@@ -730,9 +418,16 @@ def display_chat_interface(current_plant_care_info=None, plant_id_result=None):
     # Sanitize key more robustly
     safe_display_name = "".join(c if c.isalnum() else "_" for c in chatbot_display_name)
     prompt_key = f"chat_input_{safe_display_name}"
-    if prompt := st.chat_input(f"Ask {chatbot_display_name}...", key=prompt_key):
-        timestamp = datetime.now(EASTERN_TZ).strftime("%H:%M")
-        st.session_state.chat_history.append({"role": "user", "content": prompt, "time": timestamp})
+    prompt = st.chat_input(f"Ask {chatbot_display_name}...", key=prompt_key)
+    # Common first questions as one-click prompts (answered instantly when pre-generated, see plant_greetings)
+    if current_plant_care_info and not any(m.get("role") == "user" for m in st.session_state.chat_history):
+        cols = st.columns(QUICK_QUESTIONS)
+        for i, question in enumerate(COMMON_QUESTIONS[:QUICK_QUESTIONS]):
+            if cols[i].button(question, key=f"quick_question_{safe_display_name}_{i}", use_container_width=True):
+                prompt = question
+    if prompt:
+        timestamp = chat_timestamp()
+        append_chat_message({"role": "user", "content": prompt, "time": timestamp})
         st.rerun()
 
     # --- Process Bot Response ---
@@ -746,30 +441,267 @@ def display_chat_interface(current_plant_care_info=None, plant_id_result=None):
                 plant_id_result # Use the id_result passed to THIS function call
             )
 
-        timestamp = datetime.now(EASTERN_TZ).strftime("%H:%M")
-        st.session_state.chat_history.append({"role": "assistant", "content": bot_response, "time": timestamp})
-        # Update chat log in saved photos immediately if viewing saved details
-        if st.session_state.get("viewing_saved_details"):
-            saved_nickname = st.session_state.viewing_saved_details
-            if saved_nickname in st.session_state.saved_photos:
-                st.session_state.saved_photos[saved_nickname]['chat_log'] = st.session_state.chat_history
+        timestamp = chat_timestamp()
+        append_chat_message({"role": "assistant", "content": bot_response, "time": timestamp})
+        st.rerun()
+
+
+def append_chat_message(message):
+    """
+    Add a message to the chat in session state and, when viewing a saved plant,
+    to its chat log (one append; the session then keeps only the last CHAT_WINDOW,
+    unless earlier pages were loaded: those stay, with everything after them).
+    """
+    nickname = st.session_state.get("viewing_saved_details")
+    if nickname:
+        seq = get_saved_plant_store().append_chat(get_session_user_id(), nickname, message)
+        if seq is not None:
+            message = dict(message, seq=seq)
+    st.session_state.chat_history.append(message)
+    if nickname and not st.session_state.get("chat_paged_in") and len(st.session_state.chat_history) > CHAT_WINDOW:
+        del st.session_state.chat_history[:-CHAT_WINDOW]
+
+
+def plant_state_defaults():
+    """Session state about the plant being identified or viewed, as it is before any photo is chosen."""
+    return {
+        "plant_id_result": None, "plant_care_info": None, "chat_history": [], "chat_paged_in": False,
+        "current_chatbot_plant_name": None, "suggestions": None,
+        "uploaded_file_bytes": None, "uploaded_file_type": None,
+        "saving_mode": False,
+        "plant_id_result_for_care_check": None, # Care info looked up for this ID result
+        "suggestion_just_selected": False,
+        "identification_job_id": None, # Background identification job being polled
+        "identification_images": None, # (bytes, organ) photos when identifying from several photos
+        "plant_care_match": None # How plant_care_info was matched to the ID ({'level', 'taxon'})
+    }
+
+
+def reset_plant_state():
+    """Forget the plant being identified: on a new photo or mode, after saving or deleting, or leaving saved plants."""
+    st.session_state.update(plant_state_defaults())
+
+
+@st.fragment(run_every=ID_POLL_INTERVAL_SECONDS)
+def poll_identification(user_id):
+    """
+    Submit the uploaded photo(s) to the identification worker pool and check on
+    the job every ID_POLL_INTERVAL_SECONDS, then rerun the page with the result.
+    A fragment, so waiting reruns only this and not the whole page.
+    """
+    job_queue = get_identification_queue()
+    job = None
+    if st.session_state.identification_job_id is not None:
+        job = job_queue.status(st.session_state.identification_job_id)
+    if job is None: # Not submitted yet, or pruned before we collected it
+        images = st.session_state.identification_images or st.session_state.uploaded_file_bytes
+        job = job_queue.submit(user_id, images)
+        if 'error' not in job:
+            st.session_state.identification_job_id = job['job_id']
+
+    if 'error' not in job and job['status'] in (DONE, FAILED):
+        st.session_state.plant_id_result = job['result']
+        st.session_state.identification_job_id = None
+        st.session_state.plant_id_result_for_care_check = None # Reset care check flag after new ID
+        st.session_state.suggestion_just_selected = False # Ensure flag is False after new ID
         st.rerun()
+    if 'error' in job:
+        st.info(f"{job['error']} Waiting for a free slot...")
+    st.markdown("<div style='text-align:center;'><p><i>Identifying plant...</i></p></div>", unsafe_allow_html=True)
+
+
+def display_multi_photo_uploader():
+    """Upload several photos of ONE plant, tag each with its organ, and identify them in one request."""
+    uploaded_files = st.file_uploader(
+        f"Upload up to {MAX_IMAGES_PER_REQUEST} photos of the same plant (e.g. leaf, flower, fruit, bark):",
+        type=["jpg", "jpeg", "png"], accept_multiple_files=True,
+        key="plant_multi_uploader", on_change=reset_plant_state
+    )
+    if not uploaded_files:
+        return
+    if len(uploaded_files) > MAX_IMAGES_PER_REQUEST:
+        st.warning(f"PlantNet accepts at most {MAX_IMAGES_PER_REQUEST} photos per plant. Please remove some.")
+        return
+
+    organs = []
+    cols = st.columns(len(uploaded_files))
+    for i, uploaded in enumerate(uploaded_files):
+        with cols[i]:
+            st.image(uploaded.getvalue(), use_container_width=True)
+            organs.append(st.selectbox("Organ", VALID_ORGANS, key=f"multi_organ_{i}_{uploaded.name}"))
+
+    if st.button("🔎 Identify from these photos", key="identify_multi_button", use_container_width=True):
+        reset_plant_state()
+        st.session_state.identification_images = [(f.getvalue(), organ) for f, organ in zip(uploaded_files, organs)]
+        # The first photo represents the plant when displaying and saving the profile
+        st.session_state.uploaded_file_bytes = uploaded_files[0].getvalue()
+        st.session_state.uploaded_file_type = uploaded_files[0].type
+        st.rerun()
+
+
+def display_bulk_identification():
+    """Identify a zip of many plants (one plant per photo) concurrently and report throughput."""
+    st.caption("Upload a .zip of plant photos, one plant per photo. They are identified in parallel.")
+    zip_file = st.file_uploader("Zip of plant photos:", type=["zip"], key="bulk_zip_uploader")
+    workers = st.slider("Parallel requests", min_value=1, max_value=BULK_MAX_WORKERS,
+                        value=min(4, BULK_MAX_WORKERS), key="bulk_workers")
+
+    if zip_file is not None and st.button("📦 Identify all", key="bulk_identify_button"):
+        try:
+            items = list(iter_zip_images(zip_file.getvalue()))
+        except zipfile.BadZipFile:
+            st.error("That file is not a valid zip archive.")
+            return
+        if not items:
+            st.warning("No JPG or PNG images found in the zip file.")
+            return
+        with st.spinner(f"Identifying {len(items)} plants..."):
+            st.session_state.bulk_results = identify_bulk(items, identify, max_workers=workers)
+
+    if st.session_state.get("bulk_results"):
+        results, report = st.session_state.bulk_results
+        st.success(format_throughput_report(report))
+        st.dataframe([
+            {
+                "Image": entry['name'],
+                "Scientific Name": entry['result'].get('scientific_name', ''),
+                "Common Name": entry['result'].get('common_name', ''),
+                "Confidence (%)": entry['result'].get('confidence'),
+                "Error": entry['result'].get('error', ''),
+                "Seconds": round(entry['seconds'], 2),
+            }
+            for entry in results
+        ], use_container_width=True)
+
+
+def display_plant_finder(care_dataset):
+    """Find plants in the care database that suit given conditions (light, pets, temperature, ...)."""
+    st.caption("Pick the conditions you can offer. Plants whose care guide doesn't state a value are left out "
+               "of that filter.")
+    c1, c2 = st.columns(2)
+    with c1:
+        light = st.multiselect("☀️ Light available", LIGHT_CATEGORIES, key="finder_light")
+        watering = st.multiselect("💧 Watering", WATERING_CATEGORIES, key="finder_watering",
+                                  help="low: let the soil dry out; high: keep it moist")
+        pet_safe = st.checkbox("🐾 Pet-safe only", key="finder_pet_safe")
+    with c2:
+        use_temp = st.checkbox("🌡️ Filter by temperature", key="finder_use_temp")
+        temp_range = st.slider("Room temperature (°C)", -10, 40, (18, 24), key="finder_temp", disabled=not use_temp)
+        use_humidity = st.checkbox("💦 Filter by humidity", key="finder_use_humidity")
+        humidity_range = st.slider("Humidity (%)", 0, 100, (40, 60), key="finder_humidity", disabled=not use_humidity)
+
+    conditions = {
+        "light": light, "watering": watering, "pet_safe": True if pet_safe else None,
+        "temp_range_c": temp_range if use_temp else None,
+        "humidity_range": humidity_range if use_humidity else None,
+    }
+    facets = care_dataset.facets
+    matches = facets.query(limit=FINDER_MAX_RESULTS, **conditions)
+    total = facets.count(**conditions)
+    st.markdown(f"**{total} matching plants**" + (f" (showing first {len(matches)})" if total > len(matches) else ""))
+    if not matches:
+        return
+
+    st.dataframe([
+        {
+            "Plant": plant.get('Plant Name', ''),
+            "Light": plant.get('Light Requirements', ''),
+            "Watering": plant.get('Watering', ''),
+            "Temperature": plant.get('Temperature Range', ''),
+            "Toxicity": plant.get('Toxicity', ''),
+        }
+        for plant in matches
+    ], use_container_width=True)
+    names = [plant.get('Plant Name', f"Plant {i + 1}") for i, plant in enumerate(matches)]
+    selected = st.selectbox("View care guide:", ["-- Select --"] + names, key="finder_selected")
+    if selected != "-- Select --":
+        display_care_instructions(matches[names.index(selected)])
+
+
+def display_search_results(query, care_dataset):
+    """Full-text (BM25) search results over every care and personality field."""
+    st.header(f"🔎 Results for “{query.strip()}”")
+    hits = care_dataset.search.search(query, limit=SEARCH_MAX_RESULTS)
+    if not hits:
+        st.info("No care guides mention that. Try other words, or clear the search box to go back.")
+        return
+    st.caption(f"Top {len(hits)} matches. Clear the search box in the sidebar to go back.")
+    plants = [care_dataset.records[i] for i, _ in hits]
+    for rank, plant in enumerate(plants, start=1):
+        st.markdown(f"**{rank}. {plant.get('Plant Name', 'Unknown')}**")
+        excerpt = snippet(plant, query)
+        if excerpt:
+            st.caption(excerpt)
+    names = [plant.get('Plant Name', f"Result {i + 1}") for i, plant in enumerate(plants)]
+    selected = st.selectbox("View care guide:", ["-- Select --"] + names, key="search_selected")
+    if selected != "-- Select --":
+        st.divider()
+        display_care_instructions(plants[names.index(selected)])
+
+
+def display_metrics_admin():
+    """Live latency histograms, counters and recent page-render breakdowns (plant_metrics)."""
+    st.button("🔄 Refresh", key="metrics_refresh")
+    snapshot = metrics.REGISTRY.snapshot()
+    stages = sorted(snapshot["histograms"].get(STAGE_HISTOGRAM, []),
+                    key=lambda series: series["sum"], reverse=True)
+    if not stages:
+        st.info("No timings recorded yet. Use the app and come back.")
+        return
+
+    st.subheader("⏱️ Stage latency")
+    st.dataframe([
+        {
+            "Stage": series["labels"].get("stage"), "Calls": series["count"],
+            "Total (s)": round(series["sum"], 3), "Mean (ms)": round(1000 * series["sum"] / series["count"], 2),
+            "p50 (ms)": round(1000 * series["p50"], 2), "p95 (ms)": round(1000 * series["p95"], 2),
+            "p99 (ms)": round(1000 * series["p99"], 2),
+        }
+        for series in stages
+    ], use_container_width=True)
+    stage_names = [series["labels"].get("stage") for series in stages]
+    selected = st.selectbox("Histogram for stage:", stage_names, key="metrics_stage")
+    buckets = stages[stage_names.index(selected)]["buckets"]
+    st.bar_chart({"calls": {f"≤{bound}s" if bound != "+Inf" else ">30s": count for bound, count in buckets.items()}})
+
+    renders = [trace for trace in reversed(snapshot["traces"]) if trace["stage"] == "page_render"]
+    if renders:
+        st.subheader("🧭 Recent page renders")
+        labels = [f"{datetime.fromtimestamp(t['start']).strftime('%H:%M:%S')} — {1000 * t['seconds']:.0f} ms"
+                  for t in renders]
+        chosen = st.selectbox("Render:", labels, key="metrics_trace")
+        st.dataframe(trace_breakdown(renders[labels.index(chosen)]), use_container_width=True)
+
+    st.subheader("🔢 Counters and gauges")
+    rows = [{"Metric": name, "Labels": ", ".join(f"{k}={v}" for k, v in entry["labels"].items()), "Value": entry["value"]}
+            for name, entries in snapshot["counters"].items() for entry in entries]
+    rows += [{"Metric": name, "Labels": "", "Value": value} for name, value in snapshot["gauges"].items()]
+    st.dataframe(rows, use_container_width=True)
+
+    with st.expander("Prometheus text"):
+        st.code(metrics.REGISTRY.to_prometheus(), language="text")
+    st.download_button("⬇️ Download JSON snapshot", json.dumps(snapshot, default=str), file_name="plant_metrics.json",
+                       mime="application/json")
 
 
 # --- Main App Logic ---
 def main():
+    get_metrics_exporters()
     
 
     # --- Sidebar Navigation and Saved Plants ---
     st.sidebar.title("📚 Plant Buddy")
-    # Initialize saved photos in session state if not already present
-    if "saved_photos" not in st.session_state: st.session_state.saved_photos = {}
+    saved_plants = get_saved_plant_store()
+    user_id = get_session_user_id()
+    saved_plants_heartbeat()
 
-    nav_choice_options = ["🆔 Identify New Plant", "🪴 My Saved Plants"]
+    nav_choice_options = ["🆔 Identify New Plant", "🪴 My Saved Plants", "🔍 Find Plants"]
+    if ENABLE_ADMIN_PAGE:
+        nav_choice_options.append("📈 Metrics")
     nav_index = 0 # Default to Identify page
 
     # --- Saved Plants Selector in Sidebar ---
-    saved_plant_nicknames = list(st.session_state.saved_photos.keys())
+    saved_plant_nicknames = saved_plants.nicknames(user_id)
     selected_saved_plant_sb = None # Initialize
     if saved_plant_nicknames:
         st.sidebar.subheader("Saved Plants")
@@ -820,19 +752,16 @@ def main():
         index=nav_index, # Use the potentially updated nav_index
         label_visibility="collapsed" # Hide the "Navigation" label itself
     )
+    search_query = st.sidebar.text_input("🔎 Search care guides", key="care_search_query",
+                                         placeholder="e.g. pet safe low light")
     st.sidebar.divider()
     st.sidebar.caption("Powered by PlantNet & Gemini")
 
 
     # --- Initialize State Variables ---
     defaults = {
-        "plant_id_result": None, "plant_care_info": None, "chat_history": [],
-        "current_chatbot_plant_name": None, "suggestions": None,
-        "uploaded_file_bytes": None, "uploaded_file_type": None,
-        "saving_mode": False, "last_view": nav_choice_options[0],
+        **plant_state_defaults(), "last_view": nav_choice_options[0],
         "viewing_saved_details": st.session_state.get("viewing_saved_details", None),
-        "plant_id_result_for_care_check": None, # Initialize care check tracker
-        "suggestion_just_selected": False # **** ADD THIS FLAG ****
     }
     for key, value in defaults.items():
         if key not in st.session_state:
@@ -849,13 +778,20 @@ def main():
         st.warning("Gemini API Key is missing or invalid. Chat functionality will be disabled. Please check your .env file and api_config.py.")
         # Don't set api_keys_ok to False here, identification can still work
 
-    plant_care_data = load_plant_care_data()
-    if not plant_care_data:
-        # Error is shown in load_plant_care_data
+    care_dataset = load_plant_care_dataset()
+    if care_dataset is None or not care_dataset.records:
+        # Error is shown in load_plant_care_dataset
         st.stop()
+    plant_care_data = care_dataset.records
+    care_index = care_dataset.index
     if not api_keys_ok: # Stop if essential PlantNet key is missing
         st.stop()
 
+    # A search query takes over the main area until the search box is cleared
+    if search_query and search_query.strip():
+        display_search_results(search_query, care_dataset)
+        return
+
 
     # --- Main Content Area based on Navigation ---
 
@@ -870,35 +806,32 @@ def main():
         # Reset if coming FROM saved view and NOT currently viewing saved details
         if navigated_from_saved and st.session_state.get("viewing_saved_details") is None:
             print("DEBUG: Resetting state -> Switched to Identify View")
-            # Clear most session state related to a specific plant
-            keys_to_reset = ["plant_id_result", "plant_care_info", "current_chatbot_plant_name",
-                             "suggestions", "uploaded_file_bytes", "uploaded_file_type",
-                             "chat_history", "saving_mode", "plant_id_result_for_care_check",
-                             "suggestion_just_selected"] # Added flag reset
-            for key in keys_to_reset:
-                if key in st.session_state: # Check if key exists before modifying
-                   # Assign default values based on type
-                   default_val = [] if key == "chat_history" else (False if key in ["saving_mode", "suggestion_just_selected"] else None)
-                   st.session_state[key] = default_val
-
+            reset_plant_state() # Clear session state related to a specific plant
             st.session_state.pop('plant_uploader', None) # Clear potential file uploader state
 
         st.session_state.last_view = "🆔 Identify New Plant" # Update last view tracker
 
 
-        # --- File Uploader ---
-        uploaded_file = st.file_uploader(
-            "Upload a clear photo of your plant:", type=["jpg", "jpeg", "png"],
-            key="plant_uploader", # Consistent key
-            help="Upload an image file (JPG, PNG).",
-            on_change=lambda: st.session_state.update({ # Reset relevant state on *new file upload*
-                 "plant_id_result": None, "plant_care_info": None, "chat_history": [],
-                 "current_chatbot_plant_name": None, "suggestions": None,
-                 "uploaded_file_bytes": None, "uploaded_file_type": None, # Clear previous bytes/type too
-                 "saving_mode": False, "plant_id_result_for_care_check": None, # Also reset care check flag
-                 "suggestion_just_selected": False # Reset flag on new upload
-            })
+        # --- Identification Mode ---
+        id_mode = st.radio(
+            "Identification mode", ID_MODES, key="id_mode", horizontal=True,
+            label_visibility="collapsed", on_change=reset_plant_state
         )
+        if id_mode == ID_MODE_BULK:
+            display_bulk_identification()
+            return
+
+        # --- File Uploader ---
+        uploaded_file = None
+        if id_mode == ID_MODE_MULTI:
+            display_multi_photo_uploader()
+        else:
+            uploaded_file = st.file_uploader(
+                "Upload a clear photo of your plant:", type=["jpg", "jpeg", "png"],
+                key="plant_uploader", # Consistent key
+                help="Upload an image file (JPG, PNG).",
+                on_change=reset_plant_state # Reset relevant state on *new file upload*
+            )
 
         # --- Logic Based on Uploader State ---
         if uploaded_file is None:
@@ -929,23 +862,9 @@ def main():
                 st.error(f"Error displaying image: {e}")
                 st.stop()
 
-            # Run Identification if needed
+            # Run Identification if needed (submitted to the worker pool, then polled)
             if st.session_state.plant_id_result is None:
-                loader_placeholder = st.empty()
-                with loader_placeholder.container():
-                    st.markdown("<div style='text-align:center;'><p><i>Identifying plant...</i></p></div>", unsafe_allow_html=True)
-                    # components.html(loading_animation_html, height=250) # Optional animation
-
-                try:
-                    result = identify_plant(st.session_state.uploaded_file_bytes)
-                    st.session_state.plant_id_result = result
-                    st.session_state.plant_id_result_for_care_check = None # Reset care check flag after new ID
-                    st.session_state.suggestion_just_selected = False # Ensure flag is False after new ID
-                except Exception as e:
-                    st.session_state.plant_id_result = {'error': f"Identification process failed: {str(e)}"}
-                finally:
-                    loader_placeholder.empty()
-                    st.rerun()
+                poll_identification(user_id)
 
             # Display results, care info, etc. (if ID is done)
             elif st.session_state.plant_id_result is not None:
@@ -958,7 +877,7 @@ def main():
                     st.header("💾 Save This Plant Profile")
                     if st.session_state.uploaded_file_bytes:
                         try:
-                            st.image(Image.open(BytesIO(st.session_state.uploaded_file_bytes)), width=150, caption="Image to save")
+                            st.image(st.session_state.uploaded_file_bytes, width=150, caption="Image to save")
                         except Exception:
                             st.warning("Could not display image preview for saving.")
 
@@ -971,38 +890,27 @@ def main():
                         save_nickname = st.text_input("Enter a nickname for this plant:", key="save_nickname_input")
                         submitted = st.form_submit_button("✅ Confirm Save")
                         if submitted:
-                            if not save_nickname:
-                                st.warning("Please enter a nickname to save.")
-                            elif save_nickname in st.session_state.saved_photos:
-                                st.warning(f"A plant named '{save_nickname}' already exists. Please choose a different name.")
-                            else:
-                                try:
-                                    encoded_img = base64.b64encode(st.session_state.uploaded_file_bytes).decode()
-                                    data_url = f"data:{st.session_state.uploaded_file_type};base64,{encoded_img}"
-                                    # Save current state (care info might be None)
-                                    st.session_state.saved_photos[save_nickname] = {
-                                        "nickname": save_nickname, "image": data_url,
-                                        "id_result": st.session_state.plant_id_result,
-                                        "care_info": st.session_state.plant_care_info, # Save None if not found
-                                        "chat_log": st.session_state.get("chat_history", []) # Save current chat
-                                    }
-                                    # Clear state *after* successful save
-                                    keys_to_reset = ["plant_id_result", "plant_care_info", "current_chatbot_plant_name",
-                                                     "suggestions", "uploaded_file_bytes", "uploaded_file_type",
-                                                     "chat_history", "saving_mode", "plant_id_result_for_care_check",
-                                                     "suggestion_just_selected"] # Added flag reset
-                                    for key in keys_to_reset:
-                                        if key in st.session_state:
-                                            default_val = [] if key == "chat_history" else (False if key in ["saving_mode", "suggestion_just_selected"] else None)
-                                            st.session_state[key] = default_val
-
+                            try:
+                                # Save current state (care info might be None); also schedules care reminders
+                                saved = saved_plants.save(
+                                    user_id, save_nickname,
+                                    image_bytes=st.session_state.uploaded_file_bytes,
+                                    image_type=st.session_state.uploaded_file_type,
+                                    id_result=st.session_state.plant_id_result,
+                                    care_info=st.session_state.plant_care_info,
+                                    care_match=st.session_state.plant_care_match,
+                                    chat_log=st.session_state.get("chat_history", []))
+                                if 'error' in saved:
+                                    st.warning(saved['error'])
+                                else:
+                                    reset_plant_state() # Clear state *after* successful save
                                     st.session_state.pop('plant_uploader', None)
 
                                     st.success(f"Successfully saved '{save_nickname}'!")
                                     st.balloons()
                                     st.rerun()
-                                except Exception as e:
-                                    st.error(f"Error saving plant profile: {e}")
+                            except Exception as e:
+                                st.error(f"Error saving plant profile: {e}")
 
                     if st.button("❌ Cancel Save", key="cancel_save_button"):
                         st.session_state.saving_mode = False
@@ -1030,8 +938,9 @@ def main():
                             # This block now only runs if triggered by a new upload/ID change,
                             # NOT immediately after a suggestion click.
                             print(f"DEBUG: Finding/updating care instructions for ID: {current_id_result_from_state}")
-                            found_care = find_care_instructions(current_id_result_from_state, plant_care_data)
+                            found_care, care_match = match_care_instructions(current_id_result_from_state, plant_care_data, care_index=care_index)
                             st.session_state.plant_care_info = found_care # Set to None if not found
+                            st.session_state.plant_care_match = care_match # How it matched (exact, genus-level, ...)
                             st.session_state.plant_id_result_for_care_check = current_id_result_from_state # Store ID used for this check
 
                             if found_care is not None:
@@ -1067,6 +976,7 @@ def main():
 
                         # --- Case 1: Care Info FOUND (or just selected via suggestion) ---
                         if care_info_to_display:
+                            display_care_match_notice(st.session_state.get('plant_care_match'), care_info_to_display, id_result_to_display)
                             display_care_instructions(care_info_to_display)
                             st.divider()
                             if st.button("💾 Save Plant Profile", key="save_profile_button"):
@@ -1081,7 +991,7 @@ def main():
 
                             if st.session_state.suggestions is None:
                                 print("DEBUG: Suggestions are None, generating...")
-                                st.session_state.suggestions = find_similar_plant_matches(id_result_to_display, plant_care_data) # Use current ID from state
+                                st.session_state.suggestions = find_similar_plant_matches(id_result_to_display, plant_care_data, care_index=care_index) # Use current ID from state
                                 print("DEBUG: Rerunning to display suggestions.")
                                 # Avoid potential infinite loop if find_similar_plant_matches keeps returning empty list
                                 if st.session_state.suggestions is not None:
@@ -1113,15 +1023,15 @@ def main():
         st.header("🪴 My Saved Plant Profiles")
         st.session_state.last_view = "🪴 My Saved Plants" # Track view
 
-        saved_plant_nicknames = list(st.session_state.saved_photos.keys())
+        saved_plant_nicknames = saved_plants.nicknames(user_id)
         nickname_to_view = st.session_state.get("viewing_saved_details")
+        entry = saved_plants.get(user_id, nickname_to_view) if nickname_to_view else None
 
         if not saved_plant_nicknames:
             st.info("You haven't saved any plants yet. Go to 'Identify New Plant' to add some!")
         # If a specific plant IS selected for viewing:
-        elif nickname_to_view and nickname_to_view in st.session_state.saved_photos:
+        elif entry is not None:
              st.subheader(f"Showing Details for: '{nickname_to_view}'")
-             entry = st.session_state.saved_photos[nickname_to_view]
 
              # Display saved image
              if entry.get("image"):
@@ -1162,7 +1072,9 @@ def main():
 
              # --- Display Care Instructions and Chat ---
              if saved_care_info:
+                 display_care_match_notice(entry.get("care_match"), saved_care_info, saved_id_result)
                  display_care_instructions(saved_care_info)
+                 display_care_reminders(nickname_to_view)
                  st.divider()
                  # Call chat interface with BOTH care_info and id_result
                  display_chat_interface(current_plant_care_info=saved_care_info, plant_id_result=saved_id_result)
@@ -1186,17 +1098,9 @@ def main():
              safe_nickname_del = "".join(c if c.isalnum() else "_" for c in nickname_to_view)
              delete_key = f"del_{safe_nickname_del}"
              if st.button(f"🗑️ Delete '{nickname_to_view}' Profile", key=delete_key, use_container_width=False):
-                 del st.session_state.saved_photos[nickname_to_view]
+                 saved_plants.delete(user_id, nickname_to_view) # Also cancels its care reminders
                  st.session_state.viewing_saved_details = None
-                 # Clear related state variables
-                 keys_to_reset = ["plant_id_result", "plant_care_info", "current_chatbot_plant_name",
-                                  "suggestions", "uploaded_file_bytes", "uploaded_file_type",
-                                  "chat_history", "saving_mode", "plant_id_result_for_care_check",
-                                  "suggestion_just_selected"] # Added flag reset
-                 for key in keys_to_reset:
-                     if key in st.session_state:
-                         default_val = [] if key == "chat_history" else (False if key in ["saving_mode", "suggestion_just_selected"] else None)
-                         st.session_state[key] = default_val
+                 reset_plant_state() # Clear related state variables
 
                  st.success(f"Deleted '{nickname_to_view}'.")
                  st.rerun()
@@ -1213,18 +1117,18 @@ def main():
             col_index = 0
 
             for nickname in saved_plant_nicknames:
-                plant_data = st.session_state.saved_photos.get(nickname)
-                if not plant_data: continue
+                saved_entry = saved_plants.get(user_id, nickname)
+                if not saved_entry: continue
 
                 with cols[col_index % num_columns]:
                     with st.container(border=True):
                         # Display image
-                        if plant_data.get("image"):
-                            try: st.image(plant_data["image"], use_container_width=True)
+                        if saved_entry.get("image"):
+                            try: st.image(saved_entry["image"], use_container_width=True)
                             except Exception: st.caption("Image error")
                         st.markdown(f"**{nickname}**") # Nickname
 
-                        id_res = plant_data.get("id_result", {})
+                        id_res = saved_entry.get("id_result") or {}
                         com_n = id_res.get('common_name', 'N/A')
                         # Display common name only if it's not N/A or empty
                         if com_n and com_n != 'N/A': st.caption(f"{com_n}")
@@ -1239,6 +1143,24 @@ def main():
                 col_index += 1
 
 
+    # ====================================
+    # ===== Find Plants View =====
+    # ====================================
+    elif nav_choice == "🔍 Find Plants":
+        st.header("🔍 Find Plants for Your Conditions")
+        st.session_state.last_view = "🔍 Find Plants" # Track view
+        display_plant_finder(care_dataset)
+
+
+    # ====================================
+    # ===== Metrics (admin) View =====
+    # ====================================
+    elif nav_choice == "📈 Metrics":
+        st.header("📈 Performance Metrics")
+        st.session_state.last_view = "📈 Metrics" # Track view
+        display_metrics_admin()
+
+
 # --- Run the App ---
 if __name__ == "__main__":
     # Add a check for API keys loaded from config
@@ -1249,4 +1171,6 @@ if __name__ == "__main__":
         st.warning("Warning: Gemini API Key not loaded. Chat will be disabled.")
         # Allow app to run without Gemini for ID/Care lookup
 
-    main()
+    incr("streamlit_reruns_total")
+    with span("page_render"):
+        main()